@@ -1,6 +1,13 @@
 class Plant:
     """植物基类，所有植物都继承自此类"""
 
+    type_id = None  # 登记的类型标识，由 register_plant 设置
+    SNAPSHOT_FIELDS = ("health", "cooldown_timer")  # 存档时保存的可变状态（整数）
+    ROW_REACH = 0  # 攻击波及的相邻行数；不为 0 的植物在按行并行推进时放到同步阶段结算
+
+    __slots__ = ("name", "health", "cost", "attack_power", "attack_range", "attack_cooldown",
+                 "cooldown_timer", "position", "handle", "dealt")
+
     def __init__(self, name, health, cost, attack_power=0, attack_range=1, attack_cooldown=1):
         self.name = name  # 植物名称
         self.health = health  # 生命值
@@ -10,6 +17,8 @@ class Plant:
         self.attack_cooldown = attack_cooldown  # 攻击冷却时间（回合）
         self.cooldown_timer = 0  # 当前冷却计时器
         self.position = None  # 位置坐标 (行, 列)
+        self.handle = None  # 在 EntityStore 中的句柄
+        self.dealt = 0  # 最近一次攻击实际造成的伤害（不计超出僵尸剩余生命值的部分）
 
     def set_position(self, row, col):
         """设置植物位置"""
@@ -29,23 +38,22 @@ class Plant:
         """判断是否可以攻击"""
         return self.attack_power > 0 and self.cooldown_timer == 0
 
-    def attack(self, zombies):
-        """攻击范围内的僵尸"""
+    def attack(self, board):
+        """攻击范围内的僵尸，board 为提供 zombies_in 范围查询的占位索引"""
         if not self.can_attack():
             return []
 
         # 重置冷却计时器
         self.cooldown_timer = self.attack_cooldown
+        self.dealt = 0
 
-        # 找出攻击范围内的僵尸
+        # 找出攻击范围内的僵尸（简化版：同一行且在植物前方）
         attacked_zombies = []
         if self.position:
             row, col = self.position
-            for zombie in zombies:
-                z_row, z_col = zombie.position
-                # 检查是否在攻击范围内（简化版：同一行且在植物前方）
-                if z_row == row and z_col >= col and (z_col - col) <= self.attack_range:
-                    zombie.take_damage(self.attack_power)
+            for zombie in board.zombies_in(row, row, col, col + self.attack_range):
+                if zombie.is_alive():
+                    self.dealt += zombie.take_damage(self.attack_power)
                     attacked_zombies.append(zombie)
 
         return attacked_zombies
@@ -55,14 +63,76 @@ class Plant:
         if self.cooldown_timer > 0:
             self.cooldown_timer -= 1
 
+    def ticks_until_event(self, board):
+        """距离下一次可观察变化（攻击命中、被移除等）的回合数；None 表示不会主动发生变化
+
+        和 skip_ticks 一起用于跳过空闲回合；重写 update 或 attack 的子类需要同时重写这两个方法。
+        """
+        if not self.is_alive():
+            return 1  # 下一回合被移除
+        if self.attack_power > 0 and self.position:
+            row, col = self.position
+            if board.zombies_in(row, row, col, col + self.attack_range):
+                return max(self.cooldown_timer, 1)
+        return None
+
+    def skip_ticks(self, ticks):
+        """一次推进 ticks 个空闲回合（期间没有可观察变化）"""
+        timer = self.cooldown_timer
+        if self.attack_power <= 0:
+            self.cooldown_timer = max(timer - ticks, 0)
+        elif self.attack_cooldown > 0 and ticks > 0:
+            # 计时器归零的回合会立即攻击（打空）并重新计时，之后在 1..attack_cooldown 之间循环
+            if timer == 0:
+                timer = self.attack_cooldown
+                ticks -= 1
+            self.cooldown_timer = (timer - 1 - ticks) % self.attack_cooldown + 1
+
     def __str__(self):
         return f"{self.name} (HP: {self.health})"
 
 
+class PlantType:
+    """登记的植物类型：构造函数、基础属性和棋盘上的显示方式"""
+
+    def __init__(self, type_id, index, cls, glyph, color):
+        self.type_id = type_id  # 类型标识，如 "sunflower"
+        self.index = index  # 类型编号，即登记顺序
+        self.cls = cls  # 构造函数
+        self.glyph = glyph  # 棋盘上显示的字符
+        self.color = color  # 格子背景色
+        self.prototype = cls()  # 样本实例，只用来读取基础属性，不参与游戏
+        self.name = self.prototype.name
+        self.cost = self.prototype.cost
+
+
+# 已登记的植物类型：类型标识 -> PlantType，在导入时登记一次
+PLANT_REGISTRY = {}
+
+# 全部植物类型，顺序即类型编号（录像、批量模拟等按编号存储）
+PLANT_TYPES = []
+
+
+def register_plant(type_id, glyph, color):
+    """类装饰器：登记一种植物类型，之后即可通过 PlantFactory 按类型标识创建"""
+    def register(cls):
+        if type_id in PLANT_REGISTRY:
+            raise ValueError(f"植物类型已登记: {type_id}")
+        cls.type_id = type_id
+        PLANT_REGISTRY[type_id] = PlantType(type_id, len(PLANT_TYPES), cls, glyph, color)
+        PLANT_TYPES.append(type_id)
+        return cls
+    return register
+
+
 # 具体植物类型
+@register_plant("sunflower", glyph="向", color="#ffffaa")
 class Sunflower(Plant):
     """向日葵：产生阳光"""
 
+    __slots__ = ("sun_production", "production_cooldown", "sun_timer")
+    SNAPSHOT_FIELDS = Plant.SNAPSHOT_FIELDS + ("sun_timer",)
+
     def __init__(self):
         super().__init__(name="向日葵", health=30, cost=50)
         self.sun_production = 25  # 每回合产生的阳光
@@ -78,10 +148,22 @@ class Sunflower(Plant):
             return self.sun_production
         return 0
 
+    def ticks_until_event(self, board):
+        ticks = max(self.production_cooldown - self.sun_timer, 1)  # 下一次产生阳光
+        other = super().ticks_until_event(board)
+        return ticks if other is None else min(ticks, other)
+
+    def skip_ticks(self, ticks):
+        super().skip_ticks(ticks)
+        self.sun_timer += ticks
 
+
+@register_plant("peashooter", glyph="豌", color="#aaffaa")
 class Peashooter(Plant):
     """豌豆射手：基础攻击植物"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="豌豆射手",
@@ -93,9 +175,12 @@ class Peashooter(Plant):
         )
 
 
+@register_plant("wallnut", glyph="坚", color="#aaaaaa")
 class WallNut(Plant):
     """坚果墙：高生命值，用于阻挡僵尸"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="坚果墙",
@@ -105,9 +190,14 @@ class WallNut(Plant):
         )
 
 
+@register_plant("cherrybomb", glyph="樱", color="#ffaaaa")
 class CherryBomb(Plant):
     """樱桃炸弹：范围攻击，一次性使用"""
 
+    __slots__ = ("used",)
+    SNAPSHOT_FIELDS = Plant.SNAPSHOT_FIELDS + ("used",)
+    ROW_REACH = 1
+
     def __init__(self):
         super().__init__(
             name="樱桃炸弹",
@@ -118,21 +208,23 @@ class CherryBomb(Plant):
         )
         self.used = False
 
-    def attack(self, zombies):
+    def ticks_until_event(self, board):
+        return 1  # 下一回合爆炸，之后被移除
+
+    def attack(self, board):
         if self.used or not self.position:
             return []
 
         self.used = True
         self.health = 0  # 攻击后消失
+        self.dealt = 0
 
-        # 攻击范围内的所有僵尸
+        # 攻击以自身为中心3x3范围内的所有僵尸
         attacked_zombies = []
         row, col = self.position
-        for zombie in zombies:
-            z_row, z_col = zombie.position
-            # 检查是否在2x2范围内
-            if abs(z_row - row) <= 1 and abs(z_col - col) <= 1:
-                zombie.take_damage(self.attack_power)
+        for zombie in board.zombies_in(row - 1, row + 1, col - 1, col + 1):
+            if zombie.is_alive():
+                self.dealt += zombie.take_damage(self.attack_power)
                 attacked_zombies.append(zombie)
 
         return attacked_zombies
@@ -141,14 +233,13 @@ class CherryBomb(Plant):
 # 植物工厂，用于创建植物
 class PlantFactory:
     @staticmethod
-    def create_plant(plant_type):
-        if plant_type == "sunflower":
-            return Sunflower()
-        elif plant_type == "peashooter":
-            return Peashooter()
-        elif plant_type == "wallnut":
-            return WallNut()
-        elif plant_type == "cherrybomb":
-            return CherryBomb()
-        else:
+    def get_type(plant_type):
+        """查询已登记的植物类型"""
+        entry = PLANT_REGISTRY.get(plant_type)
+        if entry is None:
             raise ValueError(f"未知植物类型: {plant_type}")
+        return entry
+
+    @staticmethod
+    def create_plant(plant_type):
+        return PlantFactory.get_type(plant_type).cls()
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+from multiprocessing import Pool
+
+from engine import GameEngine
+from strategies import STRATEGY_NAMES, create_strategy
+
+
+class SweepStats:
+    """一组 (关卡, 策略) 对局的汇总数据，只保存计数和累加值，内存占用与对局数无关"""
+
+    def __init__(self, sample_every):
+        self.sample_every = sample_every  # 阳光曲线的采样间隔（回合）
+        self.games = 0
+        self.wins = 0
+        self.losses = 0
+        self.timeouts = 0  # 到达回合上限仍未结束
+        self.ticks = 0  # 所有对局的总回合数
+        self.breach_ticks = {}  # 失守回合 -> 次数
+        self.sun_sum = []  # 第 i 个采样点的阳光总和
+        self.sun_count = []  # 第 i 个采样点仍在进行的对局数
+
+    def add_game(self, engine, sun_samples):
+        """记录一局的结果"""
+        self.games += 1
+        self.ticks += engine.tick
+        if engine.result == "win":
+            self.wins += 1
+        elif engine.result == "lose":
+            self.losses += 1
+            self.breach_ticks[engine.tick] = self.breach_ticks.get(engine.tick, 0) + 1
+        else:
+            self.timeouts += 1
+        for i, sun in enumerate(sun_samples):
+            if i == len(self.sun_sum):
+                self.sun_sum.append(0)
+                self.sun_count.append(0)
+            self.sun_sum[i] += sun
+            self.sun_count[i] += 1
+
+    def merge(self, other):
+        """合并另一份汇总数据"""
+        self.games += other.games
+        self.wins += other.wins
+        self.losses += other.losses
+        self.timeouts += other.timeouts
+        self.ticks += other.ticks
+        for tick, count in other.breach_ticks.items():
+            self.breach_ticks[tick] = self.breach_ticks.get(tick, 0) + count
+        for i in range(len(other.sun_sum)):
+            if i == len(self.sun_sum):
+                self.sun_sum.append(0)
+                self.sun_count.append(0)
+            self.sun_sum[i] += other.sun_sum[i]
+            self.sun_count[i] += other.sun_count[i]
+
+    def breach_percentile(self, fraction):
+        """失守回合的分位数"""
+        if not self.losses:
+            return None
+        target = fraction * self.losses
+        seen = 0
+        for tick in sorted(self.breach_ticks):
+            seen += self.breach_ticks[tick]
+            if seen >= target:
+                return tick
+        return max(self.breach_ticks)
+
+    def summary(self):
+        """生成可序列化的统计结果"""
+        return {
+            "games": self.games,
+            "win_rate": self.wins / self.games if self.games else 0.0,
+            "loss_rate": self.losses / self.games if self.games else 0.0,
+            "timeout_rate": self.timeouts / self.games if self.games else 0.0,
+            "mean_ticks": self.ticks / self.games if self.games else 0.0,
+            "breach_tick": {
+                "min": min(self.breach_ticks) if self.breach_ticks else None,
+                "p50": self.breach_percentile(0.5),
+                "p90": self.breach_percentile(0.9),
+                "max": max(self.breach_ticks) if self.breach_ticks else None,
+            },
+            "sun_curve": {
+                "sample_every": self.sample_every,
+                "mean": [round(total / count, 2) for total, count in zip(self.sun_sum, self.sun_count)],
+            },
+        }
+
+
+# ---- 工作进程 ----
+
+_worker = {}
+
+
+def _init_worker(rows, cols, max_ticks, sample_every, event_driven=False):
+    """每个工作进程初始化一次，之后的对局都复用这里创建的引擎和策略（按种子重置）"""
+    _worker["event_driven"] = event_driven
+    _worker["rows"] = rows
+    _worker["cols"] = cols
+    _worker["max_ticks"] = max_ticks
+    _worker["sample_every"] = sample_every
+    _worker["engines"] = {}
+    _worker["strategies"] = {}
+
+
+def _run_chunk(task):
+    """运行一段连续种子的对局，只返回汇总数据"""
+    level_number, strategy_name, seed_start, seed_end = task
+    rows, cols = _worker["rows"], _worker["cols"]
+    max_ticks, sample_every = _worker["max_ticks"], _worker["sample_every"]
+    event_driven = _worker["event_driven"]
+
+    engine = _worker["engines"].get(level_number)
+    if engine is None:
+        engine = _worker["engines"][level_number] = GameEngine(level_number, rows, cols)
+    strategy = _worker["strategies"].get(strategy_name)
+    if strategy is None:
+        strategy = _worker["strategies"][strategy_name] = create_strategy(strategy_name, rows, cols)
+
+    stats = SweepStats(sample_every)
+    for seed in range(seed_start, seed_end):
+        engine.reset(seed)
+        strategy.reset()
+        sun_samples = []
+        while engine.result is None and engine.tick < max_ticks:
+            if engine.tick % sample_every == 0:
+                sun_samples.append(engine.sun)
+            strategy(engine)
+            if event_driven:
+                # 空闲回合里局面不变，策略不会有新的操作，阳光也不变，直接补上采样
+                start = engine.tick
+                engine.skip_idle(max_ticks - 1)
+                first = start + sample_every - start % sample_every
+                sun_samples.extend([engine.sun] * len(range(first, engine.tick + 1, sample_every)))
+            engine.step()
+        stats.add_game(engine, sun_samples)
+    return level_number, strategy_name, stats
+
+
+def sweep(levels, strategy_names, seed_start, seed_end, workers=None, chunk_size=200,
+          rows=5, cols=9, max_ticks=2000, sample_every=10, event_driven=False):
+    """对每个 (关卡, 策略) 组合运行 [seed_start, seed_end) 范围内的全部种子，返回汇总数据"""
+    tasks = []
+    for level_number in levels:
+        for strategy_name in strategy_names:
+            for start in range(seed_start, seed_end, chunk_size):
+                tasks.append((level_number, strategy_name, start, min(start + chunk_size, seed_end)))
+
+    results = {(level_number, name): SweepStats(sample_every) for level_number in levels for name in strategy_names}
+    with Pool(workers or os.cpu_count(), initializer=_init_worker,
+              initargs=(rows, cols, max_ticks, sample_every, event_driven)) as pool:
+        # 结果边到边合并，不保留单局数据
+        for level_number, strategy_name, stats in pool.imap_unordered(_run_chunk, tasks):
+            results[(level_number, strategy_name)].merge(stats)
+    return results
+
+
+def _parse_seeds(text):
+    """解析 "起始:结束" 形式的种子范围"""
+    start, _, end = text.partition(":")
+    return (int(start), int(end)) if end else (0, int(start))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="关卡难度蒙特卡洛统计：多进程运行大量对局，汇总各策略的胜率、阳光曲线和失守时间",
+        epilog="示例：python balance.py --level 3 --seeds 0:100000 --json result.json")
+    parser.add_argument("--level", type=int, nargs="+", default=[1, 2, 3], help="关卡编号")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGY_NAMES), choices=STRATEGY_NAMES,
+                        help="种植策略")
+    parser.add_argument("--seeds", type=_parse_seeds, default=(0, 1000), help="种子范围，如 0:100000")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为 CPU 核数")
+    parser.add_argument("--chunk-size", type=int, default=200, help="每个任务包含的对局数")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--max-ticks", type=int, default=2000, help="单局回合上限")
+    parser.add_argument("--sample-every", type=int, default=10, help="阳光曲线采样间隔")
+    parser.add_argument("--event-driven", action="store_true", help="跳过空闲回合（结果相同，稀疏关卡更快）")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    seed_start, seed_end = args.seeds
+    results = sweep(args.level, args.strategies, seed_start, seed_end, args.workers, args.chunk_size,
+                    args.rows, args.cols, args.max_ticks, args.sample_every, args.event_driven)
+
+    report = []
+    print(f"{'关卡':<6}{'策略':<18}{'对局':>8}{'胜率':>8}{'失守中位回合':>14}{'平均回合':>10}")
+    for (level_number, strategy_name), stats in results.items():
+        summary = stats.summary()
+        breach = summary["breach_tick"]["p50"]
+        print(f"{level_number:<6}{strategy_name:<18}{summary['games']:>8}{summary['win_rate']:>8.1%}"
+              f"{breach if breach is not None else '-':>14}{summary['mean_ticks']:>10.1f}")
+        report.append(dict(summary, level=level_number, strategy=strategy_name))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from engine import GameEngine
+from lanes import LaneExecutor
+from Plant import PlantFactory
+from strategies import create_strategy
+from zombie import ZombieFactory
+
+
+class Scenario:
+    """一个基准测试场景：棋盘大小、关卡、布置方式和要推进的回合数
+
+    对局提前结束时会换一个种子重新开始，直到推进够 ticks 个回合。
+    """
+
+    def __init__(self, name, ticks, qt_ticks, rows=5, cols=9, level_number=1, strategy=None, prepare=None):
+        self.name = name
+        self.ticks = ticks  # 无界面模式推进的回合数
+        self.qt_ticks = qt_ticks  # qt 模式推进的回合数（界面刷新慢得多）
+        self.rows = rows
+        self.cols = cols
+        self.level_number = level_number
+        self.strategy = strategy  # 每回合调用的策略名称，None 表示不操作
+        self.prepare = prepare  # 每局开始时布置棋盘的函数 prepare(engine)
+
+    def start(self, engine, strategy, seed):
+        """用指定种子开始新的一局"""
+        engine.reset(seed)
+        if strategy is not None:
+            strategy.reset()
+        if self.prepare is not None:
+            self.prepare(engine)
+
+
+def _plant_columns(engine, plant_type, cols):
+    """不计成本地在每一行的 cols 列种植同一种植物"""
+    cost = PlantFactory.get_type(plant_type).cost
+    for col in cols:
+        for row in range(engine.rows):
+            engine.sun += cost
+            engine.select_plant(plant_type)
+            engine.place_plant(row, col)
+
+
+def _big_board(engine):
+    # 50x200 棋盘：前排豌豆射手和坚果墙，40 波僵尸
+    engine.level.waves = [{"count": 50, "type": zombie_type, "interval": 1}
+                          for zombie_type in ("basic", "fast", "conehead", "buckethead")] * 10
+    _plant_columns(engine, "peashooter", range(4))
+    _plant_columns(engine, "wallnut", [4])
+
+
+def _zombie_horde(engine):
+    # 10000 只僵尸同时在场，每行 200 只，从第 20 列开始铺满
+    engine.level.waves = []
+    _plant_columns(engine, "wallnut", [10])
+    for i in range(10000):
+        zombie_instance = ZombieFactory.create_zombie(("basic", "conehead", "buckethead", "fast")[i % 4])
+        zombie_instance.set_position(i % engine.rows, 20 + (i // engine.rows) % (engine.cols - 20))
+        zombie_instance.spawn_order = engine.spawn_count
+        engine.spawn_count += 1
+        engine.zombies.add(zombie_instance)
+        engine.board.add_zombie(zombie_instance)
+        engine.level.zombies_remaining += 1
+
+
+def _sunflower_field(engine):
+    # 棋盘种满向日葵，只有一只很晚才出现的僵尸
+    engine.level.waves = [{"count": 1, "type": "basic", "interval": 10 ** 6}]
+    _plant_columns(engine, "sunflower", range(engine.cols))
+
+
+# 仓库附带的基准结果，由 python bench.py --json bench/baseline.json 生成；换了机器后请在本机重新生成
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "baseline.json")
+
+SCENARIOS = {
+    "level1": Scenario("level1", 20000, 2000, level_number=1, strategy="economy"),
+    "level2": Scenario("level2", 20000, 2000, level_number=2, strategy="economy"),
+    "level3": Scenario("level3", 20000, 2000, level_number=3, strategy="economy"),
+    "big_board": Scenario("big_board", 2000, 100, rows=50, cols=200, level_number=9, prepare=_big_board),
+    "zombie_horde": Scenario("zombie_horde", 300, 10, rows=50, cols=200, level_number=9, prepare=_zombie_horde),
+    "sunflower_field": Scenario("sunflower_field", 300, 50, rows=50, cols=200, level_number=9,
+                                prepare=_sunflower_field),
+}
+
+
+class QtView:
+    """离屏 Qt 界面：棋盘和信息面板，每回合按 game_loop 的方式刷新；painted 为 True 时使用自绘棋盘"""
+
+    def __init__(self, rows, cols, painted=False):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PySide6.QtWidgets import QApplication, QWidget, QHBoxLayout
+        from main import GameBoard, GameInfo, PaintedBoard
+
+        self.app = QApplication.instance() or QApplication([])
+        self.window = QWidget()
+        layout = QHBoxLayout(self.window)
+        if painted:
+            board_widget = self.board = PaintedBoard(rows, cols, 24)
+        else:
+            board_widget = QWidget()
+            board_widget.setStyleSheet(GameBoard.STYLE_SHEET)
+            self.board = GameBoard(rows, cols, board_widget)
+        self.info = GameInfo()
+        layout.addWidget(board_widget)
+        layout.addLayout(self.info)
+        self.window.show()
+
+    def update(self, engine, events):
+        self.info.add_logs(events)
+        self.info.update_sun(engine.sun)
+        self.board.render(engine.plants, engine.zombies)
+        self.info.update_wave(engine.level.get_current_wave_info())
+        self.app.processEvents()
+
+    def close(self):
+        self.window.close()
+        self.window.deleteLater()
+        self.app.processEvents()
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def _drive(scenario, ticks, view=None, latencies=None, lanes=None):
+    """推进 ticks 个回合；latencies 不为 None 时记录每回合耗时（纳秒），lanes 为按行并行的执行器"""
+    engine = GameEngine(scenario.level_number, scenario.rows, scenario.cols)
+    engine.lanes = lanes
+    strategy = create_strategy(scenario.strategy, scenario.rows, scenario.cols) if scenario.strategy else None
+    seed = 0
+    scenario.start(engine, strategy, seed)
+    clock = time.perf_counter_ns
+    for _ in range(ticks):
+        if engine.game_over:
+            seed += 1
+            scenario.start(engine, strategy, seed)
+        start = clock()
+        if strategy is not None:
+            strategy(engine)
+        events = engine.step()
+        if view is not None:
+            view.update(engine, events)
+        if latencies is not None:
+            latencies.append(clock() - start)
+
+
+def run_scenario(scenario, mode, scale=1.0, memory=True, lane_workers=None):
+    """运行一个场景，mode 为 "headless"、"lanes"（按行并行，lane_workers 个线程）、"qt" 或 "qt_painted"，返回测量结果"""
+    headless = mode in ("headless", "lanes")
+    ticks = max(int((scenario.ticks if headless else scenario.qt_ticks) * scale), 1)
+    view = QtView(scenario.rows, scenario.cols, mode == "qt_painted") if not headless else None
+    lanes = LaneExecutor(lane_workers) if mode == "lanes" else None
+    try:
+        latencies = []
+        start = time.perf_counter()
+        _drive(scenario, ticks, view, latencies, lanes)
+        seconds = time.perf_counter() - start
+        result = {
+            "scenario": scenario.name,
+            "mode": mode,
+            "ticks": ticks,
+            "seconds": round(seconds, 4),
+            "ticks_per_sec": round(ticks / seconds, 1),
+        }
+        latencies.sort()
+        result["p50_us"] = round(_percentile(latencies, 0.5) / 1000, 1)
+        result["p99_us"] = round(_percentile(latencies, 0.99) / 1000, 1)
+
+        if memory:
+            # 内存统计单独跑一遍：tracemalloc 本身会拖慢速度
+            blocks = sys.getallocatedblocks()
+            tracemalloc.start()
+            _drive(scenario, ticks, view, lanes=lanes)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result["alloc_peak_kb"] = round(peak / 1024, 1)
+            result["alloc_net_kb"] = round(current / 1024, 1)
+            result["alloc_blocks_net"] = sys.getallocatedblocks() - blocks
+        result["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return result
+    finally:
+        if view is not None:
+            view.close()
+        if lanes is not None:
+            lanes.close()
+
+
+def measure_startup(runs=10):
+    """冷启动测量：用新进程运行 runs 次 cli.py run 的短对局，记录每次从启动到退出的时间
+
+    结果按场景的格式给出（回合数即启动次数），可以和基准结果一起比较；另外用 -X importtime
+    运行一次，检查命令行入口是否导入了 PySide6。
+    """
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py"),
+               "run", "--level", "1", "--seed", "0", "--max-ticks", "100"]
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter_ns()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        latencies.append(time.perf_counter_ns() - start)
+    imports = subprocess.run(command[:1] + ["-X", "importtime"] + command[1:], stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, text=True, check=True).stderr
+    latencies.sort()
+    seconds = sum(latencies) / 1e9
+    return {
+        "scenario": "cold_start",
+        "mode": "cli",
+        "ticks": runs,
+        "seconds": round(seconds, 4),
+        "ticks_per_sec": round(runs / seconds, 1),
+        "p50_us": round(_percentile(latencies, 0.5) / 1000, 1),
+        "p99_us": round(_percentile(latencies, 0.99) / 1000, 1),
+        "imports_qt": "PySide6" in imports,
+    }
+
+
+def compare(results, baseline, threshold):
+    """和基准结果比较，返回退化的条目：吞吐量下降或 p99 延迟上升超过 threshold"""
+    old = {(entry["scenario"], entry["mode"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        reference = old.get((entry["scenario"], entry["mode"]))
+        if reference is None:
+            continue
+        entry["baseline_ticks_per_sec"] = reference["ticks_per_sec"]
+        entry["speedup"] = round(entry["ticks_per_sec"] / reference["ticks_per_sec"], 3)
+        if (entry["ticks_per_sec"] < reference["ticks_per_sec"] * (1 - threshold)
+                or entry["p99_us"] > reference["p99_us"] * (1 + threshold)):
+            regressions.append(entry)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="游戏循环和界面刷新的基准测试：测量吞吐量、单回合延迟分位数和内存分配，并和基准结果比较",
+        epilog="示例：python bench.py --json now.json --baseline base.json；"
+               "更新仓库的基准：python bench.py --json bench/baseline.json --baseline none")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS), help="测试场景")
+    parser.add_argument("--modes", nargs="+", default=["headless", "qt", "qt_painted"],
+                        choices=["headless", "lanes", "qt", "qt_painted"],
+                        help="headless 只跑引擎，lanes 按行并行推进，qt 同时在离屏 Qt 中刷新界面，qt_painted 使用自绘棋盘")
+    parser.add_argument("--lane-workers", type=int, default=None, help="lanes 模式的线程数，默认为 CPU 核数")
+    parser.add_argument("--scale", type=float, default=1.0, help="回合数缩放比例")
+    parser.add_argument("--no-memory", action="store_true", help="跳过内存统计")
+    parser.add_argument("--startup-runs", type=int, default=10, help="冷启动测量的启动次数，0 表示跳过")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="基准结果 JSON 文件，用于检查性能退化，默认为 bench/baseline.json；none 表示不比较")
+    parser.add_argument("--threshold", type=float, default=0.1, help="允许的退化比例")
+    args = parser.parse_args(argv)
+
+    modes = list(args.modes)
+    if importlib.util.find_spec("PySide6") is None and any(mode.startswith("qt") for mode in modes):
+        print("未安装 PySide6，跳过 qt 模式")
+        modes = [mode for mode in modes if not mode.startswith("qt")]
+
+    results = []
+    print(f"{'场景':<18}{'模式':<10}{'回合/秒':>12}{'p50(us)':>10}{'p99(us)':>10}{'分配峰值(KB)':>14}")
+    if args.startup_runs > 0:
+        # 冷启动：回合/秒一栏为每秒启动次数，p50/p99 为单次启动到退出的时间
+        entry = measure_startup(args.startup_runs)
+        results.append(entry)
+        print(f"{'cold_start':<18}{'cli':<10}{entry['ticks_per_sec']:>12.1f}{entry['p50_us']:>10.1f}"
+              f"{entry['p99_us']:>10.1f}{'-':>14}")
+        if entry["imports_qt"]:
+            print("警告：命令行入口导入了 PySide6")
+    for name in args.scenarios:
+        for mode in modes:
+            entry = run_scenario(SCENARIOS[name], mode, args.scale, not args.no_memory, args.lane_workers)
+            results.append(entry)
+            print(f"{name:<18}{mode:<10}{entry['ticks_per_sec']:>12.1f}{entry['p50_us']:>10.1f}"
+                  f"{entry['p99_us']:>10.1f}{entry.get('alloc_peak_kb', '-'):>14}")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "gil": getattr(sys, "_is_gil_enabled", lambda: True)(),  # 无 GIL 构建上 lanes 模式才会加速
+        "results": results,
+    }
+    regressions = []
+    if args.baseline and args.baseline != "none":
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        report["regressions"] = [(entry["scenario"], entry["mode"]) for entry in regressions]
+        for entry in regressions:
+            print(f"性能退化：{entry['scenario']} ({entry['mode']}) 回合/秒 {entry['ticks_per_sec']}，"
+                  f"基准 {entry['baseline_ticks_per_sec']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import argparse
+import importlib
+import json
+import sys
+import time
+
+# 交给各模块自己的命令行入口处理的子命令：子命令 -> (模块, 说明)
+# 模块只在执行对应子命令时才导入，启动时只加载 argparse
+MODULE_COMMANDS = {
+    "replay": ("replay", "无界面回放录像文件"),
+    "bench": ("bench", "游戏循环和界面刷新的基准测试"),
+    "balance": ("balance", "关卡难度蒙特卡洛统计"),
+    "plan": ("planner", "用规划器自动通关"),
+    "estimate": ("estimator", "解析估计布置能否守住关卡"),
+    "watch": ("sharedboard", "读取共享内存中的实时局面"),
+    "env": ("vecenv", "向量化训练环境的吞吐量测试"),
+    "serve": ("server", "多会话游戏服务器"),
+}
+
+
+def run_headless(argv):
+    """无界面运行一局游戏并输出结果"""
+    from engine import GameEngine
+    from strategies import STRATEGY_NAMES, create_strategy
+
+    parser = argparse.ArgumentParser(prog="cli.py run", description="无界面运行一局游戏")
+    parser.add_argument("--level", type=int, default=1, help="关卡编号")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=None, help="随机数种子，默认随机")
+    parser.add_argument("--strategy", default="economy", choices=STRATEGY_NAMES, help="种植策略")
+    parser.add_argument("--max-ticks", type=int, default=2000, help="回合上限")
+    parser.add_argument("--event-driven", action="store_true", help="跳过空闲回合（结果相同）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--telemetry", help="把逐回合遥测数据写入这个目录，之后用 telemetry.load 读取")
+    parser.add_argument("--lanes", type=int, default=0, help="按行并行推进使用的线程数（结果相同），0 表示不并行")
+    parser.add_argument("--shared", help="每回合把局面发布到这个共享内存文件，用 cli.py watch 读取")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    engine = GameEngine(args.level, args.rows, args.cols, seed=args.seed)
+    strategy = create_strategy(args.strategy, args.rows, args.cols)
+    recorder = None
+    if args.telemetry:
+        from telemetry import TelemetryRecorder
+        recorder = TelemetryRecorder(args.telemetry, engine)
+    lanes = None
+    if args.lanes:
+        from lanes import LaneExecutor
+        lanes = LaneExecutor(args.lanes, engine)
+    shared = None
+    if args.shared:
+        from sharedboard import SharedBoardWriter
+        shared = SharedBoardWriter(args.shared, args.rows, args.cols, engine=engine)
+    while engine.result is None and engine.tick < args.max_ticks:
+        strategy(engine)
+        if args.event_driven:
+            engine.skip_idle(args.max_ticks - 1)
+        engine.step()
+    if recorder is not None:
+        recorder.close()
+    if lanes is not None:
+        lanes.close()
+    if shared is not None:
+        shared.close()
+    result = {
+        "level": args.level,
+        "seed": engine.seed,
+        "strategy": args.strategy,
+        "result": engine.result,
+        "tick": engine.tick,
+        "sun": engine.sun,
+        "plants": len(engine.plants),
+        "zombies": len(engine.zombies),
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print(f"关卡 {args.level}，种子 {engine.seed}，策略 {args.strategy}：结果 {engine.result or '未结束'}，"
+              f"回合 {engine.tick}，阳光 {engine.sun}，植物 {len(engine.plants)}，僵尸 {len(engine.zombies)}，"
+              f"耗时 {result['ms']} 毫秒")
+    return 0
+
+
+def run_gui(argv):
+    """启动图形界面；只有这里才导入 PySide6"""
+    parser = argparse.ArgumentParser(prog="cli.py gui", description="启动图形界面")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--fps", type=int, default=30, help="最高帧率")
+    parser.add_argument("--replay-dir", help="把每局的操作录像保存到这个目录")
+    parser.add_argument("--shared", help="把实时局面发布到这个共享内存文件，用 cli.py watch 读取")
+    args = parser.parse_args(argv)
+
+    import main as gui
+    return gui.run(args.replay_dir, args.rows, args.cols, args.fps, args.shared)
+
+
+def main(argv=None):
+    commands = "；".join(f"{name}：{text}" for name, (_, text) in MODULE_COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        description="命令行入口：无界面运行、回放、基准测试等都不会导入 Qt，只有 gui 子命令才加载界面",
+        epilog=f"run：无界面运行一局；gui：启动图形界面；{commands}。示例：python cli.py run --level 3 --seed 1")
+    parser.add_argument("command", choices=["run", "gui"] + list(MODULE_COMMANDS), help="子命令")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="子命令的参数，用 <子命令> -h 查看")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        return run_headless(args.args)
+    if args.command == "gui":
+        return run_gui(args.args)
+    return importlib.import_module(MODULE_COMMANDS[args.command][0]).main(args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+import random
+
+from Plant import PlantFactory
+from zombie import ZombieFactory
+from level import Level
+from spatial import LaneIndex
+from store import EntityStore
+
+
+class GameEvent:
+    """游戏事件，描述一个回合内发生的一件事"""
+
+    # 事件类型
+    SPAWN = "spawn"  # 僵尸出现
+    SUN = "sun"  # 向日葵产生阳光
+    ATTACK = "attack"  # 植物攻击僵尸
+    ZOMBIE_KILLED = "zombie_killed"  # 僵尸被消灭
+    PLANT_DESTROYED = "plant_destroyed"  # 植物被摧毁
+    BREACH = "breach"  # 僵尸到达终点，游戏失败
+    LEVEL_COMPLETE = "level_complete"  # 关卡完成
+    PLANT_SELECTED = "plant_selected"  # 选择植物
+    SELECT_FAILED = "select_failed"  # 阳光不足，无法选择
+    PLANTED = "planted"  # 种植成功
+    CELL_OCCUPIED = "cell_occupied"  # 该位置已有植物
+    PLACE_FAILED = "place_failed"  # 阳光不足，无法种植
+
+    # 日志文本模板
+    MESSAGES = {
+        SPAWN: "{zombie} 出现了!",
+        SUN: "向日葵产生了 {amount} 点阳光",
+        ATTACK: "{plant} 攻击了 {zombie}，造成 {damage} 点伤害",
+        ZOMBIE_KILLED: "{zombie} 被消灭了!",
+        PLANT_DESTROYED: "{plant} 被摧毁了!",
+        BREACH: "僵尸到达终点，游戏失败!",
+        LEVEL_COMPLETE: "第 {level} 关完成!",
+        PLANT_SELECTED: "已选择: {plant}",
+        SELECT_FAILED: "阳光不足，无法选择 {plant}",
+        PLANTED: "已种植 {plant} 在位置 ({row_display}, {col_display})",
+        CELL_OCCUPIED: "该位置已种植植物",
+        PLACE_FAILED: "阳光不足，无法种植 {plant}",
+    }
+
+    def __init__(self, kind, tick, **data):
+        self.kind = kind  # 事件类型
+        self.tick = tick  # 发生的回合
+        self.data = data  # 事件附带的数据
+
+    def message(self):
+        """生成日志文本"""
+        data = self.data
+        if "row" in data:
+            data = dict(data, row_display=data["row"] + 1, col_display=data["col"] + 1)
+        return self.MESSAGES[self.kind].format(**data)
+
+    def __repr__(self):
+        return f"GameEvent({self.kind!r}, tick={self.tick}, {self.data!r})"
+
+
+def _spawn_order(zombie_instance):
+    return zombie_instance.spawn_order
+
+
+class GameEngine:
+    """无界面的游戏引擎，持有植物、僵尸、关卡和阳光，按回合推进游戏"""
+
+    def __init__(self, level_number=1, rows=5, cols=9, seed=None):
+        self.level_number = level_number  # 关卡编号
+        self.rows = rows  # 游戏行数
+        self.cols = cols  # 游戏列数
+        self.rng = random.Random()  # 本局专用的随机数生成器，用于选择僵尸出生行
+        self.recorder = None  # 可选的录像记录器，见 replay.ReplayRecorder
+        self.profiler = None  # 可选的分阶段性能统计，见 profiler.PhaseProfiler
+        self.telemetry = None  # 可选的逐回合遥测记录，见 telemetry.TelemetryRecorder
+        self.lanes = None  # 可选的按行并行执行器，挂载后由它推进回合，见 lanes.LaneExecutor
+        self.shared = None  # 可选的共享内存局面，每回合结束时发布给其他进程，见 sharedboard.SharedBoardWriter
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """重置为关卡初始状态；不指定种子时随机生成一个，保证每局都能复现"""
+        self.seed = seed if seed is not None else random.randrange(2 ** 63)
+        self.rng.seed(self.seed)
+        self.level = Level(self.level_number, self.rows, self.cols)
+        self.plants = EntityStore()
+        self.zombies = EntityStore()
+        self.spawn_count = 0  # 已生成的僵尸总数
+        self.board = LaneIndex(self.rows, self.cols)  # 按行的占位索引，用于范围和碰撞查询
+        self.sun = 50
+        self.tick = 0  # 已推进的回合数
+        self.selected_plant = None  # 当前选择的植物类型
+        self.result = None  # 游戏结果：None 进行中，"win" 胜利，"lose" 失败
+
+    @property
+    def game_over(self):
+        """游戏是否已经结束（胜利或失败）"""
+        return self.result is not None
+
+    def select_plant(self, plant_type):
+        """选择要种植的植物，返回对应事件"""
+        if self.recorder is not None:
+            self.recorder.record_select(self.tick, plant_type)
+
+        # 从类型登记表读取植物成本
+        plant_info = PlantFactory.get_type(plant_type)
+
+        if self.sun >= plant_info.cost:
+            self.selected_plant = plant_type
+            return GameEvent(GameEvent.PLANT_SELECTED, self.tick, plant=plant_info.name)
+        self.selected_plant = None
+        return GameEvent(GameEvent.SELECT_FAILED, self.tick, plant=plant_info.name)
+
+    def place_plant(self, row, col):
+        """在指定位置种植已选择的植物，返回对应事件；没有选择植物时返回 None"""
+        if self.recorder is not None:
+            self.recorder.record_place(self.tick, row, col)
+
+        if self.result is not None or not self.selected_plant:
+            return None
+
+        # 检查位置是否已种植植物
+        if self.board.plant_at(row, col) is not None:
+            return GameEvent(GameEvent.CELL_OCCUPIED, self.tick, row=row, col=col)
+
+        # 检查成本
+        plant_info = PlantFactory.get_type(self.selected_plant)
+        if self.sun < plant_info.cost:
+            return GameEvent(GameEvent.PLACE_FAILED, self.tick, plant=plant_info.name)
+
+        # 扣除阳光并种植植物，然后取消选择
+        self.sun -= plant_info.cost
+        plant_instance = plant_info.cls()
+        plant_instance.set_position(row, col)
+        self.plants.add(plant_instance)
+        self.board.add_plant(plant_instance)
+        self.selected_plant = None
+        return GameEvent(GameEvent.PLANTED, self.tick, plant=plant_instance.name, row=row, col=col)
+
+    def step(self):
+        """推进一个回合，返回本回合产生的事件列表"""
+        if self.lanes is not None:
+            return self.lanes.step(self)
+        if self.result is not None:
+            return []
+
+        self.tick += 1
+        tick = self.tick
+        events = []
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin(tick)
+
+        # 1. 生成新僵尸
+        self._spawn(events)
+        if profiler is not None:
+            profiler.lap(profiler.SPAWN)
+
+        # 2. 植物更新，向日葵产生阳光（已被摧毁的向日葵不再产生阳光）
+        for plant_instance in self.plants:
+            sun_produced = plant_instance.update()
+            if sun_produced and plant_instance.is_alive():
+                self.sun += sun_produced
+                events.append(GameEvent(GameEvent.SUN, tick, amount=sun_produced))
+        if profiler is not None:
+            profiler.lap(profiler.SUN)
+            profiler.count(profiler.PLANTS, len(self.plants))
+
+        # 3. 植物攻击
+        board = self.board
+        plants = self.plants.items
+        telemetry = self.telemetry
+        attacks = 0
+        i = 0
+        while i < len(plants):
+            plant_instance = plants[i]
+            if plant_instance.is_alive():
+                attacked = plant_instance.attack(board)
+                attacks += len(attacked)
+                if attacked and telemetry is not None:
+                    telemetry.damage(tick, plant_instance, plant_instance.dealt)
+                for zombie_instance in attacked:
+                    if zombie_instance.is_alive():
+                        events.append(GameEvent(GameEvent.ATTACK, tick, plant=plant_instance.name,
+                                                zombie=zombie_instance.name,
+                                                damage=plant_instance.attack_power))
+                    else:
+                        # 被消灭的僵尸立即移除，后续植物不会再选中它
+                        self.zombies.remove(zombie_instance)
+                        board.remove_zombie(zombie_instance)
+                        events.append(GameEvent(GameEvent.ZOMBIE_KILLED, tick, zombie=zombie_instance.name))
+                        self.sun += zombie_instance.reward
+                        self.level.zombie_eliminated()
+                i += 1
+            else:
+                # 移除已死亡的植物；末尾的植物会被移到位置 i，下一轮处理
+                events.append(GameEvent(GameEvent.PLANT_DESTROYED, tick, plant=plant_instance.name))
+                self.plants.remove(plant_instance)
+                board.remove_plant(plant_instance)
+        if profiler is not None:
+            profiler.lap(profiler.ATTACK)
+            profiler.count(profiler.ATTACKS, attacks)
+            profiler.count(profiler.ZOMBIE_COUNT, len(self.zombies))
+
+        # 4. 僵尸移动和攻击
+        if self._move_zombies(self.zombies, events):
+            return events
+        if profiler is not None:
+            profiler.lap(profiler.ZOMBIES)
+
+        # 5. 检查关卡是否完成
+        self._complete(events)
+        return events
+
+    def _spawn(self, events):
+        """生成本回合的僵尸（如果有）"""
+        zombie_type = self.level.get_next_zombie()
+        if zombie_type:
+            # 随机选择一行生成僵尸
+            tick = self.tick
+            row = self.rng.randint(0, self.rows - 1)
+            zombie_instance = ZombieFactory.create_zombie(zombie_type)
+            zombie_instance.set_position(row, self.cols - 1)  # 从最右侧出现
+            zombie_instance.spawn_order = self.spawn_count
+            self.spawn_count += 1
+            self.zombies.add(zombie_instance)
+            self.board.add_zombie(zombie_instance)
+            events.append(GameEvent(GameEvent.SPAWN, tick, zombie=zombie_instance.name, row=row,
+                                    col=self.cols - 1))
+            if self.telemetry is not None:
+                self.telemetry.spawn(tick, self.level.wave_counter, zombie_instance)
+
+    def _move_zombies(self, zombies, events):
+        """僵尸移动和啃食；有僵尸到达终点时返回 True
+
+        所在格子有存活植物的僵尸先按植物分组，之后按生成顺序依次啃食：
+        植物被前面的僵尸啃死后，后面的僵尸改为前进。结果与僵尸的存储顺序无关。
+        """
+        board = self.board
+        biters = None
+        for zombie_instance in zombies:
+            row, col = zombie_instance.position
+            plant_instance = board.plant_at(row, col)
+            if plant_instance is not None and plant_instance.is_alive():
+                if biters is None:
+                    biters = {}
+                biters.setdefault(plant_instance, []).append(zombie_instance)
+            else:
+                zombie_instance.target_plant = plant_instance
+                if self._advance_zombie(zombie_instance, events):
+                    return True
+        if biters:
+            for plant_instance, group in biters.items():
+                if len(group) > 1:
+                    group.sort(key=_spawn_order)
+                for zombie_instance in group:
+                    if plant_instance.is_alive():
+                        zombie_instance.bite(plant_instance)
+                    elif self._advance_zombie(zombie_instance, events):
+                        return True
+        return False
+
+    def _complete(self, events):
+        """回合结算：检查关卡是否完成，结束分阶段计时和遥测记录，发布共享局面"""
+        if self.level.is_complete():
+            self.result = "win"
+            events.append(GameEvent(GameEvent.LEVEL_COMPLETE, self.tick, level=self.level_number))
+        if self.profiler is not None:
+            self.profiler.lap(self.profiler.COMPLETE)
+        if self.telemetry is not None:
+            self.telemetry.end_tick(self)
+        if self.shared is not None:
+            self.shared.publish(self)
+
+    def _advance_zombie(self, zombie_instance, events):
+        """僵尸尝试前进；到达终点时结束游戏并返回 True"""
+        old_col = zombie_instance.position[1]
+        result = zombie_instance.advance()
+        if result == "reach_end":
+            # 僵尸到达终点，游戏结束
+            self.result = "lose"
+            events.append(GameEvent(GameEvent.BREACH, self.tick))
+            if self.profiler is not None:
+                self.profiler.lap(self.profiler.ZOMBIES)
+            if self.telemetry is not None:
+                self.telemetry.end_tick(self)
+            if self.shared is not None:
+                self.shared.publish(self)
+            return True
+        if result:
+            self.board.move_zombie(zombie_instance, old_col)
+        return False
+
+    def next_event_tick(self):
+        """下一个会发生可观察变化的回合：僵尸生成、阳光产出、攻击命中、啃食、前进、移除或关卡结束
+
+        两个事件之间的回合只有各种计时器在变化。游戏已结束或不会再发生任何变化时返回 None。
+        """
+        if self.result is not None:
+            return None
+        level = self.level
+        nearest = level.timeline.end_tick - self.tick  # 最后一波结束，可能完成关卡
+        if nearest <= 0:
+            nearest = None
+        spawn_tick = level.next_spawn_tick()
+        if spawn_tick is not None and (nearest is None or spawn_tick - self.tick < nearest):
+            nearest = spawn_tick - self.tick
+        board = self.board
+        for plant_instance in self.plants:
+            ticks = plant_instance.ticks_until_event(board)
+            if ticks is not None and (nearest is None or ticks < nearest):
+                nearest = ticks
+        for zombie_instance in self.zombies:
+            ticks = zombie_instance.ticks_until_event(board)
+            if nearest is None or ticks < nearest:
+                nearest = ticks
+        return None if nearest is None else self.tick + nearest
+
+    def skip_idle(self, limit=None):
+        """直接跳过下一个事件之前的空闲回合（最多跳到第 limit 回合），返回跳过的回合数
+
+        空闲回合里的计时器变化按公式一次算出，结果与逐回合调用 step() 相同。
+        """
+        if self.result is not None:
+            return 0
+        target = self.next_event_tick()
+        target = limit if target is None else target - 1
+        if target is None:
+            return 0
+        if limit is not None:
+            target = min(target, limit)
+        ticks = target - self.tick
+        if ticks <= 0:
+            return 0
+        for plant_instance in self.plants:
+            plant_instance.skip_ticks(ticks)
+        for zombie_instance in self.zombies:
+            zombie_instance.skip_ticks(ticks)
+        self.level.advance_to(target)
+        self.tick = target
+        return ticks
+
+    def fast_forward(self, ticks):
+        """与 run(ticks) 结果相同，但跳过空闲回合，耗时与事件数而不是回合数成正比"""
+        end = self.tick + ticks
+        events = []
+        while self.result is None and self.tick < end:
+            self.skip_idle(end - 1)
+            events.extend(self.step())
+        return events
+
+    def run(self, ticks):
+        """连续推进最多 ticks 个回合（游戏结束时提前停止），返回全部事件"""
+        events = []
+        for _ in range(ticks):
+            if self.result is not None:
+                break
+            events.extend(self.step())
+        return events
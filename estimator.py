@@ -0,0 +1,278 @@
+import argparse
+import random
+import time
+
+from Plant import PLANT_REGISTRY, PLANT_TYPES, PlantFactory
+from zombie import ZOMBIE_REGISTRY
+from engine import GameEngine
+from level import Level, SpawnTimeline
+
+
+class LaneOutcome:
+    """一只僵尸独自走过一行的结果，时间都是相对它出现的回合
+
+    killed 为被消灭的回合（挡住了），breach 为到达终点的回合（没挡住），二者只有一个不为 None；
+    bites 为 {列: (啃掉的生命值, 最后一次啃食的回合)}。
+    """
+
+    __slots__ = ("killed", "breach", "bites")
+
+    def __init__(self, killed, breach, bites):
+        self.killed = killed
+        self.breach = breach
+        self.bites = bites
+
+
+class Estimate:
+    """一次估计的结果：result 为 "win" 或 "lose"，tick 为预计结束（完成关卡或被突破）的回合，sun 为那时的阳光"""
+
+    __slots__ = ("result", "tick", "sun", "kills", "breach_row")
+
+    def __init__(self, result, tick, sun, kills, breach_row=None):
+        self.result = result
+        self.tick = tick
+        self.sun = sun
+        self.kills = kills  # 预计消灭的僵尸数
+        self.breach_row = breach_row  # 最先被突破的行
+
+    def __repr__(self):
+        return f"Estimate({self.result!r}, tick={self.tick}, sun={self.sun}, kills={self.kills})"
+
+
+def layout_of(engine):
+    """引擎当前的植物布置：{(行, 列): 植物类型}，只包括存活的植物"""
+    return {plant_instance.position: plant_instance.type_id for plant_instance in engine.plants
+            if plant_instance.is_alive()}
+
+
+class DifficultyEstimator:
+    """不模拟、直接估计一个植物布置能否守住关卡以及结束时的阳光
+
+    规则里各行互不影响（樱桃炸弹除外），植物打中范围内的每一只僵尸而不是只打最前面的一只，所以每只僵尸
+    受到的伤害只取决于它自己走过的格子。对每一行的布置（签名为各列的植物类型）预先算出各列每回合
+    受到的总伤害（吞吐量表），再对每种僵尸算出它独自走过这一行的结果（消灭用时表）：被打死的回合，
+    或到达终点的回合，以及沿途啃掉的植物生命值。两张表都按签名缓存，估计一局只需按出怪顺序查表，
+    并累计植物被啃的损耗，植物被啃死后这一行换成新的签名。
+
+    这是近似：同时啃一株植物的多只僵尸、被啃过的植物剩余生命值较少都按独自、满血处理，
+    冷却按平均速率计算；樱桃炸弹种下后第一回合就会爆炸，不计入固定布置。用来给大量候选排序，
+    有希望的再交给完整模拟验证。
+    """
+
+    def __init__(self, rows=5, cols=9):
+        self.rows = rows
+        self.cols = cols
+        self.throughput_table = {}  # 行签名 -> 各列每回合受到的伤害
+        self.outcome_table = {}  # (行签名, 僵尸类型) -> LaneOutcome
+
+    def throughput(self, signature):
+        """一行布置下僵尸在各列每回合受到的伤害"""
+        table = self.throughput_table.get(signature)
+        if table is None:
+            damage = [0.0] * self.cols
+            for col, plant_type in enumerate(signature):
+                if plant_type is not None:
+                    self._add_fire(damage, col, PLANT_REGISTRY[plant_type].prototype, 1)
+            table = self.throughput_table[signature] = tuple(damage)
+        return table
+
+    def _add_fire(self, damage, col, plant, sign):
+        if plant.attack_power > 0 and not plant.ROW_REACH:
+            rate = sign * plant.attack_power / max(plant.attack_cooldown, 1)
+            for target in range(col, min(col + plant.attack_range, self.cols - 1) + 1):
+                damage[target] += rate
+
+    def lane_outcome(self, signature, zombie_type):
+        """一种僵尸从最右列出现、独自走过这一行的结果（按签名缓存）"""
+        key = (signature, zombie_type)
+        outcome = self.outcome_table.get(key)
+        if outcome is None:
+            zombie = ZOMBIE_REGISTRY[zombie_type].prototype
+            outcome = self.outcome_table[key] = self.walk(signature, zombie_type, self.cols - 1, zombie.health, 0)
+        return outcome
+
+    def walk(self, signature, zombie_type, col, health, move_counter):
+        """从指定状态开始按回合推演一只僵尸：先挨打，再啃食所在格子的植物或尝试前进"""
+        zombie = ZOMBIE_REGISTRY[zombie_type].prototype
+        plants = [PLANT_REGISTRY[plant_type].prototype if plant_type is not None else None
+                  for plant_type in signature]
+        plant_health = [plant.health if plant is not None and not plant.ROW_REACH else 0 for plant in plants]
+        damage = list(self.throughput(signature))
+        threshold = 1 / zombie.speed
+        bites = {}
+        tick = 0
+        while True:
+            health -= damage[col]
+            if health <= 0:
+                return LaneOutcome(tick, None, bites)
+            if plant_health[col] > 0:
+                plant_health[col] -= zombie.damage
+                bitten = bites.get(col, (0, 0))[0]
+                bites[col] = (bitten + zombie.damage, tick)
+                if plant_health[col] <= 0:
+                    self._add_fire(damage, col, plants[col], -1)  # 下一回合起不再攻击
+            else:
+                move_counter += 1
+                if move_counter >= threshold:
+                    move_counter = 0
+                    col -= 1
+                    if col < 0:
+                        return LaneOutcome(None, tick, bites)
+            tick += 1
+
+    def estimate(self, layout, waves, seed=None, sun=50):
+        """估计从第 0 回合起固定布置 layout（{(行, 列): 植物类型}）对 waves 的结果
+
+        僵尸出生行：给出 seed 时和 GameEngine(seed=seed) 完全相同，否则按出现顺序轮流分到各行（平均分布）。
+        """
+        timeline = SpawnTimeline(waves)
+        rng = random.Random(seed) if seed is not None else None
+        arrivals = [(tick, zombie_type, rng.randint(0, self.rows - 1) if rng is not None else i % self.rows, None)
+                    for i, (tick, zombie_type) in enumerate(zip(timeline.spawn_ticks, timeline.spawn_types))]
+        return self._play(layout, arrivals, timeline.end_tick, sun, 0)
+
+    def estimate_engine(self, engine):
+        """从引擎的当前局面估计：场上的植物作为固定布置，场上的僵尸从当前状态继续走，之后的僵尸按引擎的随机数出生"""
+        level = engine.level
+        timeline = level.timeline
+        rng = random.Random()
+        rng.setstate(engine.rng.getstate())
+        arrivals = [(engine.tick + 1, zombie_instance.type_id, zombie_instance.position[0],
+                     (zombie_instance.position[1], zombie_instance.health, zombie_instance.move_counter))
+                    for zombie_instance in engine.zombies]
+        arrivals.extend((engine.tick + timeline.spawn_ticks[i] - level.tick, timeline.spawn_types[i],
+                         rng.randint(0, self.rows - 1), None)
+                        for i in range(level.next_spawn, len(timeline)))
+        end_tick = engine.tick + max(timeline.end_tick - level.tick, 0)
+        return self._play(layout_of(engine), arrivals, end_tick, engine.sun, engine.tick)
+
+    def _play(self, layout, arrivals, end_tick, sun, start_tick):
+        """按出现顺序查表推演每只僵尸；arrivals 为 [(出现的回合, 类型, 行, 在场僵尸的 (列, 生命值, 移动计数) 或 None)]"""
+        lanes = [[None] * self.cols for _ in range(self.rows)]
+        for (row, col), plant_type in layout.items():
+            if not PLANT_REGISTRY[plant_type].prototype.ROW_REACH:
+                lanes[row][col] = plant_type
+        signatures = [tuple(lane) for lane in lanes]
+        wear = {}  # (行, 列) -> 已被啃掉的生命值
+        destroyed = {}  # (行, 列) -> 被啃死的回合
+        kills = []  # (被消灭的回合, 奖励)
+        breach = breach_row = None
+
+        for tick, zombie_type, row, state in arrivals:
+            if breach is not None and tick >= breach:
+                break
+            if state is None:
+                outcome = self.lane_outcome(signatures[row], zombie_type)
+            else:
+                outcome = self.walk(signatures[row], zombie_type, *state)
+            if outcome.breach is not None:
+                if breach is None or tick + outcome.breach < breach:
+                    breach, breach_row = tick + outcome.breach, row
+            else:
+                kills.append((tick + outcome.killed, ZOMBIE_REGISTRY[zombie_type].prototype.reward))
+            for col, (bitten, last) in outcome.bites.items():
+                wear[row, col] = wear.get((row, col), 0) + bitten
+                if wear[row, col] >= PLANT_REGISTRY[lanes[row][col]].prototype.health:
+                    # 被啃死，这一行换成新的签名
+                    lanes[row][col] = None
+                    signatures[row] = tuple(lanes[row])
+                    destroyed[row, col] = tick + last + 1
+
+        if breach is not None:
+            result, end = "lose", breach
+        else:
+            result, end = "win", max([end_tick] + [tick for tick, _ in kills])
+        rewards = [reward for tick, reward in kills if tick <= end]
+        sun += sum(rewards)
+        for cell, plant_type in layout.items():
+            plant = PLANT_REGISTRY[plant_type].prototype
+            cooldown = getattr(plant, "production_cooldown", 0)
+            if cooldown:
+                sun += (min(destroyed.get(cell, end), end) - start_tick) // cooldown * plant.sun_production
+        return Estimate(result, end, sun, len(rewards), breach_row)
+
+
+def random_layout(rng, rows, cols, budget, plant_types=None):
+    """在 budget 阳光之内随机布置植物，返回 {(行, 列): 植物类型}"""
+    plant_types = [plant_type for plant_type in plant_types or PLANT_TYPES
+                   if not PLANT_REGISTRY[plant_type].prototype.ROW_REACH]
+    layout = {}
+    while len(layout) < rows * cols:
+        affordable = [plant_type for plant_type in plant_types if PLANT_REGISTRY[plant_type].cost <= budget]
+        if not affordable:
+            break
+        plant_type = rng.choice(affordable)
+        cell = (rng.randrange(rows), rng.randrange(cols))
+        if cell not in layout:
+            layout[cell] = plant_type
+            budget -= PLANT_REGISTRY[plant_type].cost
+    return layout
+
+
+def simulate(layout, level_number, rows, cols, seed, max_ticks=5000):
+    """完整模拟：第 0 回合布置好 layout（不花费初始阳光），之后不再操作，返回结束的引擎"""
+    engine = GameEngine(level_number, rows, cols, seed=seed)
+    for (row, col), plant_type in layout.items():
+        engine.sun += PlantFactory.get_type(plant_type).cost
+        engine.select_plant(plant_type)
+        engine.place_plant(row, col)
+    engine.fast_forward(max_ticks)
+    return engine
+
+
+def _rank_key(estimates):
+    # 先比估计守住的对局数，再比守住时的平均阳光、守不住时的平均坚持回合
+    wins = [estimate for estimate in estimates if estimate.result == "win"]
+    if wins:
+        return len(wins), sum(estimate.sun for estimate in wins) / len(wins)
+    return 0, sum(estimate.tick for estimate in estimates) / len(estimates)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="用解析估计给大量随机布置排序，只把最好的几个交给完整模拟验证",
+        epilog="示例：python estimator.py --level 3 --candidates 5000 --budget 500 --verify 5")
+    parser.add_argument("--level", type=int, default=3, help="关卡编号")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--candidates", type=int, default=2000, help="随机布置的数量")
+    parser.add_argument("--budget", type=int, default=400, help="每个布置可以花费的阳光")
+    parser.add_argument("--samples", type=int, default=4,
+                        help="每个布置估计的对局数（种子 0 起），为 0 时只按平均分布的出生行估计一次")
+    parser.add_argument("--top", type=int, default=5, help="显示排名最前的布置数")
+    parser.add_argument("--verify", type=int, default=0,
+                        help="对排名最前的布置完整模拟的对局数，种子接在估计用的种子之后")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    waves = Level(args.level, args.rows, args.cols).waves
+    estimator = DifficultyEstimator(args.rows, args.cols)
+    layouts = [random_layout(rng, args.rows, args.cols, args.budget) for _ in range(args.candidates)]
+    start = time.perf_counter()
+    seeds = list(range(args.samples)) or [None]
+    estimates = [[estimator.estimate(layout, waves, seed) for seed in seeds] for layout in layouts]
+    seconds = time.perf_counter() - start
+    count = len(layouts) * len(seeds)
+    holds = sum(all(estimate.result == "win" for estimate in group) for group in estimates)
+    print(f"估计 {count} 局用时 {seconds * 1000:.1f} 毫秒（每局 {seconds / count * 1e6:.1f} 微秒），"
+          f"预计 {holds} 个布置全部守住；缓存 {len(estimator.outcome_table)} 条消灭用时")
+
+    ranked = sorted(range(len(layouts)), key=lambda i: _rank_key(estimates[i]), reverse=True)[:args.top]
+    for i in ranked:
+        group = estimates[i]
+        wins = sum(estimate.result == "win" for estimate in group)
+        plants = " ".join(f"{PLANT_REGISTRY[plant_type].glyph}{row + 1},{col + 1}"
+                          for (row, col), plant_type in sorted(layouts[i].items()))
+        line = (f"估计 {wins}/{len(group)} 胜  回合 {max(estimate.tick for estimate in group):>4}  "
+                f"阳光 {min(estimate.sun for estimate in group):>5}  {plants}")
+        if args.verify:
+            start = args.samples
+            games = [simulate(layouts[i], args.level, args.rows, args.cols, seed)
+                     for seed in range(start, start + args.verify)]
+            wins = sum(engine.result == "win" for engine in games)
+            line += f"  模拟 {wins}/{len(games)} 胜"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
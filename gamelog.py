@@ -0,0 +1,55 @@
+from collections import deque
+from itertools import islice
+
+
+class EventLog:
+    """有界的游戏日志：环形缓冲区保存结构化事件，只在需要显示时才格式化成文本
+
+    条目可以是 GameEvent（调用 message() 生成文本）或普通字符串。
+    超出容量时最早的条目被自动丢弃。
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity  # 最多保留的条目数
+        self.entries = deque(maxlen=capacity)
+        self.unread = 0  # 上次 take_unread 之后新增的条目数
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, entry):
+        """添加一条日志"""
+        self.entries.append(entry)
+        self.unread += 1
+
+    def extend(self, entries):
+        """添加多条日志（entries 为列表）"""
+        self.entries.extend(entries)
+        self.unread += len(entries)
+
+    def clear(self):
+        """清空日志"""
+        self.entries.clear()
+        self.unread = 0
+
+    @staticmethod
+    def format(entry):
+        """把一条日志格式化为文本"""
+        return entry if isinstance(entry, str) else entry.message()
+
+    def lines(self, last=None):
+        """格式化最近 last 条日志（默认全部），按时间顺序返回"""
+        if last is None:
+            return [self.format(entry) for entry in self.entries]
+        # 从尾部倒序取，只格式化需要的条目
+        recent = [self.format(entry) for entry in islice(reversed(self.entries), last)]
+        recent.reverse()
+        return recent
+
+    def take_unread(self):
+        """取出上次调用之后新增、且仍在缓冲区内的日志文本"""
+        count = min(self.unread, len(self.entries))
+        self.unread = 0
+        if not count:
+            return []
+        return self.lines(count)
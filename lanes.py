@@ -0,0 +1,218 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from heapq import merge
+
+from engine import GameEvent
+
+
+def attack_order(plants):
+    """植物攻击阶段的处理顺序，与 GameEngine.step 相同：死亡的植物被移除时，末尾的植物移到它的位置接着处理
+
+    攻击阶段不会有植物被啃死（樱桃炸弹攻击之后才死亡，下一回合才移除），顺序可以预先算出。
+    """
+    pending = list(plants)
+    order = []
+    i = 0
+    while i < len(pending):
+        plant_instance = pending[i]
+        order.append(plant_instance)
+        if plant_instance.is_alive():
+            i += 1
+        else:
+            last = pending.pop()
+            if i < len(pending):
+                pending[i] = last
+    return order
+
+
+def _update_plants(plants):
+    """更新一块棋盘上的植物，返回 [(植物, 产生的阳光), ...]"""
+    produced = []
+    for plant_instance in plants:
+        sun_produced = plant_instance.update()
+        if sun_produced and plant_instance.is_alive():
+            produced.append((plant_instance, sun_produced))
+    return produced
+
+
+def _attack(board, tick, entries):
+    """一块棋盘上的植物按顺序攻击，被消灭的僵尸立即从占位索引中移除
+
+    entries 为 [(处理序号, 植物), ...]，返回 [(处理序号, 植物, 事件, 被消灭的僵尸, 命中数), ...]。
+    """
+    results = []
+    for seq, plant_instance in entries:
+        attacked = plant_instance.attack(board)
+        if not attacked:
+            continue
+        events = []
+        killed = []
+        for zombie_instance in attacked:
+            if zombie_instance.is_alive():
+                events.append(GameEvent(GameEvent.ATTACK, tick, plant=plant_instance.name,
+                                        zombie=zombie_instance.name, damage=plant_instance.attack_power))
+            else:
+                board.remove_zombie(zombie_instance)
+                events.append(GameEvent(GameEvent.ZOMBIE_KILLED, tick, zombie=zombie_instance.name))
+                killed.append(zombie_instance)
+        results.append((seq, plant_instance, events, killed, len(attacked)))
+    return results
+
+
+def _seq(entry):
+    return entry[0]
+
+
+class LaneExecutor:
+    """按行并行推进回合的执行器：挂到 GameEngine.lanes 上之后 step() 由它执行，结果与顺序推进完全相同
+
+    除了樱桃炸弹波及相邻的行、僵尸随机选择出生行，每一行的植物和僵尸各自演化，互不影响。
+    每个阶段把棋盘按行分成 workers 块交给线程池，各块只读写自己那几行的植物、僵尸和占位索引；
+    跨行的部分放在调用线程的同步阶段里，按顺序推进时的次序执行：
+
+        生成僵尸、关卡结算      始终在调用线程执行
+        植物更新                并行；产生的阳光和事件按植物的存储顺序汇总
+        植物攻击                以尚未爆炸的樱桃炸弹为界分段，段内各块并行，炸弹在两段之间单独结算；
+                                移除死亡的植物和被消灭的僵尸按原来的处理顺序提交，存储顺序、句柄和事件都不变
+        僵尸移动和啃食          并行；有僵尸可能到达终点的回合整个阶段按顺序执行，保证游戏在同一只僵尸处结束
+
+    有全局解释器锁的 CPython 上线程不能同时执行 Python 代码，只有在无 GIL 的构建上才会随核心数加速，
+    适合行数多、僵尸多的大棋盘。
+    """
+
+    def __init__(self, workers=None, engine=None, min_parallel=256):
+        self.workers = workers or os.cpu_count() or 1  # 棋盘分成的块数
+        self.min_parallel = min_parallel  # 一个阶段的实体少于这个数时直接在调用线程执行，线程切换比计算还贵
+        self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="lane") if self.workers > 1 else None
+        self._blocks = {}  # 行数 -> 每一行所属的块
+        if engine is not None:
+            self.attach(engine)
+
+    def attach(self, engine):
+        """挂到引擎上"""
+        engine.lanes = self
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def block_of(self, rows):
+        """每一行所属的块：相邻的行分在同一块"""
+        blocks = self._blocks.get(rows)
+        if blocks is None:
+            blocks = self._blocks[rows] = [row * self.workers // rows for row in range(rows)]
+        return blocks
+
+    def _map(self, function, buckets):
+        """对每个非空的块调用 function(块)，返回结果列表；调用线程自己也处理一块"""
+        busy = [bucket for bucket in buckets if bucket]
+        if len(busy) <= 1 or self.pool is None or sum(map(len, busy)) < self.min_parallel:
+            return [function(bucket) for bucket in busy]
+        futures = [self.pool.submit(function, bucket) for bucket in busy[1:]]
+        results = [function(busy[0])]
+        results.extend(future.result() for future in futures)
+        return results
+
+    def step(self, engine):
+        """推进一个回合，返回本回合产生的事件列表（与 GameEngine.step 的结果相同）"""
+        if engine.result is not None:
+            return []
+
+        engine.tick += 1
+        tick = engine.tick
+        events = []
+        profiler = engine.profiler
+        if profiler is not None:
+            profiler.begin(tick)
+
+        # 1. 生成新僵尸
+        engine._spawn(events)
+        if profiler is not None:
+            profiler.lap(profiler.SPAWN)
+
+        # 2. 植物更新，向日葵产生阳光
+        block_of = self.block_of(engine.rows)
+        plants = engine.plants.items
+        buckets = [[] for _ in range(self.workers)]
+        for plant_instance in plants:
+            buckets[block_of[plant_instance.position[0]]].append(plant_instance)
+        produced = [item for items in self._map(_update_plants, buckets) for item in items]
+        if produced:
+            produced.sort(key=lambda item: engine.plants.index_of(item[0]))
+            for plant_instance, sun_produced in produced:
+                engine.sun += sun_produced
+                events.append(GameEvent(GameEvent.SUN, tick, amount=sun_produced))
+        if profiler is not None:
+            profiler.lap(profiler.SUN)
+            profiler.count(profiler.PLANTS, len(plants))
+
+        # 3. 植物攻击
+        attacks = self._attack_phase(engine, events, block_of)
+        if profiler is not None:
+            profiler.lap(profiler.ATTACK)
+            profiler.count(profiler.ATTACKS, attacks)
+            profiler.count(profiler.ZOMBIE_COUNT, len(engine.zombies))
+
+        # 4. 僵尸移动和攻击；到达终点只可能发生在第 0 列、这一回合可以移动的僵尸上
+        zombies = engine.zombies.items
+        if any(zombie_instance.position[1] == 0 and zombie_instance.move_counter + 1 >= 1 / zombie_instance.speed
+               for zombie_instance in zombies):
+            if engine._move_zombies(zombies, events):
+                return events
+        else:
+            buckets = [[] for _ in range(self.workers)]
+            for zombie_instance in zombies:
+                buckets[block_of[zombie_instance.position[0]]].append(zombie_instance)
+            self._map(lambda bucket: engine._move_zombies(bucket, []), buckets)
+        if profiler is not None:
+            profiler.lap(profiler.ZOMBIES)
+
+        # 5. 检查关卡是否完成
+        engine._complete(events)
+        return events
+
+    def _attack_phase(self, engine, events, block_of):
+        """植物攻击：各块并行，樱桃炸弹在同步阶段结算；返回命中次数"""
+        board = engine.board
+        tick = engine.tick
+        attacks = 0
+        buckets = [[] for _ in range(self.workers)]
+        removed = []  # 本段中死亡的植物：(处理序号, 植物)
+        for seq, plant_instance in enumerate(attack_order(engine.plants.items)):
+            if not plant_instance.is_alive():
+                removed.append((seq, plant_instance))
+            elif plant_instance.ROW_REACH:
+                # 同步阶段：先提交这一段，再单独结算会波及相邻行的植物
+                attacks += self._commit(engine, events, buckets, removed)
+                attacks += self._commit(engine, events, [], [], _attack(board, tick, [(seq, plant_instance)]))
+                buckets = [[] for _ in range(self.workers)]
+                removed = []
+            else:
+                buckets[block_of[plant_instance.position[0]]].append((seq, plant_instance))
+        return attacks + self._commit(engine, events, buckets, removed)
+
+    def _commit(self, engine, events, buckets, removed, results=()):
+        """并行执行一段攻击，再把攻击结果和死亡的植物按处理顺序提交；返回命中次数"""
+        board = engine.board
+        tick = engine.tick
+        lanes = self._map(lambda entries: _attack(board, tick, entries), buckets)
+        telemetry = engine.telemetry
+        attacks = 0
+        for entry in merge(removed, results, *lanes, key=_seq):
+            plant_instance = entry[1]
+            if len(entry) == 2:
+                events.append(GameEvent(GameEvent.PLANT_DESTROYED, tick, plant=plant_instance.name))
+                engine.plants.remove(plant_instance)
+                board.remove_plant(plant_instance)
+                continue
+            _, _, plant_events, killed, hits = entry
+            attacks += hits
+            if telemetry is not None:
+                telemetry.damage(tick, plant_instance, plant_instance.dealt)
+            events.extend(plant_events)
+            for zombie_instance in killed:
+                engine.zombies.remove(zombie_instance)
+                engine.sun += zombie_instance.reward
+                engine.level.zombie_eliminated()
+        return attacks
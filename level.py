@@ -0,0 +1,183 @@
+from bisect import bisect_right
+
+
+class SpawnTimeline:
+    """编译后的出怪时间表：把波次设置展开成按回合排序的生成记录，只在创建关卡时计算一次
+
+    第 w 波从第 wave_starts[w] 回合开始计时，第 j 只僵尸（j 从 1 开始）在开始后的第
+    j * interval 个回合生成；一波的最后一只生成后，下一回合才进入下一波。
+    """
+
+    def __init__(self, waves):
+        self.spawn_ticks = []  # 每只僵尸的生成回合，递增
+        self.spawn_types = []  # 每只僵尸的类型
+        self.wave_starts = []  # 每一波开始的回合，最后多一项为全部波次结束的回合
+        self.wave_first = []  # 每一波第一只僵尸在生成记录中的下标（前缀计数）
+
+        start = 1
+        for wave in waves:
+            self.wave_starts.append(start)
+            self.wave_first.append(len(self.spawn_ticks))
+            for j in range(1, wave["count"] + 1):
+                self.spawn_ticks.append(start - 1 + j * wave["interval"])
+                self.spawn_types.append(wave["type"])
+            start += wave["count"] * wave["interval"]
+        self.wave_starts.append(start)
+        self.wave_first.append(len(self.spawn_ticks))
+
+    def __len__(self):
+        return len(self.spawn_ticks)
+
+    @property
+    def end_tick(self):
+        """全部波次结束（关卡可以判定完成）的回合"""
+        return self.wave_starts[-1]
+
+    def spawns_until(self, tick):
+        """第 tick 回合（含）之前生成的僵尸数量"""
+        return bisect_right(self.spawn_ticks, tick)
+
+    def wave_at(self, tick):
+        """第 tick 回合所处的波次下标；全部波次结束后为波次总数"""
+        return bisect_right(self.wave_starts, tick) - 1 if tick >= self.wave_starts[0] else 0
+
+
+class Level:
+    """关卡类，定义每个关卡的僵尸生成规则"""
+
+    def __init__(self, level_number, rows=5, cols=9):
+        self.level_number = level_number  # 关卡编号
+        self.rows = rows  # 游戏行数
+        self.cols = cols  # 游戏列数
+        self.wave_counter = 0  # 当前波次计数器
+        self.tick = 0  # 已推进的回合数
+        self.next_spawn = 0  # 下一只要生成的僵尸在时间表中的下标
+        self.zombies_remaining = 0  # 剩余僵尸数量
+        self.waves = self._setup_waves()  # 波次设置，同时编译出怪时间表
+
+    @property
+    def waves(self):
+        return self._waves
+
+    @waves.setter
+    def waves(self, waves):
+        """替换波次设置（应在关卡开始前），重新编译出怪时间表"""
+        self._waves = waves
+        self.timeline = SpawnTimeline(waves)  # 编译后的出怪时间表
+        self._wave_info = None  # 缓存的波次信息
+
+    def _setup_waves(self):
+        """设置当前关卡的僵尸波次，降低难度版本"""
+        if self.level_number == 1:
+            # 第一关：非常简单，只有少量普通僵尸
+            return [
+                {"count": 1, "type": "basic", "interval": 8},  # 第一波：数量减少，间隔延长
+                {"count": 2, "type": "basic", "interval": 6}  # 第二波：数量减少，间隔延长
+            ]
+        elif self.level_number == 2:
+            # 第二关：少量路障僵尸，主要还是普通僵尸
+            return [
+                {"count": 4, "type": "basic", "interval": 4},
+                {"count": 2, "type": "conehead", "interval": 5},  # 减少路障僵尸数量
+                {"count": 5, "type": "basic", "interval": 3}
+            ]
+        elif self.level_number == 3:
+            # 第三关：少量高级僵尸，增加普通僵尸作为主要敌人
+            return [
+                {"count": 4, "type": "basic", "interval": 4},
+                {"count": 2, "type": "fast", "interval": 5},  # 减少快速僵尸
+                {"count": 3, "type": "conehead", "interval": 4},  # 减少路障僵尸
+                {"count": 2, "type": "buckethead", "interval": 6},  # 少量铁桶僵尸
+                {"count": 5, "type": "basic", "interval": 3}
+            ]
+        else:
+            # 后续关卡可以在这里扩展
+            return [
+                {"count": 6, "type": "basic", "interval": 3},
+                {"count": 3, "type": "conehead", "interval": 4},
+                {"count": 2, "type": "buckethead", "interval": 5},
+                {"count": 2, "type": "fast", "interval": 4}
+            ]
+
+    def get_next_zombie(self):
+        """推进一个回合，返回本回合要生成的僵尸类型（没有则为 None）"""
+        self.tick += 1
+        timeline = self.timeline
+
+        # 进入新的波次
+        while self.wave_counter < len(self.waves) and timeline.wave_starts[self.wave_counter + 1] <= self.tick:
+            self.wave_counter += 1
+
+        # 检查是否到了生成僵尸的时间
+        index = self.next_spawn
+        if index < len(timeline) and timeline.spawn_ticks[index] == self.tick:
+            self.next_spawn += 1
+            self.zombies_remaining += 1
+            return timeline.spawn_types[index]
+        return None
+
+    def advance_to(self, tick):
+        """直接推进到第 tick 回合，返回这期间（不含当前回合、含 tick）生成的僵尸类型列表"""
+        if tick <= self.tick:
+            return []
+        timeline = self.timeline
+        end = timeline.spawns_until(tick)
+        spawned = timeline.spawn_types[self.next_spawn:end]
+        self.next_spawn = end
+        self.zombies_remaining += len(spawned)
+        self.tick = tick
+        self.wave_counter = min(timeline.wave_at(tick), len(self.waves))
+        return spawned
+
+    def next_spawn_tick(self):
+        """下一只僵尸的生成回合；已经全部生成时为 None"""
+        if self.next_spawn < len(self.timeline):
+            return self.timeline.spawn_ticks[self.next_spawn]
+        return None
+
+    def spawns_remaining(self):
+        """尚未生成的僵尸数量"""
+        return len(self.timeline) - self.next_spawn
+
+    @property
+    def zombies_spawned(self):
+        """当前波次已生成的僵尸数量"""
+        if self.wave_counter >= len(self.waves):
+            return 0
+        return self.next_spawn - self.timeline.wave_first[self.wave_counter]
+
+    @property
+    def turn_counter(self):
+        """当前波次开始后经过的回合数"""
+        if self.wave_counter >= len(self.waves):
+            return self.tick - self.timeline.end_tick + 1
+        return self.tick - self.timeline.wave_starts[self.wave_counter] + 1
+
+    def zombie_eliminated(self):
+        """减少剩余僵尸数量"""
+        if self.zombies_remaining > 0:
+            self.zombies_remaining -= 1
+
+    def is_complete(self):
+        """检查关卡是否完成"""
+        return self.wave_counter >= len(self.waves) and self.zombies_remaining == 0
+
+    def get_current_wave_info(self):
+        """获取当前波次信息；内容不变时返回同一个字典"""
+        if self.wave_counter >= len(self.waves):
+            return None
+        spawned = self.zombies_spawned
+        info = self._wave_info
+        if info is None or info["wave_number"] != self.wave_counter + 1 or info["spawned"] != spawned:
+            current_wave = self.waves[self.wave_counter]
+            info = self._wave_info = {
+                "wave_number": self.wave_counter + 1,
+                "total_waves": len(self.waves),
+                "spawned": spawned,
+                "total": current_wave["count"],
+                "type": current_wave["type"]
+            }
+        return info
+
+    def __str__(self):
+        return f"关卡 {self.level_number} - 波次 {self.wave_counter + 1}/{len(self.waves)}"
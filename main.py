@@ -1,26 +1,40 @@
+import os
 import sys
-import random
+import time
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                                QHBoxLayout, QGridLayout, QLabel, QPushButton,
-                               QMessageBox, QTextEdit)
-from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QFont, QTextCursor
+                               QMessageBox, QPlainTextEdit, QCheckBox, QFileDialog, QScrollArea,
+                               QComboBox, QSlider)
+from PySide6.QtCore import Qt, QThread, QTimer, QRect, Signal
+from PySide6.QtGui import QFont, QTextCursor, QPainter, QPixmap, QColor, QPen
 
-from Plant import PlantFactory
-import Plant  # 显式导入plant模块用于类型检查
-from zombie import ZombieFactory
-import zombie  # 显式导入zombie模块用于类型检查
-from level import Level
+from Plant import PLANT_REGISTRY
+from engine import GameEvent
+from gamelog import EventLog
+from profiler import PhaseProfiler
+from simulation import SimulationWorker, board_looks
 
 
 class GameBoard(QGridLayout):
-    """游戏棋盘布局"""
+    """游戏棋盘布局，只重绘和上一帧相比发生变化的格子"""
+
+    # 各种格子状态的样式，通过动态属性 cell 选择，整张棋盘只解析一次；每种植物的样式来自类型登记表
+    CELL_STYLES = {
+        "empty": "#f0f0f0",
+        **{plant_type: entry.color for plant_type, entry in PLANT_REGISTRY.items()},
+        "zombie_high": "#ffaaaa",  # 生命值 > 70%
+        "zombie_mid": "#ffddaa",  # 生命值 > 30%
+        "zombie_low": "#ffffaa",
+    }
+    STYLE_SHEET = "QLabel { border: 1px solid #cccccc; }\n" + "\n".join(
+        f'QLabel[cell="{state}"] {{ background-color: {color}; }}' for state, color in CELL_STYLES.items())
 
     def __init__(self, rows, cols, parent=None):
         super().__init__(parent)
         self.rows = rows
         self.cols = cols
         self.cells = []
+        self.frame = {}  # 上一帧非空格子的显示内容：(行, 列) -> (文字, 状态)
 
         # 创建棋盘单元格
         for row in range(rows):
@@ -28,7 +42,7 @@ class GameBoard(QGridLayout):
             for col in range(cols):
                 cell = QLabel(" ")
                 cell.setAlignment(Qt.AlignCenter)
-                cell.setStyleSheet("border: 1px solid #cccccc; background-color: #f0f0f0;")
+                cell.setProperty("cell", "empty")
                 cell.setMinimumSize(60, 60)
                 cell.setMaximumSize(60, 60)
                 cell.setFont(QFont("SimHei", 12))
@@ -37,6 +51,122 @@ class GameBoard(QGridLayout):
                 row_cells.append(cell)
             self.cells.append(row_cells)
 
+    def render(self, plants, zombies):
+        """根据植物和僵尸绘制棋盘，返回本帧重绘的格子数"""
+        return self.show_looks(board_looks(plants, zombies))
+
+    def show_looks(self, frame):
+        """显示 board_looks 给出的格子内容（只更新变化的格子），返回重绘的格子数"""
+        repainted = 0
+        last = self.frame
+        for position, look in last.items():
+            if position not in frame:
+                self.set_cell(position, (" ", "empty"), look)
+                repainted += 1
+        for position, look in frame.items():
+            old = last.get(position)
+            if old != look:
+                self.set_cell(position, look, old or (" ", "empty"))
+                repainted += 1
+        self.frame = frame
+        return repainted
+
+    def set_cell(self, position, look, old):
+        """把格子从 old 显示状态更新为 look"""
+        row, col = position
+        cell = self.cells[row][col]
+        text, state = look
+        if text != old[0]:
+            cell.setText(text)
+        if state != old[1]:
+            cell.setProperty("cell", state)
+            # 动态属性变化后需要重新 polish 才会套用样式
+            style = cell.style()
+            style.unpolish(cell)
+            style.polish(cell)
+
+
+class PaintedBoard(QWidget):
+    """自绘棋盘：整张棋盘是一个控件，在 paintEvent 中贴缓存好的格子图片
+
+    控件数量和创建耗时与棋盘大小无关，适合大棋盘。接口与 GameBoard 相同（render 返回重绘的格子数），
+    点击格子时发出 cell_clicked(行, 列) 信号。
+    """
+
+    cell_clicked = Signal(int, int)
+
+    def __init__(self, rows, cols, cell_size=60, parent=None):
+        super().__init__(parent)
+        self.rows = rows
+        self.cols = cols
+        self.cell_size = cell_size  # 格子边长（像素）
+        self.frame = {}  # 上一帧非空格子的显示内容：(行, 列) -> (文字, 状态)
+        self.pixmaps = {}  # 格子图片缓存：(文字, 状态) -> QPixmap
+        self.glyph_font = QFont("SimHei", max(cell_size // 5, 6))
+        self.setFixedSize(cols * cell_size, rows * cell_size)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)  # 每次都会画满需要重绘的区域
+
+    def pixmap(self, look):
+        """取出某种显示内容的格子图片，第一次用到时绘制并缓存"""
+        pixmap = self.pixmaps.get(look)
+        if pixmap is None:
+            text, state = look
+            size = self.cell_size
+            pixmap = QPixmap(size, size)
+            pixmap.fill(QColor(GameBoard.CELL_STYLES[state]))
+            painter = QPainter(pixmap)
+            painter.setPen(QPen(QColor("#cccccc")))
+            painter.drawRect(0, 0, size - 1, size - 1)
+            if text.strip():
+                painter.setPen(QPen(Qt.black))
+                painter.setFont(self.glyph_font)
+                painter.drawText(QRect(0, 0, size, size), Qt.AlignCenter, text)
+            painter.end()
+            self.pixmaps[look] = pixmap
+        return pixmap
+
+    def render(self, plants, zombies):
+        """根据植物和僵尸更新棋盘，返回本帧重绘的格子数"""
+        return self.show_looks(board_looks(plants, zombies))
+
+    def show_looks(self, frame):
+        """显示 board_looks 给出的格子内容，只把变化的格子标记为需要重绘；返回重绘的格子数"""
+        repainted = 0
+        last = self.frame
+        size = self.cell_size
+        for position in last:
+            if position not in frame:
+                self.update(position[1] * size, position[0] * size, size, size)
+                repainted += 1
+        for position, look in frame.items():
+            if last.get(position) != look:
+                self.update(position[1] * size, position[0] * size, size, size)
+                repainted += 1
+        self.frame = frame
+        return repainted
+
+    def paintEvent(self, event):
+        """只绘制需要重绘区域内的格子"""
+        size = self.cell_size
+        rect = event.rect()
+        row_lo, row_hi = rect.top() // size, min(rect.bottom() // size, self.rows - 1)
+        col_lo, col_hi = rect.left() // size, min(rect.right() // size, self.cols - 1)
+        frame = self.frame
+        empty = self.pixmap((" ", "empty"))
+        painter = QPainter(self)
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                look = frame.get((row, col))
+                painter.drawPixmap(col * size, row * size, empty if look is None else self.pixmap(look))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        """按坐标直接算出被点击的格子"""
+        position = event.position()
+        row, col = int(position.y()) // self.cell_size, int(position.x()) // self.cell_size
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            self.cell_clicked.emit(row, col)
+
 
 class PlantSelection(QVBoxLayout):
     """植物选择面板"""
@@ -45,16 +175,9 @@ class PlantSelection(QVBoxLayout):
         super().__init__(parent)
         self.plant_buttons = {}
 
-        # 创建植物选择按钮
-        plants = [
-            ("向日葵", "sunflower", 50),
-            ("豌豆射手", "peashooter", 100),
-            ("坚果墙", "wallnut", 50),
-            ("樱桃炸弹", "cherrybomb", 150)
-        ]
-
-        for name, plant_type, cost in plants:
-            btn = QPushButton(f"{name} (¥{cost})")
+        # 为每种登记的植物创建选择按钮
+        for plant_type, entry in PLANT_REGISTRY.items():
+            btn = QPushButton(f"{entry.name} (¥{entry.cost})")
             btn.setObjectName(plant_type)
             btn.setMinimumHeight(40)
             btn.setFont(QFont("SimHei", 10))
@@ -67,7 +190,7 @@ class PlantSelection(QVBoxLayout):
 class GameInfo(QVBoxLayout):
     """游戏信息面板"""
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, log_capacity=500):
         super().__init__(parent)
 
         self.sun_label = QLabel("阳光: 50")
@@ -87,9 +210,13 @@ class GameInfo(QVBoxLayout):
         self.log_label.setFont(QFont("SimHei", 12, QFont.Bold))
         self.addWidget(self.log_label)
 
-        self.log_text = QTextEdit()
+        # 日志先进入有界的事件缓冲区，每帧合并成一次追加写入控件，控件也只保留同样多的行
+        self.log = EventLog(log_capacity)
+        self.log_flush_pending = False
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMaximumHeight(200)
+        self.log_text.setMaximumBlockCount(log_capacity)
         self.addWidget(self.log_text)
 
     def update_sun(self, sun):
@@ -105,44 +232,133 @@ class GameInfo(QVBoxLayout):
     def update_status(self, status):
         self.status_label.setText(f"状态: {status}")
 
-    def add_log(self, message):
-        self.log_text.append(message)
-        # 修复：使用正确的QTextCursor.End常量
-        self.log_text.moveCursor(QTextCursor.End)
+    def add_log(self, entry):
+        """记录一条日志（GameEvent 或字符串），文本在下一帧统一格式化显示"""
+        self.log.append(entry)
+        self.schedule_log_flush()
+
+    def add_logs(self, entries):
+        """记录多条日志"""
+        if entries:
+            self.log.extend(entries)
+            self.schedule_log_flush()
+
+    def schedule_log_flush(self):
+        # 同一轮事件循环内的日志合并到一次刷新
+        if not self.log_flush_pending:
+            self.log_flush_pending = True
+            QTimer.singleShot(0, self.flush_log)
+
+    def flush_log(self):
+        """把新日志一次性追加到日志控件"""
+        self.log_flush_pending = False
+        lines = self.log.take_unread()
+        if lines:
+            self.log_text.appendPlainText("\n".join(lines))
+            self.log_text.moveCursor(QTextCursor.End)
+
+    def clear_log(self):
+        """清空日志"""
+        self.log.clear()
+        self.log_text.clear()
+
+
+class ProfilerPanel(QVBoxLayout):
+    """性能统计面板：显示最近若干回合各阶段的平均耗时和计数，可导出记录"""
+
+    PHASE_NAMES = {
+        PhaseProfiler.SPAWN: "生成",
+        PhaseProfiler.SUN: "阳光",
+        PhaseProfiler.ATTACK: "攻击",
+        PhaseProfiler.ZOMBIES: "僵尸",
+        PhaseProfiler.COMPLETE: "结算",
+        PhaseProfiler.UI: "界面",
+    }
+    COUNTER_NAMES = {
+        PhaseProfiler.PLANTS: "植物",
+        PhaseProfiler.ZOMBIE_COUNT: "僵尸数",
+        PhaseProfiler.ATTACKS: "攻击次数",
+        PhaseProfiler.REPAINTED: "重绘格子",
+    }
+
+    def __init__(self, parent=None, window=60):
+        super().__init__(parent)
+        self.window = window  # 统计最近多少个回合
+
+        self.toggle = QCheckBox("性能统计")
+        self.addWidget(self.toggle)
+
+        self.labels = {}
+        for name in list(self.PHASE_NAMES) + list(self.COUNTER_NAMES):
+            label = QLabel()
+            label.setFont(QFont("SimHei", 9))
+            self.addWidget(label)
+            self.labels[name] = label
+
+        self.export_csv_button = QPushButton("导出 CSV")
+        self.export_json_button = QPushButton("导出 JSON")
+        self.addWidget(self.export_csv_button)
+        self.addWidget(self.export_json_button)
+        self.addStretch()
+        self.show_summary({})
+
+    def show_summary(self, summary):
+        """显示 PhaseProfiler.summary() 的结果"""
+        for phase, name in self.PHASE_NAMES.items():
+            stats = summary.get(phase)
+            text = f"{stats['mean_us'] / 1000:.2f} ms (最大 {stats['max_us'] / 1000:.2f})" if stats else "-"
+            self.labels[phase].setText(f"{name}: {text}")
+        for counter, name in self.COUNTER_NAMES.items():
+            value = summary.get(counter)
+            self.labels[counter].setText(f"{name}: {value:.1f}" if value is not None else f"{name}: -")
 
 
 class PlantsVsZombies(QMainWindow):
-    """植物大战僵尸主游戏类"""
+    """植物大战僵尸主游戏类
+
+    游戏在 SimulationWorker 的线程里推进：窗口把玩家的操作作为命令发给它，显示它发布的帧，
+    从不直接访问引擎，回合再耗时界面也能及时响应。
+    """
+
+    # 格子数超过这个值时默认使用自绘棋盘
+    PAINTED_BOARD_CELLS = 200
+    SPEEDS = (1, 2, 5, 10, 20, 50, 100, 200, 500)  # 可选的速度倍数
 
-    def __init__(self):
+    def __init__(self, replay_dir=None, rows=5, cols=9, painted_board=None, max_fps=30, shared_path=None):
         super().__init__()
         self.setWindowTitle("植物大战僵尸 - 文字版")
         self.setMinimumSize(900, 600)
 
+        # 棋盘大小和棋盘控件：painted_board 为 None 时按格子数自动选择
+        self.rows = rows
+        self.cols = cols
+        self.painted_board = painted_board if painted_board is not None else rows * cols > self.PAINTED_BOARD_CELLS
+
         # 游戏状态
         self.current_level = 1
         self.max_levels = 3
-        self.sun = 50
-        self.selected_plant = None
         self.game_running = False
         self.game_over = False
+        self.selected_plant = None  # 按钮高亮显示的植物
+        self.profiling = False
 
-        # 初始化游戏组件
-        self.init_game()
+        # 模拟线程：引擎、录像（指定 replay_dir 时）、共享局面（指定 shared_path 时）、回退快照、
+        # 提示用的规划器和性能统计都归它所有
+        self.worker = SimulationWorker(rows, cols, replay_dir, max_fps, shared_path)
+        self.worker_thread = QThread(self)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker.frame_ready.connect(self.on_frame_ready)
+        self.worker_thread.start()
 
         # 设置UI
         self.init_ui()
 
-        # 游戏计时器（每1000毫秒一个回合）
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.game_loop)
+        # 初始化游戏组件
+        self.init_game()
 
     def init_game(self):
         """初始化游戏状态"""
-        self.level = Level(self.current_level)
-        self.plants = []
-        self.zombies = []
-        self.sun = 50
+        self.worker.submit("new_game", self.current_level)
         self.game_running = False
         self.game_over = False
 
@@ -160,9 +376,18 @@ class PlantsVsZombies(QMainWindow):
         main_layout.addWidget(plant_panel)
 
         # 中间：游戏棋盘
-        board_widget = QWidget()
-        self.board = GameBoard(self.level.rows, self.level.cols)
-        board_widget.setLayout(self.board)
+        if self.painted_board:
+            # 大棋盘：单个自绘控件，放在滚动区域里
+            cell_size = 60 if self.rows * self.cols <= 400 else 24
+            self.board = PaintedBoard(self.rows, self.cols, cell_size)
+            self.board.cell_clicked.connect(self.place_plant)
+            board_widget = QScrollArea()
+            board_widget.setWidget(self.board)
+        else:
+            board_widget = QWidget()
+            board_widget.setStyleSheet(GameBoard.STYLE_SHEET)
+            self.board = GameBoard(self.rows, self.cols)
+            board_widget.setLayout(self.board)
         main_layout.addWidget(board_widget)
 
         # 右侧：游戏信息面板
@@ -172,6 +397,16 @@ class PlantsVsZombies(QMainWindow):
         info_panel.setMinimumWidth(200)
         main_layout.addWidget(info_panel)
 
+        # 信息面板旁：性能统计
+        profiler_panel = QWidget()
+        self.profiler_panel = ProfilerPanel()
+        profiler_panel.setLayout(self.profiler_panel)
+        profiler_panel.setMinimumWidth(160)
+        main_layout.addWidget(profiler_panel)
+        self.profiler_panel.toggle.toggled.connect(self.set_profiling)
+        self.profiler_panel.export_csv_button.clicked.connect(lambda: self.export_profile("csv"))
+        self.profiler_panel.export_json_button.clicked.connect(lambda: self.export_profile("json"))
+
         # 底部：控制按钮
         control_layout = QHBoxLayout()
         self.start_button = QPushButton("开始游戏")
@@ -186,6 +421,32 @@ class PlantsVsZombies(QMainWindow):
             btn.setMinimumHeight(30)
             control_layout.addWidget(btn)
 
+        # 速度选择
+        self.speed_box = QComboBox()
+        for speed in self.SPEEDS:
+            self.speed_box.addItem(f"{speed}×", speed)
+        self.speed_box.currentIndexChanged.connect(lambda index: self.set_speed(self.speed_box.itemData(index)))
+        control_layout.addWidget(QLabel("速度:"))
+        control_layout.addWidget(self.speed_box)
+
+        # 存档、撤销和回退
+        self.save_button = QPushButton("保存")
+        self.save_button.clicked.connect(self.save_game)
+        self.load_button = QPushButton("读取")
+        self.load_button.clicked.connect(self.load_game)
+        self.undo_button = QPushButton("撤销种植")
+        self.undo_button.clicked.connect(self.undo_placement)
+        self.hint_button = QPushButton("提示")
+        self.hint_button.clicked.connect(self.show_hint)
+        for btn in [self.save_button, self.load_button, self.undo_button, self.hint_button]:
+            btn.setMinimumHeight(30)
+            control_layout.addWidget(btn)
+        self.rewind_slider = QSlider(Qt.Horizontal)
+        self.rewind_slider.setMinimumWidth(120)
+        self.rewind_slider.sliderReleased.connect(self.rewind)
+        control_layout.addWidget(QLabel("回退:"))
+        control_layout.addWidget(self.rewind_slider)
+
         # 将控制布局添加到主布局
         main_layout.addLayout(control_layout)
 
@@ -193,71 +454,117 @@ class PlantsVsZombies(QMainWindow):
         for plant_type, btn in self.plant_selection.plant_buttons.items():
             btn.clicked.connect(lambda checked, pt=plant_type: self.select_plant(pt))
 
-        # 连接棋盘单元格点击事件
-        for row in range(self.level.rows):
-            for col in range(self.level.cols):
-                cell = self.board.cells[row][col]
-                # 修复：保留原始的鼠标事件处理
-                original_event = cell.mousePressEvent
-                cell.mousePressEvent = lambda event, r=row, c=col, orig=original_event: \
-                    [orig(event), self.place_plant(r, c)][-1]
+        # 连接棋盘单元格点击事件（自绘棋盘已通过 cell_clicked 信号连接）
+        if not self.painted_board:
+            for row in range(self.rows):
+                for col in range(self.cols):
+                    cell = self.board.cells[row][col]
+                    # 修复：保留原始的鼠标事件处理
+                    original_event = cell.mousePressEvent
+                    cell.mousePressEvent = lambda event, r=row, c=col, orig=original_event: \
+                        [orig(event), self.place_plant(r, c)][-1]
 
         # 更新UI显示
         self.update_ui()
 
+    def set_profiling(self, enabled):
+        """开启或关闭性能统计"""
+        self.profiling = enabled
+        self.worker.submit("profiling", self.profiler_panel.window if enabled else None)
+
+    def export_profile(self, fmt):
+        """把最近的性能记录导出为 CSV 或 JSON 文件"""
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能记录", f"profile.{fmt}", f"{fmt.upper()} (*.{fmt})")
+        if path:
+            self.worker.submit("export_profile", path, fmt)
+
     def select_plant(self, plant_type):
-        """选择要种植的植物"""
+        """选择要种植的植物；选中的按钮在收到下一帧时高亮"""
         if not self.game_running or self.game_over:
             return
-
-        # 获取植物成本
-        plant_instance = PlantFactory.create_plant(plant_type)
-
-        # 检查阳光是否足够
-        if self.sun >= plant_instance.cost:
-            self.selected_plant = plant_type
-            self.game_info.add_log(f"已选择: {plant_instance.name}")
-            # 高亮显示选中的植物按钮
-            for pt, btn in self.plant_selection.plant_buttons.items():
-                if pt == plant_type:
-                    btn.setStyleSheet("background-color: #aaffaa;")
-                else:
-                    btn.setStyleSheet("")
-        else:
-            self.game_info.add_log(f"阳光不足，无法选择 {plant_instance.name}")
-            self.selected_plant = None
+        self.worker.submit("select", plant_type)
 
     def place_plant(self, row, col):
         """在指定位置种植植物"""
-        if not self.game_running or self.game_over or not self.selected_plant:
+        if not self.game_running or self.game_over:
             return
+        self.worker.submit("place", row, col)
+
+    def save_game(self):
+        """把当前局面保存到存档文件"""
+        path, _ = QFileDialog.getSaveFileName(self, "保存游戏", f"level{self.current_level}.pvzs", "存档 (*.pvzs)")
+        if path:
+            self.worker.submit("save", path)
+
+    def load_game(self):
+        """读取存档文件"""
+        path, _ = QFileDialog.getOpenFileName(self, "读取游戏", "", "存档 (*.pvzs)")
+        if path:
+            self.worker.submit("load", path)
+
+    def undo_placement(self):
+        """撤销最近一次种植"""
+        self.worker.submit("undo")
+
+    def rewind(self):
+        """回退到滑块选择的快照"""
+        self.worker.submit("rewind", self.rewind_slider.value())
+
+    def show_hint(self):
+        """用规划器搜索下一步，建议显示在日志中"""
+        self.worker.submit("hint")
+
+    def on_frame_ready(self, frame):
+        """收到工作线程发布的帧：每一帧的事件都要处理，界面只显示最新的一帧"""
+        self.game_info.add_logs(frame.events)
+        for event in frame.events:
+            if isinstance(event, GameEvent):
+                if event.kind == GameEvent.BREACH:
+                    self.game_lost()
+                elif event.kind == GameEvent.LEVEL_COMPLETE:
+                    self.level_completed()
+        if frame.warning:
+            self.notify("读取失败", frame.warning, QMessageBox.Warning)
+        if frame.restored:
+            self.state_restored(frame)
+        if frame.seq == self.worker.published:
+            self.refresh_ui(frame)
+        # 否则后面已经有更新的帧在排队，跳过过时的这一帧
+
+    def game_lost(self):
+        """僵尸到达终点，游戏结束"""
+        self.game_over = True
+        self.game_running = False
+        self.start_button.setText("重新开始")
+        self.start_button.clicked.connect(self.start_game)
+        self.game_info.update_status("游戏失败")
+        self.notify("游戏结束", "僵尸到达终点，游戏失败!")
 
-        # 检查位置是否已种植植物
-        for plant_instance in self.plants:
-            if plant_instance.position == (row, col):
-                self.game_info.add_log("该位置已种植植物")
-                return
-
-        # 创建植物并检查成本
-        plant_instance = PlantFactory.create_plant(self.selected_plant)
-
-        if self.sun >= plant_instance.cost:
-            # 扣除阳光并种植植物
-            self.sun -= plant_instance.cost
-            plant_instance.set_position(row, col)
-            self.plants.append(plant_instance)
-            self.game_info.add_log(f"已种植 {plant_instance.name} 在位置 ({row + 1}, {col + 1})")
-
-            # 立即更新UI，确保植物显示
-            self.update_board()
-            self.game_info.update_sun(self.sun)
-
-            # 取消选择
-            self.selected_plant = None
-            for btn in self.plant_selection.plant_buttons.values():
-                btn.setStyleSheet("")
-        else:
-            self.game_info.add_log(f"阳光不足，无法种植 {plant_instance.name}")
+    def level_completed(self):
+        """关卡完成"""
+        self.game_over = True
+        self.game_running = False
+        self.game_info.update_status("关卡完成")
+        self.start_button.setText("重新开始本关")
+        self.start_button.clicked.connect(self.start_game)
+        self.next_level_button.setEnabled(True)
+        self.notify("关卡完成", f"恭喜你完成了第 {self.current_level} 关!")
+
+    def notify(self, title, text, icon=QMessageBox.Information):
+        """弹出提示但不进入嵌套的事件循环，界面照常刷新"""
+        box = QMessageBox(icon, title, text, QMessageBox.Ok, self)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.open()
+
+    def state_restored(self, frame):
+        """引擎状态被替换（读档、撤销、回退）之后更新界面"""
+        self.current_level = frame.level
+        if frame.result is None and (self.game_over or not self.game_running):
+            self.game_over = False
+            self.start_button.setText("继续游戏")
+            self.next_level_button.setEnabled(False)
+            self.game_info.update_status("已暂停")
+        self.game_info.update_level(self.current_level)
 
     def start_game(self):
         """开始或继续游戏"""
@@ -271,7 +578,11 @@ class PlantsVsZombies(QMainWindow):
         self.start_button.clicked.connect(self.pause_game)
         self.next_level_button.setEnabled(False)
         self.game_info.add_log("游戏开始!")
-        self.timer.start(1000)  # 1000毫秒 = 1秒
+        self.worker.submit("start")
+
+    def set_speed(self, speed):
+        """设置速度倍数"""
+        self.worker.submit("speed", speed)
 
     def pause_game(self):
         """暂停游戏"""
@@ -279,7 +590,7 @@ class PlantsVsZombies(QMainWindow):
         self.start_button.setText("继续游戏")
         self.start_button.clicked.connect(self.start_game)
         self.game_info.add_log("游戏已暂停")
-        self.timer.stop()
+        self.worker.submit("pause")
 
     def next_level(self):
         """进入下一关"""
@@ -293,148 +604,53 @@ class PlantsVsZombies(QMainWindow):
             QMessageBox.information(self, "游戏完成", "恭喜你完成了所有关卡!")
             self.close()
 
-    def game_loop(self):
-        """游戏主循环"""
-        if not self.game_running or self.game_over:
-            return
-
-        # 1. 生成新僵尸
-        zombie_type = self.level.get_next_zombie()
-        if zombie_type:
-            # 随机选择一行生成僵尸
-            row = random.randint(0, self.level.rows - 1)
-            zombie_instance = ZombieFactory.create_zombie(zombie_type)
-            zombie_instance.set_position(row, self.level.cols - 1)  # 从最右侧出现
-            self.zombies.append(zombie_instance)
-            self.game_info.add_log(f"{zombie_instance.name} 出现了!")
-
-        # 2. 向日葵产生阳光
-        for plant_instance in self.plants:
-            if isinstance(plant_instance, Plant.Sunflower):
-                sun_produced = plant_instance.update()
-                if sun_produced > 0:
-                    self.sun += sun_produced
-                    self.game_info.update_sun(self.sun)
-                    self.game_info.add_log(f"向日葵产生了 {sun_produced} 点阳光")
-            else:
-                plant_instance.update()
-
-        # 3. 植物攻击
-        for plant_instance in self.plants[:]:  # 使用切片避免迭代中修改列表
-            if plant_instance.is_alive():
-                attacked_zombies = plant_instance.attack(self.zombies)
-                for zombie_instance in attacked_zombies:
-                    if zombie_instance.is_alive():
-                        self.game_info.add_log(
-                            f"{plant_instance.name} 攻击了 {zombie_instance.name}，造成 {plant_instance.attack_power} 点伤害")
-                    else:
-                        self.game_info.add_log(f"{zombie_instance.name} 被消灭了!")
-                        self.sun += zombie_instance.reward
-                        self.game_info.update_sun(self.sun)
-                        self.level.zombie_eliminated()
-            else:
-                # 移除已死亡的植物
-                self.game_info.add_log(f"{plant_instance.name} 被摧毁了!")
-                self.plants.remove(plant_instance)
-
-        # 4. 僵尸移动和攻击
-        for zombie_instance in self.zombies[:]:  # 使用切片避免迭代中修改列表
-            if zombie_instance.is_alive():
-                result = zombie_instance.update(self.plants)
-                if result == "reach_end":
-                    # 僵尸到达终点，游戏结束
-                    self.game_over = True
-                    self.game_running = False
-                    self.timer.stop()
-                    self.start_button.setText("重新开始")
-                    self.start_button.clicked.connect(self.start_game)
-                    self.game_info.add_log("僵尸到达终点，游戏失败!")
-                    self.game_info.update_status("游戏失败")
-                    QMessageBox.information(self, "游戏结束", "僵尸到达终点，游戏失败!")
-                    return
-            else:
-                # 移除已死亡的僵尸
-                self.zombies.remove(zombie_instance)
-
-        # 5. 检查关卡是否完成
-        if self.level.is_complete():
-            self.game_running = False
-            self.timer.stop()
-            self.game_info.add_log(f"第 {self.current_level} 关完成!")
-            self.game_info.update_status("关卡完成")
-            self.start_button.setText("重新开始本关")
-            self.start_button.clicked.connect(self.start_game)
-            self.next_level_button.setEnabled(True)
-            QMessageBox.information(self, "关卡完成", f"恭喜你完成了第 {self.current_level} 关!")
-
-        # 6. 更新UI
-        self.update_board()
-        self.game_info.update_wave(self.level.get_current_wave_info())
-
-    def update_board(self):
-        """更新游戏棋盘显示"""
-        # 清空棋盘
-        for row in range(self.level.rows):
-            for col in range(self.level.cols):
-                self.board.cells[row][col].setText(" ")
-                self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #f0f0f0;")
-
-        # 绘制植物
-        for plant_instance in self.plants:
-            if plant_instance.is_alive() and plant_instance.position:
-                row, col = plant_instance.position
-                # 用不同的字符表示不同的植物
-                if isinstance(plant_instance, Plant.Sunflower):
-                    self.board.cells[row][col].setText("向")
-                    self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #ffffaa;")
-                elif isinstance(plant_instance, Plant.Peashooter):
-                    self.board.cells[row][col].setText("豌")
-                    self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #aaffaa;")
-                elif isinstance(plant_instance, Plant.WallNut):
-                    self.board.cells[row][col].setText("坚")
-                    self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #aaaaaa;")
-                elif isinstance(plant_instance, Plant.CherryBomb):
-                    self.board.cells[row][col].setText("樱")
-                    self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #ffaaaa;")
-
-        # 绘制僵尸
-        for zombie_instance in self.zombies:
-            if zombie_instance.is_alive() and zombie_instance.position:
-                row, col = zombie_instance.position
-                # 用不同的字符表示不同的僵尸
-                if isinstance(zombie_instance, zombie.BasicZombie):
-                    self.board.cells[row][col].setText("僵")
-                elif isinstance(zombie_instance, zombie.ConeheadZombie):
-                    self.board.cells[row][col].setText("路")
-                elif isinstance(zombie_instance, zombie.BucketheadZombie):
-                    self.board.cells[row][col].setText("铁")
-                elif isinstance(zombie_instance, zombie.FastZombie):
-                    self.board.cells[row][col].setText("快")
-
-                # 根据生命值设置颜色
-                health_percent = (zombie_instance.health / zombie_instance.max_health) * 100
-                if health_percent > 70:
-                    self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #ffaaaa;")
-                elif health_percent > 30:
-                    self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #ffddaa;")
-                else:
-                    self.board.cells[row][col].setStyleSheet("border: 1px solid #cccccc; background-color: #ffffaa;")
+    def refresh_ui(self, frame):
+        """把一帧的状态刷新到界面"""
+        start = time.perf_counter_ns()
+        self.game_info.update_sun(frame.sun)
+        repainted = self.update_board(frame)
+        self.game_info.update_wave(frame.wave)
+        if frame.selected != self.selected_plant:
+            # 高亮显示选中的植物按钮，种植之后取消
+            self.selected_plant = frame.selected
+            for plant_type, btn in self.plant_selection.plant_buttons.items():
+                btn.setStyleSheet("background-color: #aaffaa;" if plant_type == frame.selected else "")
+        if not self.rewind_slider.isSliderDown():
+            self.rewind_slider.setMaximum(max(frame.snapshots - 1, 0))
+            self.rewind_slider.setValue(frame.snapshots - 1)
+
+        if frame.profile is not None:
+            self.profiler_panel.show_summary(frame.profile)
+            self.worker.submit("ui_profile", time.perf_counter_ns() - start, repainted)
+
+    def update_board(self, frame):
+        """显示一帧的棋盘（只重绘变化的格子），返回重绘的格子数"""
+        return self.board.show_looks(frame.looks)
 
     def update_ui(self):
-        """更新整个UI"""
-        self.game_info.update_sun(self.sun)
+        """重置信息面板；阳光、波次和棋盘在收到新一局的帧时更新"""
         self.game_info.update_level(self.current_level)
-        self.game_info.update_wave(self.level.get_current_wave_info())
         self.game_info.update_status("准备就绪")
-        self.update_board()
-        self.game_info.log_text.clear()
+        self.game_info.clear_log()
 
+    def closeEvent(self, event):
+        """关闭窗口时结束模拟线程，保存录像"""
+        self.worker.submit("stop")
+        self.worker_thread.wait()
+        super().closeEvent(event)
 
-if __name__ == "__main__":
+
+def run(replay_dir=None, rows=5, cols=9, max_fps=30, shared_path=None):
+    """创建应用和主窗口并进入事件循环，返回退出码"""
     app = QApplication(sys.argv)
     # 设置中文字体支持
     font = QFont("SimHei")
     app.setFont(font)
-    game = PlantsVsZombies()
+    game = PlantsVsZombies(replay_dir=replay_dir, rows=rows, cols=cols, max_fps=max_fps, shared_path=shared_path)
     game.show()
-    sys.exit(app.exec())
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(run(os.environ.get("PVZ_REPLAY_DIR"), int(os.environ.get("PVZ_ROWS", 5)),
+                 int(os.environ.get("PVZ_COLS", 9)), int(os.environ.get("PVZ_FPS", 30)), os.environ.get("PVZ_SHARED")))
@@ -0,0 +1,295 @@
+import argparse
+import time
+
+from engine import GameEngine
+from Plant import PLANT_TYPES, PlantFactory
+from snapshot import load_state, save_state
+from spatial import LaneIndex
+from zombie import ZombieFactory
+
+
+class Planner:
+    """束搜索的种植规划器：决定什么时候、在哪里种哪种植物
+
+    每个决策点枚举“等待”和若干种植候选，推进 interval 回合后用启发式函数评估局面，
+    每层只保留得分最高的 beam_width 个局面，逐层向前搜索直到 horizon 回合或时间用完。
+    返回的是目前最好的局面所对应的第一步。
+
+    节点只保存局面的可变部分（回合、阳光、关卡进度、随机数状态和各实体的可变字段）组成的元组，
+    同一父节点的所有子节点共享它。展开每个走法时在一个复用的工作引擎里就地还原：关卡、出怪时间表和
+    棋盘大小每次 plan 只建立一次，植物和僵尸对象从对象池中复用，只改写可变字段。
+    置换表以规范化后的局面为键，不同走法到达的相同局面只评估和展开一次。
+    """
+
+    WIN_SCORE = 10 ** 6  # 胜负局面的基础分，高于任何未结束局面的评估值
+    UNSTOPPED_WEIGHT = 10  # 估计挡不住的僵尸的威胁倍数
+
+    def __init__(self, beam_width=4, interval=10, horizon=200, time_budget=1.0, max_nodes=None,
+                 plant_types=None):
+        self.beam_width = beam_width  # 每层保留的局面数
+        self.interval = interval  # 两个决策点之间的回合数
+        self.horizon = horizon  # 最多向前搜索的回合数
+        self.time_budget = time_budget  # 每次 plan 的时间预算（秒）
+        self.max_nodes = max_nodes  # 每次 plan 最多展开的节点数，None 表示不限；结果和机器速度无关，可以复现
+        self.plant_types = plant_types or PLANT_TYPES  # 参与规划的植物类型
+        self.table = {}  # 置换表：局面键 -> 评估分数
+        self.scratch = None  # 复用的工作引擎
+        self._pool = {}  # 工作引擎复用的实体对象：类型 -> [对象, ...]
+        self.stats = {}  # 上一次 plan 的统计
+
+    @staticmethod
+    def state_key(engine):
+        """局面的规范化键：植物按位置、僵尸按生成顺序排列，与存储顺序（取决于移除的先后）无关
+
+        随机数状态只取决于回合数，不需要计入。直接用元组作键，不同的局面不会因散列碰撞被当成同一个。
+        """
+        plants = sorted((plant_instance.position, plant_instance.type_id)
+                        + tuple(getattr(plant_instance, name) for name in plant_instance.SNAPSHOT_FIELDS)
+                        for plant_instance in engine.plants)
+        zombies = sorted((zombie_instance.spawn_order, zombie_instance.position, zombie_instance.type_id)
+                         + tuple(getattr(zombie_instance, name) for name in zombie_instance.SNAPSHOT_FIELDS)
+                         for zombie_instance in engine.zombies)
+        return engine.tick, engine.sun, engine.result, tuple(plants), tuple(zombies)
+
+    def evaluate(self, engine):
+        """局面评估：阳光加上植物的剩余价值，减去僵尸的威胁
+
+        僵尸越靠左、血越多威胁越大；按所在行植物的总攻击力估计，估计到达终点之前打不死的僵尸按 UNSTOPPED_WEIGHT 倍计算。
+        """
+        if engine.result == "win":
+            return self.WIN_SCORE - engine.tick  # 越早获胜越好
+        if engine.result == "lose":
+            return -self.WIN_SCORE + engine.tick  # 守得越久越好
+        score = engine.sun
+        damage = [0.0] * engine.rows  # 每行植物每回合的总伤害
+        for plant_instance in engine.plants:
+            entry = PlantFactory.get_type(plant_instance.type_id)
+            score += entry.cost * plant_instance.health / entry.prototype.health
+            if plant_instance.attack_power > 0 and plant_instance.is_alive():
+                cooldown = max(plant_instance.attack_cooldown, 1)
+                damage[plant_instance.position[0]] += plant_instance.attack_power / cooldown
+        cols = engine.cols
+        for zombie_instance in engine.zombies:
+            row, col = zombie_instance.position
+            threat = zombie_instance.health * (2 - col / cols)
+            if zombie_instance.health > damage[row] * (col + 1) / zombie_instance.speed:
+                threat *= self.UNSTOPPED_WEIGHT
+            score -= threat
+        return score
+
+    def candidate_moves(self, engine):
+        """当前局面的候选走法：None 表示等待，其余为 (植物类型, 行, 列)
+
+        每种买得起的植物在每行考虑最靠左的空格；有僵尸的行再加上它和相邻两行中离最前面的僵尸最近的空格
+        （种满之后仍然可以在旁边放范围攻击的植物）。没有僵尸、植物布置又相同的几行是对称的，只考虑其中第一行。
+        """
+        board = engine.board
+        rows, cols = engine.rows, engine.cols
+        front = [cols] * rows  # 每行最靠左的僵尸所在列
+        for zombie_instance in engine.zombies:
+            row, col = zombie_instance.position
+            if col < front[row]:
+                front[row] = col
+        layouts = [tuple(board.plant_at(row, col) for col in range(cols)) for row in range(rows)]
+        empty = [[col for col, cell in enumerate(layout) if cell is None] for layout in layouts]
+        cells = []
+        seen = set()
+        for row in range(rows):
+            if front[row] == cols:
+                signature = tuple(cell and cell.type_id for cell in layouts[row])
+                if signature in seen:
+                    continue
+                seen.add(signature)
+            if empty[row] and empty[row][0] < front[row]:
+                cells.append((row, empty[row][0]))
+            if front[row] < cols:
+                for near in range(max(row - 1, 0), min(row + 2, rows)):
+                    if empty[near]:
+                        cells.append((near, min(empty[near], key=lambda col: abs(col - front[row]))))
+        cells = list(dict.fromkeys(cells))
+        moves = [None]
+        for plant_type in self.plant_types:
+            if engine.sun >= PlantFactory.get_type(plant_type).cost:
+                moves.extend((plant_type, row, col) for row, col in cells)
+        return moves
+
+    @staticmethod
+    def _capture(engine):
+        """局面的可变部分，不可变的元组；关卡、时间表和棋盘大小在一次 plan 中不变，不需要保存"""
+        level = engine.level
+        plants = tuple((plant_instance.type_id, plant_instance.position)
+                       + tuple(getattr(plant_instance, name) for name in plant_instance.SNAPSHOT_FIELDS)
+                       for plant_instance in engine.plants)
+        zombie_list = engine.zombies.items
+        zombies = tuple((zombie_instance.type_id, zombie_instance.position)
+                        + tuple(getattr(zombie_instance, name) for name in zombie_instance.SNAPSHOT_FIELDS)
+                        for zombie_instance in zombie_list)
+        # 占位索引中的僵尸顺序（同一格内按到达顺序），以存储下标表示
+        index = {id(zombie_instance): i for i, zombie_instance in enumerate(zombie_list)}
+        lane_order = tuple(index[id(zombie_instance)] for lane in engine.board.lanes for zombie_instance in lane)
+        return (engine.tick, engine.sun, engine.selected_plant, engine.result, engine.spawn_count,
+                (level.tick, level.next_spawn, level.wave_counter, level.zombies_remaining),
+                engine.rng.getstate(), plants, zombies, lane_order)
+
+    def _restore(self, state):
+        """在工作引擎里就地还原 _capture 保存的局面，实体对象从对象池复用"""
+        engine = self.scratch
+        (engine.tick, engine.sun, engine.selected_plant, engine.result, engine.spawn_count,
+         level_state, rng_state, plants, zombies, lane_order) = state
+        level = engine.level
+        level.tick, level.next_spawn, level.wave_counter, level.zombies_remaining = level_state
+        engine.rng.setstate(rng_state)
+        engine.plants.clear()
+        engine.zombies.clear()
+        board = engine.board = LaneIndex(engine.rows, engine.cols)
+
+        taken = {}  # 类型 -> 本次已取用的对象数
+        pool = self._pool
+        for data in plants:
+            plant_instance = self._take(pool, taken, data, PlantFactory.create_plant)
+            engine.plants.add(plant_instance)
+            board.add_plant(plant_instance)
+        zombie_list = []
+        for data in zombies:
+            zombie_instance = self._take(pool, taken, data, ZombieFactory.create_zombie)
+            zombie_instance.target_plant = None
+            engine.zombies.add(zombie_instance)
+            zombie_list.append(zombie_instance)
+        for i in lane_order:
+            board.add_zombie(zombie_list[i])
+        return engine
+
+    @staticmethod
+    def _take(pool, taken, data, factory):
+        """从对象池取一个 data[0] 类型的实体（不够时新建），写入位置和可变字段"""
+        type_id = data[0]
+        objects = pool.setdefault(type_id, [])
+        count = taken.get(type_id, 0)
+        if count == len(objects):
+            objects.append(factory(type_id))
+        entity = objects[count]
+        taken[type_id] = count + 1
+        entity.position = data[1]
+        for name, value in zip(entity.SNAPSHOT_FIELDS, data[2:]):
+            setattr(entity, name, value)
+        return entity
+
+    def plan(self, engine):
+        """在时间预算内搜索，返回建议的下一步：(植物类型, 行, 列)，或 None 表示等待"""
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        self.table.clear()
+        expanded = hits = depth = 0
+        best = None  # (分数, 第一步)
+
+        # 工作引擎每次 plan 还原一次完整状态（关卡、时间表、棋盘大小），之后只还原可变部分
+        self.scratch = load_state(save_state(engine), self.scratch)
+        # 每个节点为 (分数, 第一步, 状态数据)；已结束的局面没有状态数据，原样留在束中
+        beam = [(0, None, self._capture(self.scratch))]
+        timed_out = engine.game_over
+        while not timed_out and depth * self.interval < self.horizon:
+            layer = []
+            for node in beam:
+                _, first, state = node
+                if state is None:
+                    layer.append(node)
+                    continue
+                scratch = self._restore(state)
+                for i, move in enumerate(self.candidate_moves(scratch)):
+                    if time.perf_counter() > deadline or expanded == self.max_nodes:
+                        timed_out = True
+                        break
+                    if i:
+                        scratch = self._restore(state)
+                    if move is not None:
+                        scratch.select_plant(move[0])
+                        scratch.place_plant(move[1], move[2])
+                    scratch.fast_forward(self.interval)
+                    expanded += 1
+                    key = self.state_key(scratch)
+                    if key in self.table:
+                        hits += 1
+                        continue
+                    child_score = self.table[key] = self.evaluate(scratch)
+                    layer.append((child_score, move if depth == 0 else first,
+                                  None if scratch.game_over else self._capture(scratch)))
+                if timed_out:
+                    break
+            if timed_out and depth > 0:
+                break  # 不完整的一层不可比较，使用上一层的结果
+            layer.sort(key=lambda node: node[0], reverse=True)
+            beam = layer[:self.beam_width]
+            if not beam:
+                break
+            best = beam[0][:2]
+            depth += 1
+            if all(state is None for _, _, state in beam):
+                break
+
+        self.stats = {"expanded": expanded, "table_hits": hits, "depth": depth,
+                      "seconds": time.perf_counter() - start}
+        return best[1] if best else None
+
+
+class AutoPlayer:
+    """用规划器自动种植的策略，接口和 strategies.BuildOrder 相同：每回合推进前调用一次
+
+    只有买得起植物的回合才需要规划，其余回合唯一的走法就是等待。
+    """
+
+    def __init__(self, planner=None):
+        self.name = "planner"
+        self.planner = planner or Planner()
+        self.plans = 0  # 本局调用规划器的次数
+
+    def reset(self):
+        """新的一局开始时调用"""
+        self.plans = 0
+
+    def __call__(self, engine):
+        plant_types = self.planner.plant_types
+        if not any(engine.sun >= PlantFactory.get_type(plant_type).cost for plant_type in plant_types):
+            return
+        self.plans += 1
+        move = self.planner.plan(engine)
+        if move is not None:
+            plant_type, row, col = move
+            engine.select_plant(plant_type)
+            engine.place_plant(row, col)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="用规划器自动通关，检验关卡是否可以获胜",
+        epilog="示例：python planner.py --level 1 2 3 --seeds 5 --budget 0.5")
+    parser.add_argument("--level", type=int, nargs="+", default=[1, 2, 3], help="关卡编号")
+    parser.add_argument("--seeds", type=int, default=3, help="每关运行的对局数（种子 0 起）")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--budget", type=float, default=0.5, help="每次规划的时间预算（秒）")
+    parser.add_argument("--max-nodes", type=int, default=None, help="每次规划最多展开的节点数，设置后结果可以复现")
+    parser.add_argument("--beam-width", type=int, default=4, help="每层保留的局面数")
+    parser.add_argument("--interval", type=int, default=10, help="决策间隔（回合）")
+    parser.add_argument("--max-ticks", type=int, default=2000, help="单局回合上限")
+    args = parser.parse_args(argv)
+
+    player = AutoPlayer(Planner(args.beam_width, args.interval, time_budget=args.budget,
+                                max_nodes=args.max_nodes))
+    print(f"{'关卡':<6}{'种子':<6}{'结果':<8}{'回合':>6}{'植物':>6}{'平均搜索深度':>14}")
+    for level_number in args.level:
+        for seed in range(args.seeds):
+            engine = GameEngine(level_number, args.rows, args.cols, seed=seed)
+            player.reset()
+            depths = []
+            while not engine.game_over and engine.tick < args.max_ticks:
+                plans = player.plans
+                player(engine)
+                if player.plans > plans:
+                    depths.append(player.planner.stats["depth"])
+                engine.step()
+            print(f"{level_number:<6}{seed:<6}{engine.result or '-':<8}{engine.tick:>6}{len(engine.plants):>6}"
+                  f"{sum(depths) / max(len(depths), 1):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import csv
+import json
+from collections import deque
+from time import perf_counter_ns
+
+
+class PhaseProfiler:
+    """按阶段统计每回合的耗时和计数，保存最近 capacity 个回合的记录
+
+    挂到 GameEngine.profiler 上即开始统计，设回 None 即停止；不挂载时引擎每个阶段只多一次
+    None 判断。界面刷新阶段由界面调用 lap(UI) 并补充重绘格子数；界面在另一个线程时改为用 count(UI, 纳秒) 补上刷新耗时。
+    """
+
+    # 阶段，对应 GameEngine.step 的各个步骤和界面刷新
+    SPAWN = "spawn"  # 生成僵尸
+    SUN = "sun"  # 植物更新、产生阳光
+    ATTACK = "attack"  # 植物攻击
+    ZOMBIES = "zombies"  # 僵尸移动和啃食
+    COMPLETE = "complete"  # 检查关卡完成
+    UI = "ui"  # 界面刷新
+    PHASES = (SPAWN, SUN, ATTACK, ZOMBIES, COMPLETE, UI)
+
+    # 计数
+    PLANTS = "plants"  # 处理的植物数
+    ZOMBIE_COUNT = "zombie_count"  # 处理的僵尸数
+    ATTACKS = "attacks"  # 结算的攻击次数
+    REPAINTED = "repainted"  # 重绘的格子数
+    COUNTERS = (PLANTS, ZOMBIE_COUNT, ATTACKS, REPAINTED)
+
+    COLUMNS = ("tick",) + tuple(f"{phase}_us" for phase in PHASES) + COUNTERS
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity  # 保留的回合数
+        self.frames = deque(maxlen=capacity)  # 每回合一行：[回合, 各阶段耗时(纳秒)..., 各计数...]
+        self.frame = None  # 当前回合的记录
+        self.last = 0  # 上一次计时的时间点
+        self._index = {name: i + 1 for i, name in enumerate(self.PHASES + self.COUNTERS)}
+
+    def begin(self, tick):
+        """开始记录一个回合"""
+        self.frame = [tick] + [0] * (len(self.COLUMNS) - 1)
+        self.frames.append(self.frame)
+        self.last = perf_counter_ns()
+
+    def lap(self, phase):
+        """结束一个阶段：把距上次计时经过的时间记到该阶段"""
+        now = perf_counter_ns()
+        if self.frame is not None:
+            self.frame[self._index[phase]] += now - self.last
+        self.last = now
+
+    def count(self, name, amount):
+        """累加当前回合的计数"""
+        if self.frame is not None:
+            self.frame[self._index[name]] += amount
+
+    def clear(self):
+        self.frames.clear()
+        self.frame = None
+
+    def rows(self):
+        """按 COLUMNS 排列的记录，耗时换算为微秒"""
+        phases = len(self.PHASES)
+        return [[frame[0]] + [round(value / 1000, 1) for value in frame[1:phases + 1]] + frame[phases + 1:]
+                for frame in self.frames]
+
+    def summary(self, last=None):
+        """最近 last 个回合（默认全部）各阶段的平均和最大耗时（微秒）以及各计数的平均值"""
+        frames = list(self.frames)[-last:] if last else list(self.frames)
+        result = {}
+        if not frames:
+            return result
+        for name, i in self._index.items():
+            values = [frame[i] for frame in frames]
+            if name in self.PHASES:
+                result[name] = {"mean_us": sum(values) / len(values) / 1000, "max_us": max(values) / 1000}
+            else:
+                result[name] = sum(values) / len(values)
+        return result
+
+    def export_csv(self, path):
+        """把记录写成 CSV 文件"""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            writer.writerows(self.rows())
+
+    def export_json(self, path):
+        """把记录写成 JSON 文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"columns": self.COLUMNS, "rows": self.rows()}, f)
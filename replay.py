@@ -0,0 +1,194 @@
+import argparse
+import io
+import struct
+
+from Plant import PLANT_TYPES, PlantFactory
+from engine import GameEngine
+
+# 文件头：魔数、版本、关卡、行数、列数、随机数种子
+MAGIC = b"PVZR"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHHQ")
+
+# 记录类型；每条记录为：回合增量（变长整数）+ 类型字节 + 参数
+OP_SELECT = 0  # 参数：植物类型编号（1 字节）
+OP_PLACE = 1  # 参数：行、列（变长整数）
+OP_END = 2  # 录像结束，回合增量即最后一个回合
+
+
+def _write_varint(out, value):
+    """以 LEB128 变长格式写入非负整数"""
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    """读取变长整数，返回 (值, 新位置)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class ReplayRecorder:
+    """录像记录器：挂到 GameEngine.recorder 上，记录玩家操作及其发生的回合
+
+    只记录操作而不记录画面，配合引擎的随机数种子即可完整复现一局游戏。
+    """
+
+    def __init__(self, engine, stream=None):
+        self.stream = stream if stream is not None else io.BytesIO()  # 写入的目标（二进制文件对象）
+        self.last_tick = 0  # 上一条记录的回合，用于计算增量
+        self.closed = False
+        self.stream.write(HEADER.pack(MAGIC, VERSION, engine.level_number, engine.rows, engine.cols,
+                                      engine.seed))
+        engine.recorder = self
+
+    def _write(self, tick, op, *args):
+        record = bytearray()
+        _write_varint(record, tick - self.last_tick)
+        record.append(op)
+        if op == OP_SELECT:
+            record.append(args[0])
+        else:
+            for value in args:
+                _write_varint(record, value)
+        self.last_tick = tick
+        self.stream.write(record)
+
+    def record_select(self, tick, plant_type):
+        """记录选择植物"""
+        self._write(tick, OP_SELECT, PlantFactory.get_type(plant_type).index)
+
+    def record_place(self, tick, row, col):
+        """记录种植"""
+        self._write(tick, OP_PLACE, row, col)
+
+    def close(self, tick):
+        """写入结束标记；tick 为录像的最后一个回合"""
+        if not self.closed:
+            self._write(tick, OP_END)
+            self.stream.flush()
+            self.closed = True
+
+
+class Replay:
+    """解析后的录像：关卡参数、种子和按回合排列的操作列表"""
+
+    def __init__(self, level_number, rows, cols, seed, inputs, end_tick=None):
+        self.level_number = level_number
+        self.rows = rows
+        self.cols = cols
+        self.seed = seed
+        self.inputs = inputs  # [(回合, "select", 植物类型) 或 (回合, "place", 行, 列), ...]
+        self.end_tick = end_tick  # 录像的最后一个回合；录制中途中断时为 None
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, level_number, rows, cols, seed = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("不是有效的录像文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的录像版本: {version}")
+
+        inputs = []
+        end_tick = None
+        tick = 0
+        pos = HEADER.size
+        while pos < len(data):
+            delta, pos = _read_varint(data, pos)
+            tick += delta
+            op = data[pos]
+            pos += 1
+            if op == OP_SELECT:
+                inputs.append((tick, "select", PLANT_TYPES[data[pos]]))
+                pos += 1
+            elif op == OP_PLACE:
+                row, pos = _read_varint(data, pos)
+                col, pos = _read_varint(data, pos)
+                inputs.append((tick, "place", row, col))
+            elif op == OP_END:
+                end_tick = tick
+                break
+            else:
+                raise ValueError(f"未知的录像记录类型: {op}")
+        return cls(level_number, rows, cols, seed, inputs, end_tick)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayPlayer:
+    """无界面回放：按录像重新模拟，可以跳转到任意回合"""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.restart()
+
+    def restart(self):
+        """回到第 0 回合"""
+        replay = self.replay
+        self.engine = GameEngine(replay.level_number, replay.rows, replay.cols, seed=replay.seed)
+        self.next_input = 0  # 下一条待执行的操作
+
+    def seek(self, tick):
+        """跳转到第 tick 回合刚推进完的状态（该回合之后的操作尚未执行），返回引擎"""
+        if tick < self.engine.tick:
+            self.restart()
+
+        engine = self.engine
+        inputs = self.replay.inputs
+        while engine.tick < tick and engine.result is None:
+            # 执行当前回合记录的操作
+            while self.next_input < len(inputs) and inputs[self.next_input][0] <= engine.tick:
+                record = inputs[self.next_input]
+                if record[1] == "select":
+                    engine.select_plant(record[2])
+                else:
+                    engine.place_plant(record[2], record[3])
+                self.next_input += 1
+
+            # 一直推进到下一条操作或目标回合
+            stop = tick
+            if self.next_input < len(inputs):
+                stop = min(stop, inputs[self.next_input][0])
+            engine.run(max(stop - engine.tick, 1))
+        return engine
+
+    def play(self):
+        """回放到录像结束（或游戏结束），返回引擎"""
+        end_tick = self.replay.end_tick
+        if end_tick is None:
+            end_tick = self.replay.inputs[-1][0] + 1 if self.replay.inputs else 0
+        return self.seek(end_tick)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面回放录像文件")
+    parser.add_argument("path", help="录像文件")
+    parser.add_argument("--tick", type=int, help="跳转到指定回合，默认回放到结束")
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.path)
+    player = ReplayPlayer(replay)
+    engine = player.seek(args.tick) if args.tick is not None else player.play()
+    print(f"关卡 {replay.level_number}，种子 {replay.seed}，共 {len(replay.inputs)} 条操作")
+    print(f"回合 {engine.tick}：阳光 {engine.sun}，植物 {len(engine.plants)}，僵尸 {len(engine.zombies)}，"
+          f"结果 {engine.result or '进行中'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+
+from Plant import PlantFactory
+from engine import GameEngine
+from zombie import ZombieFactory
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """服务器上的一局无界面游戏：引擎和订阅它的连接"""
+
+    def __init__(self, session_id, engine):
+        self.id = session_id
+        self.engine = engine
+        self.version = 0  # 状态每变化一次加一
+        self.subscribers = set()  # 订阅状态变化的连接
+        self._state = None  # 最近一次生成的状态，见 state()
+        self._state_version = -1
+
+    def changed(self):
+        """状态发生了变化：通知订阅者"""
+        self.version += 1
+        for connection in self.subscribers:
+            connection.wake.set()
+
+    def state(self):
+        """当前状态：(回合, 阳光, 结果, {植物句柄: 数据}, {僵尸句柄: 数据})，同一版本只生成一次
+
+        实体数据为 [类型编号, 行, 列, 生命值]。
+        """
+        if self._state_version != self.version:
+            engine = self.engine
+            plants = {plant_instance.handle: [PlantFactory.get_type(plant_instance.type_id).index,
+                                              *plant_instance.position, plant_instance.health]
+                      for plant_instance in engine.plants}
+            zombies = {zombie_instance.handle: [ZombieFactory.get_type(zombie_instance.type_id).index,
+                                                *zombie_instance.position, zombie_instance.health]
+                       for zombie_instance in engine.zombies}
+            self._state = (engine.tick, engine.sun, engine.result, plants, zombies)
+            self._state_version = self.version
+        return self._state
+
+
+def _diff_entities(message, name, old, new):
+    """把 old 到 new 的实体变化写入消息：新增或变化的实体数据（句柄在前），以及被移除的句柄"""
+    changed = [[handle] + data for handle, data in new.items() if old.get(handle) != data]
+    removed = [handle for handle in old if handle not in new]
+    if changed:
+        message[name] = changed
+    if removed:
+        message[name + "_removed"] = removed
+
+
+def state_diff(session_id, old, new):
+    """两个状态之间的差异消息；old 为 None 时给出完整状态"""
+    tick, sun, result, plants, zombies = new
+    message = {"op": "diff", "session": session_id, "tick": tick}
+    if old is None:
+        message["full"] = True
+        old = (None, None, None, {}, {})
+    if sun != old[1]:
+        message["sun"] = sun
+    if result != old[2]:
+        message["result"] = result
+    _diff_entities(message, "plants", old[3], plants)
+    _diff_entities(message, "zombies", old[4], zombies)
+    return message
+
+
+class Connection:
+    """一个客户端连接：逐行读取请求并回复，另有一个发送任务推送订阅的状态差异
+
+    反压：推送任务在写缓冲区排空之前不会生成新的差异。慢客户端错过的中间回合被合并成一条
+    从它上次收到的状态到最新状态的差异，服务器为它保存的只有每个订阅的最后发送状态，
+    内存和调度器的速度都不受慢客户端影响。客户端不读取回复时服务器也暂停读取它的请求。
+    """
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.subscriptions = {}  # 会话编号 -> (最后发送的版本, 最后发送的状态)
+        self.wake = asyncio.Event()  # 有订阅的会话发生了变化
+
+    def send(self, message):
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+
+    async def serve(self):
+        pusher = asyncio.create_task(self.push_diffs())
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self.send(self.server.handle(self, line))
+                await self.writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            pusher.cancel()
+            for session_id in list(self.subscriptions):
+                self.server.unsubscribe(self, session_id)
+            self.writer.close()
+
+    async def push_diffs(self):
+        """把订阅会话的变化推送给客户端；写缓冲区排空后才处理下一批变化"""
+        try:
+            while True:
+                await self.wake.wait()
+                self.wake.clear()
+                for session_id, (version, old) in list(self.subscriptions.items()):
+                    session = self.server.sessions.get(session_id)
+                    if session is None or session.version == version:
+                        continue
+                    new = session.state()
+                    self.send(state_diff(session_id, old, new))
+                    self.subscriptions[session_id] = (session.version, new)
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+
+
+class GameServer:
+    """多会话游戏服务器：在一个进程里运行大量互相独立的无界面游戏
+
+    协议为 JSON lines：每行一个请求，服务器按顺序每行回复一个结果 {"id": 请求的 id, "ok": true, ...}，
+    出错时为 {"ok": false, "error": 原因}。请求的 op 可以是：
+
+        create      {"level", "rows", "cols", "seed", "running"} 新建会话，返回 session
+        close       {"session"} 结束会话
+        select      {"session", "plant"} 选择植物
+        place       {"session", "row", "col"} 在指定位置种植已选择的植物
+        tick        {"session", "ticks"} 立即推进若干回合，返回产生的事件
+        start/pause {"session"} 交给共享调度器每周期推进一回合 / 停止推进
+        subscribe   {"session"} 订阅状态变化，之后推送 {"op": "diff", ...}，第一条为完整状态
+        unsubscribe {"session"} 取消订阅
+
+    所有运行中的会话由同一个调度器按 tick_seconds 的周期推进。
+    """
+
+    MAX_TICKS = 100000  # 一次 tick 请求最多推进的回合数，避免长时间阻塞其他会话
+    MAX_ROWS = 64  # 新建会话的棋盘行数上限，限制单个会话占用的内存
+    MAX_COLS = 128  # 新建会话的棋盘列数上限
+
+    def __init__(self, tick_seconds=1.0, max_sessions=10000):
+        self.tick_seconds = tick_seconds  # 调度器周期（秒）
+        self.max_sessions = max_sessions  # 会话数上限
+        self.sessions = {}  # 会话编号 -> Session
+        self.running = {}  # 由调度器推进的会话（按加入顺序）
+        self._ids = itertools.count(1)
+        self.ops = {
+            "create": self.op_create,
+            "close": self.op_close,
+            "select": self.op_select,
+            "place": self.op_place,
+            "tick": self.op_tick,
+            "start": self.op_start,
+            "pause": self.op_pause,
+            "subscribe": self.op_subscribe,
+            "unsubscribe": self.op_unsubscribe,
+        }
+
+    def handle(self, connection, line):
+        """处理一行请求，返回回复；任何异常都转成出错的回复，不会断开连接"""
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("请求应为 JSON 对象")
+            request_id = request.get("id")
+            handler = self.ops.get(request.get("op"))
+            if handler is None:
+                raise ValueError(f"未知操作: {request.get('op')}")
+            reply = handler(connection, request)
+        except (ValueError, KeyError, TypeError) as error:
+            reply = {"ok": False, "error": str(error)}
+        except Exception as error:
+            logger.exception("处理请求出错: %r", line)
+            reply = {"ok": False, "error": f"服务器内部错误: {error}"}
+        else:
+            reply["ok"] = True
+        if request_id is not None:
+            reply["id"] = request_id
+        return reply
+
+    def session(self, request):
+        session = self.sessions.get(request["session"])
+        if session is None:
+            raise ValueError(f"会话不存在: {request['session']}")
+        return session
+
+    def op_create(self, connection, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError("会话数已达上限")
+        rows = int(request.get("rows", 5))
+        cols = int(request.get("cols", 9))
+        if not (0 < rows <= self.MAX_ROWS and 0 < cols <= self.MAX_COLS):
+            raise ValueError(f"行数应在 1 到 {self.MAX_ROWS} 之间，列数应在 1 到 {self.MAX_COLS} 之间")
+        engine = GameEngine(int(request.get("level", 1)), rows, cols, seed=request.get("seed"))
+        session = Session(next(self._ids), engine)
+        self.sessions[session.id] = session
+        if request.get("running"):
+            self.op_start(connection, {"session": session.id})
+        return {"session": session.id, "seed": engine.seed}
+
+    def op_close(self, connection, request):
+        session = self.session(request)
+        del self.sessions[session.id]
+        self.running.pop(session.id, None)
+        session.changed()  # 订阅者的推送任务会跳过已关闭的会话
+        for subscriber in list(session.subscribers):
+            subscriber.subscriptions.pop(session.id, None)
+        return {}
+
+    def op_select(self, connection, request):
+        session = self.session(request)
+        event = session.engine.select_plant(request["plant"])
+        return {"event": event.kind}
+
+    def op_place(self, connection, request):
+        session = self.session(request)
+        engine = session.engine
+        row, col = int(request["row"]), int(request["col"])
+        if not (0 <= row < engine.rows and 0 <= col < engine.cols):
+            raise ValueError(f"位置 ({row}, {col}) 超出 {engine.rows}x{engine.cols} 的棋盘")
+        event = engine.place_plant(row, col)
+        if event is None:
+            return {"event": None}
+        session.changed()
+        return {"event": event.kind}
+
+    def op_tick(self, connection, request):
+        session = self.session(request)
+        ticks = int(request.get("ticks", 1))
+        if not 0 <= ticks <= self.MAX_TICKS:
+            raise ValueError(f"回合数应在 0 到 {self.MAX_TICKS} 之间")
+        events = session.engine.run(ticks)
+        session.changed()
+        return {"tick": session.engine.tick, "events": [[event.kind, event.tick] for event in events]}
+
+    def op_start(self, connection, request):
+        session = self.session(request)
+        if not session.engine.game_over:
+            self.running[session.id] = session
+        return {}
+
+    def op_pause(self, connection, request):
+        self.running.pop(self.session(request).id, None)
+        return {}
+
+    def op_subscribe(self, connection, request):
+        session = self.session(request)
+        session.subscribers.add(connection)
+        connection.subscriptions[session.id] = (-1, None)
+        connection.wake.set()
+        return {}
+
+    def op_unsubscribe(self, connection, request):
+        self.unsubscribe(connection, self.session(request).id)
+        return {}
+
+    def unsubscribe(self, connection, session_id):
+        connection.subscriptions.pop(session_id, None)
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.subscribers.discard(connection)
+
+    def tick_all(self):
+        """推进所有运行中的会话一回合；结束的会话离开调度器"""
+        finished = []
+        for session in self.running.values():
+            session.engine.step()
+            session.changed()
+            if session.engine.game_over:
+                finished.append(session.id)
+        for session_id in finished:
+            del self.running[session_id]
+
+    async def run_scheduler(self):
+        """共享调度器：按固定周期推进所有运行中的会话；落后太多时放弃追赶"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            self.tick_all()
+            deadline += self.tick_seconds
+            now = loop.time()
+            if now > deadline + 10 * self.tick_seconds:
+                deadline = now
+            await asyncio.sleep(deadline - now)
+
+    async def on_connect(self, reader, writer):
+        await Connection(self, reader, writer).serve()
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        """在 TCP 端口或 Unix 套接字（指定 path 时）上提供服务，直到被取消"""
+        if path:
+            server = await asyncio.start_unix_server(self.on_connect, path)
+        else:
+            server = await asyncio.start_server(self.on_connect, host, port)
+        scheduler = asyncio.create_task(self.run_scheduler())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            scheduler.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="多会话游戏服务器：通过 JSON lines 协议在一个进程里运行大量无界面游戏",
+        epilog='示例：python server.py --port 8765，之后发送 {"op": "create", "running": true}')
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="改为监听 Unix 套接字路径")
+    parser.add_argument("--tick", type=float, default=1.0, help="调度器周期（秒）")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="会话数上限")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.tick, args.max_sessions)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+from Plant import PLANT_REGISTRY, PLANT_TYPES
+from zombie import ZOMBIE_REGISTRY, ZOMBIE_TYPES
+from snapshot import RESULTS
+from telemetry import BYTE_ORDER, DTYPES
+
+# 文件头：魔数、版本、序号、回合、阳光、关卡、当前波次、总波次、结果（与存档相同的编码）、行数、列数、
+# 植物容量、僵尸容量、写入的植物数、写入的僵尸数、场上的僵尸总数（超出容量的不写入）
+MAGIC = b"PVZB"
+VERSION = 1
+HEADER = struct.Struct("<4sIQqqiiiiHHIIIII")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 8
+HEADER_SIZE = 128  # 数据区从这里开始，头部留有余量
+RESULT_NAMES = {value: key for key, value in RESULTS.items()}
+
+# 各区的列：(列名, array 类型码)；每列连续存放，按 8 字节对齐
+SECTIONS = {
+    # 每格一项，按行优先排列：植物类型编号 + 1（0 表示空格子）、僵尸数
+    "cells": (("plant", "B"), ("zombies", "H")),
+    # 每株植物一项，按存储顺序：句柄、类型编号、行、列、生命值
+    "plants": (("handle", "q"), ("type", "B"), ("row", "h"), ("col", "h"), ("health", "i")),
+    # 每只僵尸一项，按存储顺序：编号（生成顺序）、类型编号、行、列、生命值
+    "zombies": (("id", "i"), ("type", "B"), ("row", "h"), ("col", "h"), ("health", "i")),
+}
+
+
+def default_path(name="pvz_board"):
+    """默认的共享文件路径：有 /dev/shm 时放在其中（内存文件系统），否则放在临时目录"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, name)
+
+
+def layout(rows, cols, max_plants, max_zombies):
+    """各列在共享区中的位置，返回 ({区名: {列名: (类型码, 偏移, 容量)}}, 总字节数)"""
+    counts = {"cells": rows * cols, "plants": max_plants, "zombies": max_zombies}
+    offset = HEADER_SIZE
+    sections = {}
+    for section, columns in SECTIONS.items():
+        sections[section] = {}
+        for name, typecode in columns:
+            sections[section][name] = (typecode, offset, counts[section])
+            offset += -(-counts[section] * array(typecode).itemsize // 8) * 8
+    return sections, offset
+
+
+class SharedBoardWriter:
+    """把引擎局面发布到固定布局的共享内存区：挂到 GameEngine.shared 上之后每回合结束时写入一次
+
+    共享区是内存文件系统中的一个文件，同一台机器上的其他进程可以只读映射，用 SharedBoardReader
+    直接得到 NumPy 视图，不需要序列化。布局由文件头里的行列数和容量决定，见 layout。
+
+    文件头中的序号是顺序锁：写入前加一变成奇数，写完再加一变回偶数。读者读取前后序号相同且为偶数时
+    数据完整，否则说明读到一半被改写，重读即可。写者从不等待读者。
+    """
+
+    def __init__(self, path=None, rows=5, cols=9, max_zombies=1024, engine=None):
+        self.path = path or default_path()
+        self.rows = rows
+        self.cols = cols
+        self.max_plants = rows * cols  # 每格最多一株植物
+        self.max_zombies = max_zombies
+        self.sections, self.size = layout(rows, cols, self.max_plants, max_zombies)
+        self.plant_types = {type_id: index for index, type_id in enumerate(PLANT_TYPES)}
+        self.zombie_types = {type_id: index for index, type_id in enumerate(ZOMBIE_TYPES)}
+        self.seq = 0
+        self.file = open(self.path, "w+b")
+        self.file.truncate(self.size)
+        self.map = mmap.mmap(self.file.fileno(), self.size)
+        self.map[:HEADER.size] = HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0, 0, 0, 0, rows, cols, self.max_plants,
+                                             max_zombies, 0, 0, 0)
+        if engine is not None:
+            self.attach(engine)
+
+    def attach(self, engine):
+        """挂到引擎上并立即发布一次"""
+        if (engine.rows, engine.cols) != (self.rows, self.cols):
+            raise ValueError(f"棋盘大小 {engine.rows}x{engine.cols} 与共享区的 {self.rows}x{self.cols} 不同")
+        engine.shared = self
+        self.publish(engine)
+
+    def _write(self, section, name, values):
+        typecode, offset, _ = self.sections[section][name]
+        data = array(typecode, values)
+        self.map[offset:offset + len(data) * data.itemsize] = memoryview(data).cast("B")
+
+    def publish(self, engine):
+        """写入当前局面；回合之间种植、撤销、读档之后也可以直接调用"""
+        self.seq += 1
+        SEQ.pack_into(self.map, SEQ_OFFSET, self.seq)
+
+        cols = self.cols
+        cell_plants = bytearray(self.rows * cols)
+        cell_zombies = array("H", bytes(2 * self.rows * cols))
+        plants = engine.plants.items
+        plant_types = self.plant_types
+        plant_type = [plant_types[plant_instance.type_id] for plant_instance in plants]
+        plant_row = [plant_instance.position[0] for plant_instance in plants]
+        plant_col = [plant_instance.position[1] for plant_instance in plants]
+        for type_index, row, col in zip(plant_type, plant_row, plant_col):
+            cell_plants[row * cols + col] = type_index + 1
+        self._write("plants", "handle", [plant_instance.handle for plant_instance in plants])
+        self._write("plants", "type", plant_type)
+        self._write("plants", "row", plant_row)
+        self._write("plants", "col", plant_col)
+        self._write("plants", "health", [plant_instance.health for plant_instance in plants])
+
+        zombies = engine.zombies.items[:self.max_zombies]
+        zombie_types = self.zombie_types
+        zombie_row = [zombie_instance.position[0] for zombie_instance in zombies]
+        zombie_col = [zombie_instance.position[1] for zombie_instance in zombies]
+        for row, col in zip(zombie_row, zombie_col):
+            cell_zombies[row * cols + col] += 1
+        self._write("zombies", "id", [zombie_instance.spawn_order for zombie_instance in zombies])
+        self._write("zombies", "type", [zombie_types[zombie_instance.type_id] for zombie_instance in zombies])
+        self._write("zombies", "row", zombie_row)
+        self._write("zombies", "col", zombie_col)
+        self._write("zombies", "health", [zombie_instance.health for zombie_instance in zombies])
+        self._write("cells", "plant", cell_plants)
+        self._write("cells", "zombies", cell_zombies)
+
+        level = engine.level
+        self.map[:HEADER.size] = HEADER.pack(
+            MAGIC, VERSION, self.seq, engine.tick, engine.sun, engine.level_number, level.wave_counter,
+            len(level.waves), RESULTS[engine.result], self.rows, cols, self.max_plants, self.max_zombies,
+            len(plants), len(zombies), len(engine.zombies))
+        self.seq += 1
+        SEQ.pack_into(self.map, SEQ_OFFSET, self.seq)
+
+    def close(self, unlink=False):
+        """关闭共享区；unlink 为 True 时删除文件，已经映射的读者不受影响"""
+        if self.map is None:
+            return
+        self.map.close()
+        self.map = None
+        self.file.close()
+        if unlink:
+            os.remove(self.path)
+
+
+class SharedBoardReader:
+    """只读映射 SharedBoardWriter 发布的共享区
+
+    views 为 {区名: {列名: NumPy 数组}}，直接映射共享内存，不复制；cells 区的数组形状为 (行数, 列数)，
+    其余按容量排列，有效的只有前 plants / zombies 项。零复制读取时用 begin() 取得序号，读完用
+    valid(序号) 检查期间没有被改写；需要一份完整的副本时用 read()。
+    """
+
+    def __init__(self, path=None):
+        import numpy as np
+
+        self.path = path or default_path()
+        with open(self.path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self.map)
+        if header[0] != MAGIC:
+            raise ValueError("不是有效的局面共享区")
+        if header[1] != VERSION:
+            raise ValueError(f"不支持的共享区版本: {header[1]}")
+        self.rows, self.cols, self.max_plants, self.max_zombies = header[9:13]
+        sections, _ = layout(self.rows, self.cols, self.max_plants, self.max_zombies)
+        self.views = {
+            section: {name: np.frombuffer(self.map, BYTE_ORDER + DTYPES[typecode], count, offset)
+                      for name, (typecode, offset, count) in columns.items()}
+            for section, columns in sections.items()
+        }
+        for name, view in self.views["cells"].items():
+            self.views["cells"][name] = view.reshape(self.rows, self.cols)
+
+    @property
+    def seq(self):
+        return SEQ.unpack_from(self.map, SEQ_OFFSET)[0]
+
+    def header(self):
+        """文件头中的计数：{回合, 阳光, 关卡, 波次, 总波次, 结果, 植物数, 僵尸数, 僵尸总数, 序号}"""
+        (_, _, seq, tick, sun, level, wave, total_waves, result, _, _, _, _,
+         plants, zombies, zombie_total) = HEADER.unpack_from(self.map)
+        return {"seq": seq, "tick": tick, "sun": sun, "level": level, "wave": wave, "total_waves": total_waves,
+                "result": RESULT_NAMES[result], "plants": plants,
+                "zombies": zombies, "zombie_total": zombie_total}
+
+    def begin(self):
+        """等到没有写入正在进行，返回当前序号"""
+        seq = self.seq
+        while seq & 1:
+            time.sleep(0)
+            seq = self.seq
+        return seq
+
+    def valid(self, seq):
+        """begin() 之后读到的数据是否完整（期间没有发生写入）"""
+        return self.seq == seq
+
+    def read(self):
+        """读取一份完整的局面副本：{"header": header(), 区名: {列名: 数组}}，plants、zombies 只含有效的项"""
+        while True:
+            seq = self.begin()
+            header = self.header()
+            state = {"header": header, "cells": {name: view.copy() for name, view in self.views["cells"].items()}}
+            for section in ("plants", "zombies"):
+                count = header[section]
+                state[section] = {name: view[:count].copy() for name, view in self.views[section].items()}
+            if self.valid(seq) and header["seq"] == seq:
+                return state
+
+    def wait(self, seq, timeout=None, interval=0.001):
+        """等待序号越过 seq 的下一次发布，返回新的序号；超时返回 None"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            current = self.begin()
+            if current != seq:
+                return current
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            time.sleep(interval)
+
+    def close(self):
+        self.views = None
+        self.map.close()
+
+
+def render(state):
+    """把 read() 的结果画成文字棋盘：植物显示字符，有僵尸的格子显示僵尸数"""
+    glyphs = [" "] + [PLANT_REGISTRY[plant_type].glyph for plant_type in PLANT_TYPES]
+    zombie_glyphs = [ZOMBIE_REGISTRY[zombie_type].glyph for zombie_type in ZOMBIE_TYPES]
+    cells = state["cells"]
+    lines = []
+    for row in range(cells["plant"].shape[0]):
+        line = []
+        for plant, zombies in zip(cells["plant"][row].tolist(), cells["zombies"][row].tolist()):
+            line.append(glyphs[plant] + (str(zombies) if zombies else "."))
+        lines.append(" ".join(line))
+    columns = state["zombies"]
+    kinds = {}
+    for type_index in columns["type"].tolist():
+        kinds[zombie_glyphs[type_index]] = kinds.get(zombie_glyphs[type_index], 0) + 1
+    lines.append("僵尸：" + (" ".join(f"{glyph}x{count}" for glyph, count in kinds.items()) or "无"))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="读取其他进程发布到共享内存的实时局面",
+                                     epilog="示例：python cli.py run --shared /dev/shm/pvz_board 之后 "
+                                            "python sharedboard.py /dev/shm/pvz_board --board")
+    parser.add_argument("path", nargs="?", default=None, help=f"共享文件路径，默认 {default_path()}")
+    parser.add_argument("--board", action="store_true", help="同时显示文字棋盘")
+    parser.add_argument("--count", type=int, default=0, help="显示多少次更新后退出，0 表示一直显示到游戏结束")
+    parser.add_argument("--timeout", type=float, default=5.0, help="超过这么多秒没有更新时退出")
+    args = parser.parse_args(argv)
+
+    reader = SharedBoardReader(args.path)
+    seq = None
+    shown = 0
+    while True:
+        seq = reader.wait(seq, args.timeout)
+        if seq is None:
+            print("等待更新超时")
+            break
+        state = reader.read()
+        header = state["header"]
+        seq = header["seq"]
+        print(f"回合 {header['tick']}  阳光 {header['sun']}  关卡 {header['level']}  "
+              f"波次 {header['wave']}/{header['total_waves']}  植物 {header['plants']}  僵尸 {header['zombie_total']}"
+              + (f"  结果 {header['result']}" if header["result"] else ""))
+        if args.board:
+            print(render(state))
+        shown += 1
+        if header["result"] or shown == args.count:
+            break
+    reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+import os
+import struct
+import time
+import zlib
+
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+
+from Plant import PLANT_REGISTRY
+from zombie import ZOMBIE_REGISTRY
+from engine import GameEngine, GameEvent
+from planner import Planner
+from profiler import PhaseProfiler
+from replay import ReplayRecorder
+from sharedboard import SharedBoardWriter
+import snapshot
+
+
+# 各类型植物的显示 (文字, 样式状态)，由类型登记表生成
+PLANT_LOOKS = {plant_type: (entry.glyph, plant_type) for plant_type, entry in PLANT_REGISTRY.items()}
+
+
+def plant_look(plant_instance):
+    """植物在格子上的显示：(文字, 样式状态)"""
+    return PLANT_LOOKS.get(plant_instance.type_id, (" ", "empty"))
+
+
+def zombie_look(zombie_instance):
+    """僵尸在格子上的显示：(文字, 样式状态)"""
+    entry = ZOMBIE_REGISTRY.get(zombie_instance.type_id)
+    text = entry.glyph if entry is not None else " "
+
+    # 根据生命值设置颜色
+    health_percent = (zombie_instance.health / zombie_instance.max_health) * 100
+    if health_percent > 70:
+        return text, "zombie_high"
+    elif health_percent > 30:
+        return text, "zombie_mid"
+    return text, "zombie_low"
+
+
+def board_looks(plants, zombies):
+    """棋盘上每个非空格子的显示：{(行, 列): (文字, 样式状态)}，同一格内僵尸覆盖植物"""
+    looks = {}
+    for plant_instance in plants:
+        if plant_instance.is_alive() and plant_instance.position:
+            looks[plant_instance.position] = plant_look(plant_instance)
+    for zombie_instance in zombies:
+        if zombie_instance.is_alive() and zombie_instance.position:
+            looks[zombie_instance.position] = zombie_look(zombie_instance)
+    return looks
+
+
+class Frame:
+    """工作线程发布给界面的一帧：发布之后不再修改，界面线程可以放心读取
+
+    events 是距上一帧产生的事件和日志文字；looks 是 board_looks 的结果。
+    """
+
+    __slots__ = ("seq", "level", "tick", "sun", "result", "selected", "wave", "looks", "snapshots",
+                 "events", "restored", "warning", "profile")
+
+    def __init__(self, seq, engine, snapshots, events, restored=False, warning=None, profile=None):
+        self.seq = seq  # 发布序号，界面据此丢弃过时的帧
+        self.level = engine.level_number
+        self.tick = engine.tick
+        self.sun = engine.sun
+        self.result = engine.result
+        self.selected = engine.selected_plant
+        self.wave = engine.level.get_current_wave_info()
+        self.looks = board_looks(engine.plants, engine.zombies)
+        self.snapshots = snapshots  # 回退快照的个数
+        self.events = events
+        self.restored = restored  # 引擎状态在这一帧被替换（读档、撤销、回退）
+        self.warning = warning  # 需要提示玩家的错误
+        self.profile = profile  # PhaseProfiler.summary() 的结果，没有开启性能统计时为 None
+
+
+class SimulationWorker(QObject):
+    """在工作线程里推进游戏的对象：界面线程只发送命令、接收 Frame，从不直接访问引擎
+
+    用 moveToThread 移到 QThread 之后，submit 发出的命令经排队连接在工作线程里依次执行，
+    每执行一条命令或推进一批回合就发布一帧。推进按固定时间步长：帧计时器按帧率触发，
+    每次根据实际经过的时间和速度推进若干回合，回合再耗时也不会阻塞界面的输入和绘制。
+    """
+
+    TICK_SECONDS = 1.0  # 1 倍速时每回合的时长（秒）
+    MAX_FRAME_GAP = 0.25  # 两帧间隔超过这个时长（秒）时只按这么长计算
+    HINT_SECONDS = 0.1  # 提示的搜索时间（秒）：搜索在模拟线程里进行，期间模拟暂停
+
+    frame_ready = Signal(object)  # 发布的 Frame
+    requested = Signal(object)  # 内部使用：把命令排队到工作线程
+
+    def __init__(self, rows=5, cols=9, replay_dir=None, max_fps=30, shared_path=None):
+        super().__init__()
+        self.rows = rows
+        self.cols = cols
+        self.replay_dir = replay_dir  # 指定目录时每局的操作都会写入一个录像文件
+        self.shared_path = shared_path  # 指定路径时把局面发布到共享内存，供其他进程读取
+        self.shared = None
+        self.max_fps = max_fps
+        self.engine = None
+        self.recorder = None
+        self.history = snapshot.SnapshotHistory()  # 定期保存状态用于回退，种植前保存状态用于撤销
+        self.planner = Planner(time_budget=self.HINT_SECONDS)  # 提示用的规划器
+        self.profiler = PhaseProfiler()
+        self.profile_window = None  # 开启性能统计时汇总最近多少个回合
+        self.running = False
+        self.speed = 1  # 速度倍数
+        self.accumulator = 0.0  # 尚未推进的模拟时间（秒）
+        self.last_frame = None  # 上一帧的时间点
+        self.published = 0  # 最新一帧的序号
+        self.pending = []  # 尚未发布的事件
+        self.timer = QTimer(self)  # 作为子对象随 moveToThread 一起移到工作线程
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.on_frame)
+        self.requested.connect(self.execute)
+
+    def submit(self, name, *args):
+        """从任意线程发送命令，在工作线程里按发送顺序执行"""
+        self.requested.emit((name, args))
+
+    def execute(self, command):
+        name, args = command
+        restored = warning = None
+        result = getattr(self, "cmd_" + name)(*args)
+        if isinstance(result, tuple):
+            restored, warning = result
+        if name != "ui_profile":
+            if self.shared is not None and self.engine is not None:
+                self.shared.publish(self.engine)  # 种植、撤销、读档等在回合之间改变的局面
+            self.publish(restored=bool(restored), warning=warning)
+
+    def publish(self, restored=False, warning=None):
+        """把当前状态和积攒的事件作为新的一帧发给界面"""
+        self.published += 1
+        profile = None
+        if self.engine.profiler is not None:
+            profile = self.profiler.summary(self.profile_window)
+        events, self.pending = tuple(self.pending), []
+        snapshots = len(self.history.ticks())
+        self.frame_ready.emit(Frame(self.published, self.engine, snapshots, events, restored, warning, profile))
+
+    # 以下为命令，只在工作线程里执行；返回 (状态是否被替换, 警告) 或 None
+
+    def cmd_new_game(self, level_number):
+        """开始新的一局（尚未开始推进）"""
+        self.finish_recording()
+        self.timer.stop()
+        self.running = False
+        self.engine = GameEngine(level_number, self.rows, self.cols)
+        if self.profile_window is not None:
+            self.engine.profiler = self.profiler
+        if self.shared_path:
+            if self.shared is None:
+                self.shared = SharedBoardWriter(self.shared_path, self.rows, self.cols)
+            self.shared.attach(self.engine)
+        self.history.clear()
+        self.history.record(self.engine, force=True)
+        if self.replay_dir:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            path = os.path.join(self.replay_dir, f"level{level_number}_{self.engine.seed}.pvzr")
+            self.recorder = ReplayRecorder(self.engine, open(path, "wb"))
+
+    def cmd_start(self):
+        if self.engine.game_over:
+            return
+        self.running = True
+        self.accumulator = 0.0
+        self.last_frame = time.perf_counter()
+        self.timer.start(max(1000 // self.max_fps, 1))
+
+    def cmd_pause(self):
+        self.running = False
+        self.timer.stop()
+
+    def cmd_speed(self, speed):
+        self.speed = speed
+
+    def cmd_select(self, plant_type):
+        if self.running:
+            self.pending.append(self.engine.select_plant(plant_type))
+
+    def cmd_place(self, row, col):
+        if not self.running:
+            return
+        self.history.checkpoint(self.engine)
+        event = self.engine.place_plant(row, col)
+        if event is None or event.kind != GameEvent.PLANTED:
+            self.history.discard_checkpoint()
+        if event is not None:
+            self.pending.append(event)
+
+    def cmd_undo(self):
+        """撤销最近一次种植：回到种植前的回合，之后推进的回合一并撤销"""
+        if self.history.undo(self.engine):
+            return self.state_restored(f"已撤销种植，回到第 {self.engine.tick} 回合")
+
+    def cmd_rewind(self, index):
+        """回退到第 index 个快照"""
+        ticks = self.history.ticks()
+        if ticks:
+            tick = self.history.restore(self.engine, ticks[min(index, len(ticks) - 1)])
+            return self.state_restored(f"回退到第 {tick} 回合")
+
+    def cmd_save(self, path):
+        snapshot.save(self.engine, path)
+        self.pending.append(f"已保存到 {os.path.basename(path)}")
+
+    def cmd_load(self, path):
+        """读档：先解码到新的引擎，出错时当前局面不受影响"""
+        try:
+            data = snapshot.read(path)
+            _, rows, cols, _ = snapshot.read_header(data)
+            if (rows, cols) != (self.rows, self.cols):
+                return False, f"存档的棋盘大小为 {rows}x{cols}，与当前不同"
+            engine = snapshot.load_state(data)
+        except (OSError, ValueError, struct.error, zlib.error) as error:
+            return False, f"读取失败: {error}"
+        engine.profiler = self.engine.profiler
+        self.engine = engine
+        if self.shared is not None:
+            self.shared.attach(engine)
+        self.history.clear()
+        self.history.record(self.engine, force=True)
+        return self.state_restored(f"已读取 {os.path.basename(path)}")
+
+    def cmd_hint(self):
+        """用规划器搜索下一步，在日志中给出建议；搜索期间（最多 HINT_SECONDS）暂停推进，界面不受影响"""
+        if self.engine.game_over:
+            return
+        move = self.planner.plan(self.engine)
+        if move is None:
+            self.pending.append("提示：先等待，积攒阳光")
+        else:
+            plant_type, row, col = move
+            self.pending.append(f"提示：在位置 ({row + 1}, {col + 1}) 种植 {PLANT_REGISTRY[plant_type].name}")
+        self.last_frame = time.perf_counter()  # 搜索的时间不计入模拟时间
+
+    def cmd_profiling(self, window):
+        """window 为统计的回合数时开启性能统计，为 None 时关闭"""
+        self.profile_window = window
+        self.engine.profiler = self.profiler if window is not None else None
+        if window is not None:
+            self.profiler.clear()
+
+    def cmd_ui_profile(self, nanoseconds, repainted):
+        """界面线程报告的一次刷新耗时和重绘格子数，记到最近的回合"""
+        self.profiler.count(PhaseProfiler.UI, nanoseconds)
+        self.profiler.count(PhaseProfiler.REPAINTED, repainted)
+
+    def cmd_export_profile(self, path, fmt):
+        if fmt == "csv":
+            self.profiler.export_csv(path)
+        else:
+            self.profiler.export_json(path)
+
+    def cmd_stop(self):
+        """结束工作线程：保存录像并退出事件循环"""
+        self.timer.stop()
+        self.running = False
+        self.finish_recording()
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+        self.thread().quit()
+
+    def state_restored(self, message):
+        """引擎状态被替换之后：录像和新的局面对不上，停止录像"""
+        self.finish_recording()
+        self.engine.recorder = None
+        self.pending.append(message)
+        return True, None
+
+    def finish_recording(self):
+        """结束并保存当前这局的录像"""
+        if self.recorder is not None:
+            self.recorder.close(self.engine.tick)
+            self.recorder.stream.close()
+            self.recorder = None
+
+    def on_frame(self):
+        """帧计时器回调：按固定时间步长推进经过的回合数，然后发布一帧
+
+        一帧里模拟超出时间预算时丢弃积压的时间，实际速度随之下降。界面线程和工作线程共用解释器锁，
+        留出一部分时间给界面绘制。
+        """
+        if not self.running:
+            return
+        now = time.perf_counter()
+        self.accumulator += min(now - self.last_frame, self.MAX_FRAME_GAP) * self.speed
+        self.last_frame = now
+        deadline = now + 0.8 / self.max_fps
+
+        ticks = 0
+        while self.accumulator >= self.TICK_SECONDS and self.running:
+            self.accumulator -= self.TICK_SECONDS
+            ticks += 1
+            self.advance_tick()
+            if time.perf_counter() > deadline:
+                self.accumulator = min(self.accumulator, self.TICK_SECONDS)
+                break
+        if ticks:
+            self.publish()
+
+    def advance_tick(self):
+        """推进引擎一个回合；游戏结束时停止推进，由界面根据事件提示玩家"""
+        events = self.engine.step()
+        self.history.record(self.engine)
+        self.pending.extend(events)
+        if self.engine.game_over:
+            self.running = False
+            self.timer.stop()
+            self.finish_recording()
@@ -0,0 +1,237 @@
+import json
+import struct
+import zlib
+from collections import deque
+
+from Plant import PLANT_TYPES, PlantFactory
+from zombie import ZOMBIE_TYPES, ZombieFactory
+from engine import GameEngine
+from level import Level
+
+# 文件头：魔数、版本、关卡、行数、列数、随机数种子（与录像文件相同的布局）
+MAGIC = b"PVZS"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHHQ")
+# 引擎状态：回合、阳光、已选植物编号（-1 表示没有）、结果（0 进行中，1 胜利，-1 失败）、已生成僵尸数
+STATE = struct.Struct("<IqbbI")
+# 关卡进度：关卡回合、下一只僵尸的下标、当前波次、剩余僵尸数
+LEVEL = struct.Struct("<IIIi")
+# 随机数生成器状态：624 个状态字 + 位置
+RNG = struct.Struct("<625I")
+# 实体：类型编号、行、列，之后是 SNAPSHOT_FIELDS 对应的整数
+ENTITY = struct.Struct("<BHH")
+COUNT = struct.Struct("<I")
+
+RESULTS = {None: 0, "win": 1, "lose": -1}
+
+
+def _pack_entities(out, entities, type_ids):
+    out += COUNT.pack(len(entities))
+    for entity in entities:
+        row, col = entity.position
+        out += ENTITY.pack(type_ids.index(entity.type_id), row, col)
+        fields = entity.SNAPSHOT_FIELDS
+        out += struct.pack(f"<{len(fields)}i", *[getattr(entity, name) for name in fields])
+
+
+def _unpack_entities(data, pos, type_ids, factory):
+    (count,), pos = COUNT.unpack_from(data, pos), pos + COUNT.size
+    entities = []
+    for _ in range(count):
+        type_index, row, col = ENTITY.unpack_from(data, pos)
+        pos += ENTITY.size
+        entity = factory(type_ids[type_index])
+        entity.set_position(row, col)
+        fields = entity.SNAPSHOT_FIELDS
+        for name, value in zip(fields, struct.unpack_from(f"<{len(fields)}i", data, pos)):
+            setattr(entity, name, value)
+        pos += 4 * len(fields)
+        entities.append(entity)
+    return entities, pos
+
+
+def save_state(engine):
+    """把引擎的完整状态编码成紧凑的二进制数据（不压缩）"""
+    out = bytearray(HEADER.pack(MAGIC, VERSION, engine.level_number, engine.rows, engine.cols, engine.seed))
+    selected = PlantFactory.get_type(engine.selected_plant).index if engine.selected_plant else -1
+    out += STATE.pack(engine.tick, engine.sun, selected, RESULTS[engine.result], engine.spawn_count)
+
+    level = engine.level
+    out += LEVEL.pack(level.tick, level.next_spawn, level.wave_counter, level.zombies_remaining)
+    waves = json.dumps(level.waves, separators=(",", ":")).encode()
+    out += COUNT.pack(len(waves)) + waves
+
+    version, words, gauss_next = engine.rng.getstate()
+    out += RNG.pack(*words)
+    out += struct.pack("<?d", gauss_next is not None, gauss_next or 0.0)
+
+    _pack_entities(out, engine.plants.items, PLANT_TYPES)
+    zombies = engine.zombies.items
+    _pack_entities(out, zombies, ZOMBIE_TYPES)
+    # 占位索引中的僵尸顺序（同一格内按到达顺序，和存储顺序不一定相同），以存储下标表示
+    index = {id(zombie_instance): i for i, zombie_instance in enumerate(zombies)}
+    lane_order = [index[id(zombie_instance)] for lane in engine.board.lanes for zombie_instance in lane]
+    out += struct.pack(f"<{len(lane_order)}I", *lane_order)
+    return bytes(out)
+
+
+def read_header(data):
+    """检查 save_state 数据的文件头，返回 (关卡, 行数, 列数, 种子)"""
+    magic, version, level_number, rows, cols, seed = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("不是有效的存档")
+    if version != VERSION:
+        raise ValueError(f"不支持的存档版本: {version}")
+    return level_number, rows, cols, seed
+
+
+def load_state(data, engine=None):
+    """从 save_state 的数据恢复状态；engine 为 None 时创建新引擎，否则就地恢复（保留录像器等挂载），返回引擎"""
+    level_number, rows, cols, seed = read_header(data)
+    pos = HEADER.size
+
+    if engine is None:
+        engine = GameEngine(level_number, rows, cols, seed=seed)
+    else:
+        engine.level_number, engine.rows, engine.cols = level_number, rows, cols
+        engine.reset(seed)
+
+    tick, sun, selected, result, spawn_count = STATE.unpack_from(data, pos)
+    pos += STATE.size
+    engine.tick = tick
+    engine.sun = sun
+    engine.selected_plant = PLANT_TYPES[selected] if selected >= 0 else None
+    engine.result = {value: key for key, value in RESULTS.items()}[result]
+    engine.spawn_count = spawn_count
+
+    level = engine.level = Level(level_number, rows, cols)
+    level.tick, level.next_spawn, level.wave_counter, level.zombies_remaining = LEVEL.unpack_from(data, pos)
+    pos += LEVEL.size
+    (size,), pos = COUNT.unpack_from(data, pos), pos + COUNT.size
+    level.waves = json.loads(data[pos:pos + size])
+    pos += size
+
+    words = RNG.unpack_from(data, pos)
+    pos += RNG.size
+    has_gauss, gauss_next = struct.unpack_from("<?d", data, pos)
+    pos += struct.calcsize("<?d")
+    engine.rng.setstate((3, words, gauss_next if has_gauss else None))
+
+    plants, pos = _unpack_entities(data, pos, PLANT_TYPES, PlantFactory.create_plant)
+    for plant_instance in plants:
+        engine.plants.add(plant_instance)
+        engine.board.add_plant(plant_instance)
+    zombies, pos = _unpack_entities(data, pos, ZOMBIE_TYPES, ZombieFactory.create_zombie)
+    for zombie_instance in zombies:
+        engine.zombies.add(zombie_instance)
+    for i in struct.unpack_from(f"<{len(zombies)}I", data, pos):
+        engine.board.add_zombie(zombies[i])
+    return engine
+
+
+def save(engine, path):
+    """把当前状态压缩后写入存档文件"""
+    with open(path, "wb") as f:
+        f.write(zlib.compress(save_state(engine)))
+
+
+def read(path):
+    """读取存档文件，返回解压后的 save_state 数据"""
+    with open(path, "rb") as f:
+        return zlib.decompress(f.read())
+
+
+def load(path, engine=None):
+    """读取存档文件，参数同 load_state"""
+    return load_state(read(path), engine)
+
+
+class SnapshotHistory:
+    """回退用的快照环形缓冲区：每 interval 回合保存一次状态，只保留最近的若干组
+
+    每组以一个完整压缩的关键帧开头，后面的快照以前一个快照为预设字典做 zlib 压缩（相邻状态
+    大部分字节相同，压缩后只剩差异部分）。恢复时从关键帧依次解压，最多 keyframe_every 次。
+    超出容量时整组丢弃，内存有上限。另外保存种植前的状态，用于撤销最近的种植：撤销是回到种植前的
+    那个回合，种植之后推进的回合一并撤销。
+    """
+
+    def __init__(self, interval=10, keyframe_every=10, max_groups=30, max_undo=20):
+        self.interval = interval  # 快照间隔（回合）
+        self.keyframe_every = keyframe_every  # 每组的快照数
+        self.groups = deque(maxlen=max_groups)  # [[(回合, 压缩数据), ...], ...]，每组第一个是关键帧
+        self.last_state = None  # 最近一个快照的原始数据，用作下一个快照的压缩字典
+        self.undo_stack = deque(maxlen=max_undo)  # 种植前的状态（压缩）
+
+    def clear(self):
+        self.groups.clear()
+        self.last_state = None
+        self.undo_stack.clear()
+
+    def ticks(self):
+        """已保存快照的回合，按时间顺序"""
+        return [tick for group in self.groups for tick, _ in group]
+
+    @property
+    def nbytes(self):
+        """快照占用的字节数"""
+        return sum(len(blob) for group in self.groups for _, blob in group)
+
+    @staticmethod
+    def _decode(group, count):
+        """解压一组中的前 count 个快照，返回最后一个的原始数据"""
+        state = zlib.decompress(group[0][1])
+        for _, blob in group[1:count]:
+            decompressor = zlib.decompressobj(zdict=state)
+            state = decompressor.decompress(blob) + decompressor.flush()
+        return state
+
+    def record(self, engine, force=False):
+        """在快照回合（或 force 时）保存当前状态；回退后继续游戏时，旧的后续快照被丢弃"""
+        if not force and engine.tick % self.interval:
+            return
+        self.truncate(engine.tick - 1)
+        state = save_state(engine)
+        if not self.groups or len(self.groups[-1]) >= self.keyframe_every:
+            self.groups.append([(engine.tick, zlib.compress(state))])
+        else:
+            compressor = zlib.compressobj(zdict=self.last_state)
+            self.groups[-1].append((engine.tick, compressor.compress(state) + compressor.flush()))
+        self.last_state = state
+
+    def truncate(self, tick):
+        """丢弃回合大于 tick 的快照"""
+        if not self.groups or self.groups[-1][-1][0] <= tick:
+            return
+        while self.groups and self.groups[-1][-1][0] > tick:
+            group = self.groups[-1]
+            group.pop()
+            if not group:
+                self.groups.pop()
+        self.last_state = self._decode(self.groups[-1], len(self.groups[-1])) if self.groups else None
+
+    def restore(self, engine, tick):
+        """恢复到回合不大于 tick 的最近一个快照，返回该快照的回合；没有可用快照时返回 None"""
+        for group in reversed(self.groups):
+            if group[0][0] > tick:
+                continue
+            count = sum(1 for snapshot_tick, _ in group if snapshot_tick <= tick)
+            load_state(self._decode(group, count), engine)
+            return group[count - 1][0]
+        return None
+
+    def checkpoint(self, engine):
+        """保存当前状态，供 undo 撤销"""
+        self.undo_stack.append(zlib.compress(save_state(engine)))
+
+    def discard_checkpoint(self):
+        """丢弃最近一次 checkpoint（例如种植没有成功）"""
+        if self.undo_stack:
+            self.undo_stack.pop()
+
+    def undo(self, engine):
+        """恢复到最近一次 checkpoint 的状态，时间也回到那个回合；没有可撤销的操作时返回 False"""
+        if not self.undo_stack:
+            return False
+        load_state(zlib.decompress(self.undo_stack.pop()), engine)
+        self.truncate(engine.tick)
+        return True
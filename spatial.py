@@ -0,0 +1,76 @@
+from bisect import bisect_left, bisect_right
+
+
+class LaneIndex:
+    """按行划分的占位索引：植物格子表 + 每行按列排序的僵尸列表"""
+
+    def __init__(self, rows, cols):
+        self.rows = rows  # 游戏行数
+        self.cols = cols  # 游戏列数
+        self.plant_grid = [[None] * cols for _ in range(rows)]  # 每个格子上的植物
+        self.lanes = [[] for _ in range(rows)]  # 每行的僵尸，按列升序排列
+        self.lane_cols = [[] for _ in range(rows)]  # 与 lanes 一一对应的列号，用于二分查找
+
+    # ---- 植物 ----
+
+    def plant_at(self, row, col):
+        """返回指定格子上的植物（可能已死亡但尚未移除），没有则返回 None"""
+        return self.plant_grid[row][col]
+
+    def add_plant(self, plant):
+        """登记植物"""
+        row, col = plant.position
+        self.plant_grid[row][col] = plant
+
+    def remove_plant(self, plant):
+        """注销植物"""
+        row, col = plant.position
+        if self.plant_grid[row][col] is plant:
+            self.plant_grid[row][col] = None
+
+    # ---- 僵尸 ----
+
+    def add_zombie(self, zombie):
+        """登记僵尸，同一格内按到达顺序排列"""
+        row, col = zombie.position
+        cols = self.lane_cols[row]
+        i = bisect_right(cols, col)
+        cols.insert(i, col)
+        self.lanes[row].insert(i, zombie)
+
+    def remove_zombie(self, zombie, col=None):
+        """注销僵尸；col 为僵尸登记时所在的列，默认取当前位置"""
+        row, z_col = zombie.position
+        if col is None:
+            col = z_col
+        cols = self.lane_cols[row]
+        lane = self.lanes[row]
+        i = bisect_left(cols, col)
+        end = bisect_right(cols, col, i)
+        for j in range(i, end):
+            if lane[j] is zombie:
+                del lane[j]
+                del cols[j]
+                return
+
+    def move_zombie(self, zombie, old_col):
+        """僵尸从 old_col 移动到当前位置后更新索引"""
+        self.remove_zombie(zombie, old_col)
+        self.add_zombie(zombie)
+
+    def zombies_in(self, row_lo, row_hi, col_lo, col_hi):
+        """返回矩形范围内（闭区间，越界部分自动裁剪）登记的僵尸"""
+        found = []
+        for row in range(max(row_lo, 0), min(row_hi, self.rows - 1) + 1):
+            cols = self.lane_cols[row]
+            if not cols:
+                continue
+            i = bisect_left(cols, col_lo)
+            end = bisect_right(cols, col_hi, i)
+            if i < end:
+                found.extend(self.lanes[row][i:end])
+        return found
+
+    def zombies_at(self, row, col):
+        """返回指定格子上的僵尸"""
+        return self.zombies_in(row, row, col, col)
@@ -0,0 +1,73 @@
+class EntityStore:
+    """代际实体存储
+
+    存活实体紧凑地排列在 items 中，可以直接遍历而无需复制；删除时用末尾的实体填补空位，
+    复杂度 O(1)。每个实体占用一个槽位，句柄由槽位号和代数组成：槽位删除后进入空闲列表
+    等待复用，代数加一，旧句柄随之失效。
+    """
+
+    SLOT_BITS = 32
+    SLOT_MASK = (1 << SLOT_BITS) - 1
+
+    def __init__(self):
+        self.items = []  # 存活实体，紧凑排列
+        self._slots = []  # items 下标 -> 槽位号
+        self._index = []  # 槽位号 -> items 下标
+        self._generation = []  # 槽位号 -> 当前代数
+        self._free = []  # 空闲槽位
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def add(self, entity):
+        """加入实体，返回句柄（同时写入 entity.handle）"""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._index)
+            self._index.append(0)
+            self._generation.append(0)
+        self._index[slot] = len(self.items)
+        self.items.append(entity)
+        self._slots.append(slot)
+        entity.handle = (self._generation[slot] << self.SLOT_BITS) | slot
+        return entity.handle
+
+    def remove(self, entity):
+        """移除实体：末尾的实体移到它的位置"""
+        slot = entity.handle & self.SLOT_MASK
+        index = self._index[slot]
+        last = len(self.items) - 1
+        if index != last:
+            moved_slot = self._slots[last]
+            self.items[index] = self.items[last]
+            self._slots[index] = moved_slot
+            self._index[moved_slot] = index
+        self.items.pop()
+        self._slots.pop()
+        self._generation[slot] += 1
+        self._free.append(slot)
+        entity.handle = None
+
+    def index_of(self, entity):
+        """实体在 items 中的下标"""
+        return self._index[entity.handle & self.SLOT_MASK]
+
+    def get(self, handle):
+        """按句柄取实体；实体已被移除时返回 None"""
+        slot = handle & self.SLOT_MASK
+        if slot >= len(self._generation) or self._generation[slot] != handle >> self.SLOT_BITS:
+            return None
+        return self.items[self._index[slot]]
+
+    def clear(self):
+        """移除全部实体"""
+        for entity in self.items:
+            entity.handle = None
+        self.__init__()
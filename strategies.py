@@ -0,0 +1,75 @@
+from engine import GameEvent
+
+
+class BuildOrder:
+    """按固定顺序种植的策略：阳光足够时种下列表中的下一株植物
+
+    策略对象在每回合推进前被调用一次，通过 engine.select_plant / engine.place_plant 操作，
+    和玩家点击界面的效果相同。
+    """
+
+    def __init__(self, name, order):
+        self.name = name  # 策略名称
+        self.order = order  # [(植物类型, 行, 列), ...]
+        self.next_index = 0  # 下一株要种的植物
+
+    def reset(self):
+        """新的一局开始时调用"""
+        self.next_index = 0
+
+    def __call__(self, engine):
+        while self.next_index < len(self.order):
+            plant_type, row, col = self.order[self.next_index]
+            if engine.select_plant(plant_type).kind != GameEvent.PLANT_SELECTED:
+                return  # 阳光不足，等下一回合
+            engine.place_plant(row, col)
+            self.next_index += 1
+
+
+class CherryResponse(BuildOrder):
+    """在建造顺序之外，僵尸逼近到 trigger_col 列时在它所在格子放樱桃炸弹"""
+
+    def __init__(self, name, order, trigger_col=2):
+        super().__init__(name, order)
+        self.trigger_col = trigger_col  # 触发樱桃炸弹的列
+
+    def __call__(self, engine):
+        for zombie_instance in engine.zombies:
+            if zombie_instance.is_alive() and zombie_instance.position[1] <= self.trigger_col:
+                if engine.select_plant("cherrybomb").kind == GameEvent.PLANT_SELECTED:
+                    engine.place_plant(*zombie_instance.position)
+                break
+        super().__call__(engine)
+
+
+def _columns(plant_type, rows, cols):
+    """依次在每一行的 cols 列种植同一种植物"""
+    return [(plant_type, row, col) for col in cols for row in range(rows)]
+
+
+def create_strategy(name, rows=5, cols=9):
+    """按名称创建策略"""
+    if name == "idle":
+        # 什么都不种，作为基准
+        return BuildOrder(name, [])
+    elif name == "peashooter_rush":
+        # 只种一株向日葵，之后全力铺豌豆射手
+        order = [("sunflower", rows // 2, 0)] + _columns("peashooter", rows, [1, 2])
+        return BuildOrder(name, order + _columns("sunflower", rows, [0]))
+    elif name == "economy":
+        # 先铺一列向日葵，再补豌豆射手
+        return BuildOrder(name, _columns("sunflower", rows, [0]) + _columns("peashooter", rows, [1, 2, 3]))
+    elif name == "wall":
+        # 向日葵之后先筑坚果墙，再补豌豆射手
+        order = _columns("sunflower", rows, [0])
+        order += _columns("wallnut", rows, [min(4, cols - 1)])
+        order += _columns("peashooter", rows, [1, 2])
+        return BuildOrder(name, order)
+    elif name == "cherry_response":
+        order = _columns("sunflower", rows, [0]) + _columns("peashooter", rows, [1, 2])
+        return CherryResponse(name, order)
+    else:
+        raise ValueError(f"未知策略: {name}")
+
+
+STRATEGY_NAMES = ("idle", "peashooter_rush", "economy", "wall", "cherry_response")
@@ -0,0 +1,203 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+
+from Plant import PLANT_TYPES
+from zombie import ZOMBIE_TYPES
+
+# array 类型码 -> NumPy 数据类型（不含字节序）
+DTYPES = {"b": "i1", "B": "u1", "h": "i2", "H": "u2", "i": "i4", "I": "u4", "q": "i8", "Q": "u8",
+          "f": "f4", "d": "f8"}
+BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+
+MANIFEST = "telemetry.json"
+
+
+class Column:
+    """一列定宽数据，保存在单独的文件里
+
+    追加的值先放在 array 缓冲区，攒够一批后整块复制到内存映射的文件中；文件容量不够时按倍数扩大
+    并重新映射，关闭时截掉多余的容量。
+    """
+
+    def __init__(self, path, typecode):
+        self.path = path
+        self.typecode = typecode
+        self.buffer = array(typecode)  # 尚未写入文件的值
+        self.itemsize = self.buffer.itemsize
+        self.length = 0  # 已写入文件的值的个数
+        self.file = open(path, "w+b")
+        self.map = None
+        self.capacity = 0  # 文件当前大小（字节）
+
+    def flush(self):
+        """把缓冲区写入内存映射文件"""
+        if not self.buffer:
+            return
+        start = self.length * self.itemsize
+        end = start + len(self.buffer) * self.itemsize
+        if end > self.capacity:
+            self.capacity = max(end, 2 * self.capacity, 1 << 16)
+            if self.map is not None:
+                self.map.close()
+            self.file.truncate(self.capacity)
+            self.map = mmap.mmap(self.file.fileno(), self.capacity)
+        self.map[start:end] = memoryview(self.buffer).cast("B")
+        self.length += len(self.buffer)
+        del self.buffer[:]
+
+    def close(self):
+        self.flush()
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.truncate(self.length * self.itemsize)
+        self.file.close()
+
+
+class Table:
+    """若干等长的列，每行一条记录；每列是一个文件，即按列存储"""
+
+    def __init__(self, directory, name, columns):
+        self.name = name
+        self.columns = [Column(os.path.join(directory, f"{name}.{column}.bin"), typecode)
+                        for column, typecode in columns]
+        self.names = [column for column, _ in columns]
+
+    def manifest(self):
+        return {
+            "rows": self.columns[0].length,
+            "columns": {name: {"file": os.path.basename(column.path), "dtype": BYTE_ORDER + DTYPES[column.typecode]}
+                        for name, column in zip(self.names, self.columns)},
+        }
+
+
+class TelemetryRecorder:
+    """逐回合遥测记录器：挂到 GameEngine.telemetry 上，把每个回合的数据追加到目录中的列文件
+
+    记录四张表：
+        ticks    每回合一行：回合、阳光、波次、植物数、僵尸数
+        zombies  每回合每只僵尸一行：回合、僵尸编号（生成顺序）、类型编号、行、列、生命值
+        damage   每回合每株造成伤害的植物一行：回合、植物句柄、类型编号、行、列、实际造成的伤害（不计溢出）
+        spawns   每只生成的僵尸一行：回合、波次、僵尸编号、类型编号、行
+
+    每 batch 行写入一次内存映射文件，列的元数据写在 telemetry.json 中；用 load 可以直接
+    映射成 NumPy 数组，不需要解析。快进跳过的空闲回合局面不变，不产生记录。
+    """
+
+    TABLES = {
+        "ticks": (("tick", "i"), ("sun", "q"), ("wave", "h"), ("plants", "i"), ("zombies", "i")),
+        "zombies": (("tick", "i"), ("id", "i"), ("type", "B"), ("row", "h"), ("col", "h"), ("health", "i")),
+        "damage": (("tick", "i"), ("plant", "q"), ("type", "B"), ("row", "h"), ("col", "h"), ("damage", "i")),
+        "spawns": (("tick", "i"), ("wave", "h"), ("id", "i"), ("type", "B"), ("row", "h")),
+    }
+
+    def __init__(self, directory, engine=None, batch=65536):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.batch = batch  # 每张表攒够多少行写入一次文件
+        self.tables = {name: Table(directory, name, columns) for name, columns in self.TABLES.items()}
+        self.plant_types = {type_id: index for index, type_id in enumerate(PLANT_TYPES)}
+        self.zombie_types = {type_id: index for index, type_id in enumerate(ZOMBIE_TYPES)}
+        self.meta = {}  # 写入清单的对局信息
+        self.closed = False
+        # 直接持有各列的缓冲区，追加时少一层查找
+        self._ticks = [column.buffer for column in self.tables["ticks"].columns]
+        self._zombies = [column.buffer for column in self.tables["zombies"].columns]
+        self._damage = [column.buffer for column in self.tables["damage"].columns]
+        self._spawns = [column.buffer for column in self.tables["spawns"].columns]
+        if engine is not None:
+            self.attach(engine)
+
+    def attach(self, engine):
+        """挂到引擎上，并记下关卡、棋盘大小和种子"""
+        self.meta = {"level": engine.level_number, "rows": engine.rows, "cols": engine.cols, "seed": engine.seed}
+        engine.telemetry = self
+
+    def spawn(self, tick, wave, zombie_instance):
+        """记录一只僵尸的生成"""
+        tick_col, wave_col, id_col, type_col, row_col = self._spawns
+        tick_col.append(tick)
+        wave_col.append(wave)
+        id_col.append(zombie_instance.spawn_order)
+        type_col.append(self.zombie_types[zombie_instance.type_id])
+        row_col.append(zombie_instance.position[0])
+
+    def damage(self, tick, plant_instance, damage):
+        """记录一株植物在本回合实际造成的伤害（消灭僵尸时只计僵尸剩余的生命值）"""
+        tick_col, plant_col, type_col, row_col, col_col, damage_col = self._damage
+        row, col = plant_instance.position
+        tick_col.append(tick)
+        plant_col.append(plant_instance.handle)
+        type_col.append(self.plant_types[plant_instance.type_id])
+        row_col.append(row)
+        col_col.append(col)
+        damage_col.append(damage)
+
+    def end_tick(self, engine):
+        """回合结束：记录全局数据和每只僵尸的位置、生命值"""
+        tick = engine.tick
+        tick_col, sun_col, wave_col, plants_col, zombies_col = self._ticks
+        tick_col.append(tick)
+        sun_col.append(engine.sun)
+        wave_col.append(engine.level.wave_counter)
+        plants_col.append(len(engine.plants))
+        zombies_col.append(len(engine.zombies))
+
+        zombies = engine.zombies.items
+        if zombies:
+            tick_col, id_col, type_col, row_col, col_col, health_col = self._zombies
+            zombie_types = self.zombie_types
+            tick_col.extend([tick] * len(zombies))
+            id_col.extend([zombie_instance.spawn_order for zombie_instance in zombies])
+            type_col.extend([zombie_types[zombie_instance.type_id] for zombie_instance in zombies])
+            row_col.extend([zombie_instance.position[0] for zombie_instance in zombies])
+            col_col.extend([zombie_instance.position[1] for zombie_instance in zombies])
+            health_col.extend([zombie_instance.health for zombie_instance in zombies])
+
+        for table in self.tables.values():
+            if len(table.columns[0].buffer) >= self.batch:
+                for column in table.columns:
+                    column.flush()
+
+    def flush(self):
+        """把全部缓冲区写入文件并更新清单，之后 load 可以读到目前为止的全部记录"""
+        for table in self.tables.values():
+            for column in table.columns:
+                column.flush()
+        self._write_manifest()
+
+    def close(self):
+        """写入剩余数据并关闭文件"""
+        if self.closed:
+            return
+        for table in self.tables.values():
+            for column in table.columns:
+                column.close()
+        self._write_manifest()
+        self.closed = True
+
+    def _write_manifest(self):
+        manifest = {"meta": self.meta, "tables": {name: table.manifest() for name, table in self.tables.items()}}
+        with open(os.path.join(self.directory, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def load(directory, mmap_mode="r"):
+    """读取遥测目录，返回 (对局信息, {表名: {列名: NumPy 数组}})；数组直接映射文件，不复制数据"""
+    import numpy as np
+
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    tables = {}
+    for name, table in manifest["tables"].items():
+        rows = table["rows"]
+        tables[name] = {
+            column: (np.memmap(os.path.join(directory, info["file"]), dtype=info["dtype"], mode=mmap_mode,
+                               shape=(rows,))
+                     if rows else np.empty(0, dtype=info["dtype"]))
+            for column, info in table["columns"].items()
+        }
+    return manifest["meta"], tables
@@ -0,0 +1,48 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import GameEngine  # noqa: E402
+from Plant import PLANT_TYPES  # noqa: E402
+from snapshot import save_state  # noqa: E402
+
+
+class FastForwardTest(unittest.TestCase):
+    """fast_forward(n) 跳过空闲回合，得到的事件和局面与 run(n) 完全相同"""
+
+    def play(self, level_number, seed, advance):
+        engine = GameEngine(level_number, seed=seed)
+        engine.sun = 300
+        inputs = random.Random(seed)
+        trace = []
+        while engine.result is None and engine.tick < 600:
+            # 每段之间随机种一株植物，两边的输入相同
+            engine.select_plant(inputs.choice(PLANT_TYPES))
+            engine.place_plant(inputs.randrange(engine.rows), inputs.randrange(3))
+            events = advance(engine, inputs.randrange(1, 40))
+            trace.append((engine.tick, repr(events), save_state(engine)))
+        return trace
+
+    def test_same_as_run(self):
+        for level_number in (1, 2, 3, 4):
+            for seed in range(5):
+                with self.subTest(level=level_number, seed=seed):
+                    expected = self.play(level_number, seed, GameEngine.run)
+                    actual = self.play(level_number, seed, GameEngine.fast_forward)
+                    self.assertEqual(len(actual), len(expected))
+                    for (tick, *step), (_, *expected_step) in zip(actual, expected):
+                        self.assertTrue(step == expected_step, f"第 {tick} 回合的事件或局面不同")
+
+    def test_skips_idle_ticks(self):
+        # 没有植物时第一只僵尸出现之前的回合都是空闲的，一次就能跳过
+        engine = GameEngine(1, seed=0)
+        first_spawn = engine.level.next_spawn_tick()
+        self.assertEqual(engine.skip_idle(), first_spawn - 1)
+        self.assertEqual([event.kind for event in engine.step()], ["spawn"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import GameEngine  # noqa: E402
+from lanes import LaneExecutor  # noqa: E402
+from snapshot import save_state  # noqa: E402
+from strategies import STRATEGY_NAMES, create_strategy  # noqa: E402
+
+
+class LaneExecutorTest(unittest.TestCase):
+    """按行并行推进的每个回合与 GameEngine.step 逐个处理的事件和局面完全相同"""
+
+    def play(self, workers, strategy_name, seed, rows, waves):
+        engine = GameEngine(1, rows, 9, seed=seed)
+        engine.level.waves = waves
+        executor = None
+        if workers:
+            # min_parallel=0：实体再少也分给线程执行
+            executor = LaneExecutor(workers, engine, min_parallel=0)
+        strategy = create_strategy(strategy_name, rows, 9)
+        inputs = random.Random(seed)
+        trace = []
+        try:
+            while engine.result is None and engine.tick < 400:
+                strategy(engine)
+                if inputs.random() < 0.05:
+                    # 随机的樱桃炸弹会同时波及相邻的行
+                    engine.sun += 150
+                    engine.select_plant("cherrybomb")
+                    engine.place_plant(inputs.randrange(rows), inputs.randrange(9))
+                events = engine.step()
+                trace.append((repr(events), save_state(engine)))
+        finally:
+            if executor is not None:
+                executor.close()
+        return trace
+
+    def test_matches_serial_step(self):
+        for seed, strategy_name in enumerate(STRATEGY_NAMES):
+            rows = (5, 8, 12)[seed % 3]
+            waves = [{"count": 5 * rows, "type": zombie_type, "interval": 1}
+                     for zombie_type in ("basic", "fast", "conehead", "buckethead")]
+            with self.subTest(strategy=strategy_name, rows=rows):
+                expected = self.play(0, strategy_name, seed, rows, waves)
+                actual = self.play(1 + seed % 4, strategy_name, seed, rows, waves)
+                self.assertEqual(len(actual), len(expected))
+                for tick, (step, expected_step) in enumerate(zip(actual, expected)):
+                    self.assertTrue(step == expected_step, f"第 {tick + 1} 回合的事件或局面不同")
+
+
+if __name__ == "__main__":
+    unittest.main()
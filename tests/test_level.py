@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from level import Level  # noqa: E402
+
+
+def per_tick_spawns(waves, ticks):
+    """编译时间表之前的逐回合出怪规则，作为参照：返回每个回合生成的僵尸类型（没有则为 None）"""
+    spawns = []
+    wave_counter = turn_counter = spawned = 0
+    for _ in range(ticks):
+        turn_counter += 1
+        zombie_type = None
+        while wave_counter < len(waves):
+            wave = waves[wave_counter]
+            if spawned >= wave["count"]:
+                # 当前波次已完成，进入下一波并在同一回合重新检查
+                wave_counter += 1
+                spawned = turn_counter = 0
+                turn_counter += 1
+                continue
+            if turn_counter % wave["interval"] == 0:
+                spawned += 1
+                zombie_type = wave["type"]
+            break
+        spawns.append(zombie_type)
+    return spawns
+
+
+class SpawnTimelineTest(unittest.TestCase):
+    """编译后的出怪时间表与原来逐回合计数的规则生成相同的僵尸"""
+
+    def assert_same_spawns(self, waves):
+        ticks = sum(wave["count"] * wave["interval"] for wave in waves) + 20
+        level = Level(1)
+        level.waves = waves
+        self.assertEqual([level.get_next_zombie() for _ in range(ticks)], per_tick_spawns(waves, ticks))
+
+    def test_builtin_levels(self):
+        for level_number in (1, 2, 3, 4):
+            with self.subTest(level=level_number):
+                self.assert_same_spawns(Level(level_number).waves)
+
+    def test_random_waves(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            waves = [{"count": rng.randint(1, 6), "type": rng.choice(["basic", "fast"]),
+                      "interval": rng.randint(1, 7)} for _ in range(rng.randint(1, 5))]
+            with self.subTest(waves=waves):
+                self.assert_same_spawns(waves)
+
+    def test_advance_to(self):
+        # 一次推进到某个回合，与逐回合推进生成的僵尸、波次和剩余数量相同
+        for level_number in (1, 2, 3, 4):
+            for tick in range(0, 80, 3):
+                stepped, jumped = Level(level_number), Level(level_number)
+                spawned = [stepped.get_next_zombie() for _ in range(tick)]
+                self.assertEqual(jumped.advance_to(tick), [zombie_type for zombie_type in spawned if zombie_type])
+                self.assertEqual((jumped.wave_counter, jumped.zombies_remaining, jumped.next_spawn_tick()),
+                                 (stepped.wave_counter, stepped.zombies_remaining, stepped.next_spawn_tick()))
+
+
+if __name__ == "__main__":
+    unittest.main()
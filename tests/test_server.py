@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import GameServer  # noqa: E402
+
+
+class GameServerRequestTest(unittest.TestCase):
+    """无效请求只得到出错的回复，不改变会话状态"""
+
+    def setUp(self):
+        self.server = GameServer()
+        self.session = self.request(op="create", seed=1)["session"]
+
+    def request(self, **request):
+        return self.server.handle(None, json.dumps(request))
+
+    def select_peashooter(self):
+        self.server.sessions[self.session].engine.sun = 1000
+        self.assertTrue(self.request(op="select", session=self.session, plant="peashooter")["ok"])
+
+    def test_place_out_of_range(self):
+        self.select_peashooter()
+        for row, col in ((99, 0), (0, 9), (5, 0)):
+            reply = self.request(op="place", session=self.session, row=row, col=col)
+            self.assertFalse(reply["ok"])
+        engine = self.server.sessions[self.session].engine
+        self.assertEqual(len(engine.plants), 0)
+        self.assertEqual(engine.sun, 1000)
+
+    def test_place_negative(self):
+        self.select_peashooter()
+        for row, col in ((-1, -1), (-1, 0), (0, -1)):
+            reply = self.request(op="place", session=self.session, row=row, col=col)
+            self.assertFalse(reply["ok"])
+        engine = self.server.sessions[self.session].engine
+        self.assertEqual(len(engine.plants), 0)
+        self.assertIsNone(engine.board.plant_at(4, 8))
+        self.assertEqual(engine.sun, 1000)
+
+    def test_place_in_range(self):
+        self.select_peashooter()
+        reply = self.request(op="place", session=self.session, row=4, col=8)
+        self.assertTrue(reply["ok"])
+        self.assertEqual(reply["event"], "planted")
+
+    def test_request_not_object(self):
+        for line in ("[1]", '"x"', "3", "null"):
+            reply = self.server.handle(None, line)
+            self.assertFalse(reply["ok"])
+
+    def test_create_board_size_limits(self):
+        for rows, cols in ((0, 9), (5, 0), (-1, 9), (GameServer.MAX_ROWS + 1, 9), (5, GameServer.MAX_COLS + 1)):
+            self.assertFalse(self.request(op="create", rows=rows, cols=cols)["ok"])
+        self.assertTrue(self.request(op="create", rows=GameServer.MAX_ROWS, cols=GameServer.MAX_COLS)["ok"])
+
+    def test_handler_error_becomes_reply(self):
+        def broken(connection, request):
+            raise RuntimeError("boom")
+
+        self.server.ops["broken"] = broken
+        with self.assertLogs("server", "ERROR"):
+            reply = self.request(op="broken", id=7)
+        self.assertFalse(reply["ok"])
+        self.assertEqual(reply["id"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import GameEngine  # noqa: E402
+from Plant import PLANT_TYPES  # noqa: E402
+from snapshot import SnapshotHistory, load_state, read_header, save_state  # noqa: E402
+
+
+def play(engine, inputs, ticks):
+    """按 inputs 随机种植并推进 ticks 个回合，返回每回合的 (事件, 局面)"""
+    trace = []
+    for _ in range(ticks):
+        if engine.result is not None:
+            break
+        if inputs.random() < 0.3:
+            engine.select_plant(inputs.choice(PLANT_TYPES))
+            engine.place_plant(inputs.randrange(engine.rows), inputs.randrange(3))
+        events = engine.step()
+        trace.append((repr(events), save_state(engine)))
+    return trace
+
+
+class SnapshotTest(unittest.TestCase):
+    """load_state(save_state(引擎)) 得到完全相同的局面，之后的推进也相同"""
+
+    def test_round_trip(self):
+        for level_number in (1, 2, 3, 4):
+            for seed in range(5):
+                with self.subTest(level=level_number, seed=seed):
+                    engine = GameEngine(level_number, seed=seed)
+                    engine.sun = 1000
+                    play(engine, random.Random(seed), 20 + 7 * seed)
+                    data = save_state(engine)
+                    self.assertEqual(read_header(data), (level_number, 5, 9, seed))
+                    clone = load_state(data)
+                    self.assertEqual(save_state(clone), data)
+
+                    # 恢复出的引擎和原来的引擎输入相同时，之后每一回合都相同
+                    expected = play(engine, random.Random(seed + 1), 200)
+                    actual = play(clone, random.Random(seed + 1), 200)
+                    self.assertEqual(len(actual), len(expected))
+                    for tick, (step, expected_step) in enumerate(zip(actual, expected)):
+                        self.assertTrue(step == expected_step, f"恢复后的第 {tick + 1} 回合不同")
+
+    def test_load_in_place(self):
+        engine = GameEngine(2, seed=3)
+        engine.sun = 1000
+        play(engine, random.Random(3), 40)
+        data = save_state(engine)
+        target = GameEngine(1, 4, 6, seed=0)
+        self.assertIs(load_state(data, target), target)
+        self.assertEqual((target.rows, target.cols), (5, 9))
+        self.assertEqual(save_state(target), data)
+
+    def test_history_restore(self):
+        engine = GameEngine(3, seed=1)
+        engine.sun = 1000
+        history = SnapshotHistory(interval=5, keyframe_every=3)
+        states = {0: save_state(engine)}
+        history.record(engine, force=True)
+        inputs = random.Random(1)
+        while engine.result is None and engine.tick < 60:
+            play(engine, inputs, 1)
+            states[engine.tick] = save_state(engine)
+            history.record(engine)
+        restored = GameEngine(1, seed=0)
+        for tick in history.ticks():
+            self.assertEqual(history.restore(restored, tick), tick)
+            self.assertTrue(save_state(restored) == states[tick], f"第 {tick} 回合的快照不同")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import GameEngine  # noqa: E402
+from strategies import create_strategy  # noqa: E402
+from telemetry import TelemetryRecorder, load  # noqa: E402
+from zombie import ZOMBIE_TYPES, ZombieFactory  # noqa: E402
+
+
+class TelemetryDamageTest(unittest.TestCase):
+    """伤害表记录实际扣除的生命值：总和等于僵尸失去的生命值，不计溢出"""
+
+    def run_game(self, directory, seed, lanes=0):
+        engine = GameEngine(1, seed=seed)
+        strategy = create_strategy("cherry_response")
+        recorder = TelemetryRecorder(directory, engine)
+        executor = None
+        if lanes:
+            from lanes import LaneExecutor
+            executor = LaneExecutor(lanes, engine)
+        while engine.result is None and engine.tick < 2000:
+            strategy(engine)
+            engine.step()
+        recorder.close()
+        if executor is not None:
+            executor.close()
+        return engine
+
+    def check(self, seed, lanes=0):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = self.run_game(directory, seed, lanes)
+            _, tables = load(directory)
+            spawned = sum(ZombieFactory.create_zombie(ZOMBIE_TYPES[type_index]).health
+                          for type_index in tables["spawns"]["type"])
+            remaining = sum(zombie_instance.health for zombie_instance in engine.zombies)
+            self.assertEqual(int(tables["damage"]["damage"].sum()), spawned - remaining)
+
+    def test_overkill_not_counted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = GameEngine(1, seed=0)
+            recorder = TelemetryRecorder(directory, engine)
+            # 两只残血僵尸挨着樱桃炸弹，爆炸只能扣掉它们剩下的生命值
+            for spawn_order, (health, col) in enumerate(((5, 4), (30, 5))):
+                zombie_instance = ZombieFactory.create_zombie(ZOMBIE_TYPES[0])
+                zombie_instance.health = health
+                zombie_instance.set_position(2, col)
+                zombie_instance.spawn_order = spawn_order
+                engine.zombies.add(zombie_instance)
+                engine.board.add_zombie(zombie_instance)
+            engine.spawn_count = 2
+            engine.sun = 1000
+            engine.select_plant("cherrybomb")
+            engine.place_plant(2, 4)
+            engine.step()
+            recorder.close()
+            _, tables = load(directory)
+            self.assertEqual(tables["damage"]["damage"].tolist(), [35])
+
+    def test_damage_matches_health_lost(self):
+        for seed in range(3):
+            self.check(seed)
+
+    def test_damage_matches_health_lost_with_lanes(self):
+        self.check(0, lanes=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import GameEngine  # noqa: E402
+from Plant import PLANT_TYPES, PlantFactory  # noqa: E402
+from snapshot import RESULTS  # noqa: E402
+from vecsim import BatchSimulator  # noqa: E402
+from zombie import ZombieFactory  # noqa: E402
+
+
+class BatchSimulatorTest(unittest.TestCase):
+    """BatchSimulator 的每一局与相同种子、相同输入的 GameEngine 逐回合一致"""
+
+    def assert_same(self, sim, game, engine):
+        tick = engine.tick
+        self.assertEqual(sim.result[game], RESULTS[engine.result], f"第 {game} 局第 {tick} 回合的结果不同")
+        if engine.result == "lose":
+            return  # 失败的回合里僵尸的结算在中途停止，之后的局面不比较
+        self.assertEqual(sim.sun[game], engine.sun)
+
+        plants = {}
+        for plant_instance in engine.plants:
+            plants[plant_instance.position] = (PlantFactory.get_type(plant_instance.type_id).index + 1,
+                                               plant_instance.health, plant_instance.cooldown_timer)
+        occupied = zip(*np.nonzero(sim.plant_type[game]))
+        self.assertEqual({(int(row), int(col)): (sim.plant_type[game, row, col], sim.plant_health[game, row, col],
+                                                 sim.plant_cooldown[game, row, col])
+                          for row, col in occupied}, plants, f"第 {game} 局第 {tick} 回合的植物不同")
+
+        zombies = [(ZombieFactory.get_type(zombie_instance.type_id).index + 1, zombie_instance.health,
+                    zombie_instance.position, zombie_instance.move_counter)
+                   for zombie_instance in sorted(engine.zombies, key=lambda entity: entity.spawn_order)]
+        slots = np.flatnonzero(sim.zombie_active[game])
+        self.assertEqual([(sim.zombie_type[game, slot], sim.zombie_health[game, slot],
+                           (sim.zombie_row[game, slot], sim.zombie_col[game, slot]),
+                           sim.zombie_move_counter[game, slot]) for slot in slots],
+                         zombies, f"第 {game} 局第 {tick} 回合的僵尸不同")
+
+    def check(self, level_number, n_games, seed, sun, density):
+        engines = [GameEngine(level_number, seed=seed + game) for game in range(n_games)]
+        sim = BatchSimulator(level_number, n_games, rngs=[random.Random(seed + game) for game in range(n_games)])
+        for engine in engines:
+            engine.sun = sun
+        sim.sun[:] = sun
+        inputs = random.Random(seed)
+        for _ in range(400):
+            for game, engine in enumerate(engines):
+                if engine.result is None and inputs.random() < density:
+                    plant_type = inputs.choice(PLANT_TYPES)
+                    row, col = inputs.randrange(engine.rows), inputs.randrange(4)
+                    engine.select_plant(plant_type)
+                    event = engine.place_plant(row, col)
+                    placed = sim.place_plant([game], [row], [col], plant_type)[0]
+                    self.assertEqual(placed, event is not None and event.kind == "planted")
+            for engine in engines:
+                engine.step()
+            sim.step()
+            for game, engine in enumerate(engines):
+                self.assert_same(sim, game, engine)
+            if not sim.running.any():
+                break
+        return sim.result
+
+    def test_matches_engine(self):
+        results = []
+        for level_number in (1, 2, 3, 4):
+            results.extend(self.check(level_number, 8, level_number * 100, sun=50, density=0.1))
+            results.extend(self.check(level_number, 8, level_number * 100 + 50, sun=1500, density=0.5))
+        # 输入覆盖胜负两种结果
+        self.assertIn(1, results)
+        self.assertIn(-1, results)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from Plant import PLANT_TYPES
+from vecsim import BatchSimulator
+
+
+class VectorEnv:
+    """N 个棋盘的向量化训练环境，接口仿照 Gym 的向量环境：reset(seeds) 和 step(actions)
+
+    规则由 vecsim.BatchSimulator 按数组推进，与 GameEngine 相同。动作是整数：0 表示不种植，
+    其余对应 place_plant(行, 列, 类型)，见 action()；种不了（阳光不够、格子已有植物）的动作被忽略，
+    info["placed"] 标出实际种下的棋盘。每一步推进 ticks_per_step 个回合。
+
+    观测是预先分配的 NumPy 数组，每一步原地改写后返回同一组对象，不产生新的数组；需要保留某一步的
+    观测时自行复制：
+        plant_type     (N, 行, 列) int8   植物类型编号 + 1，0 表示空格子
+        plant_health   (N, 行, 列) int32
+        zombie_health  (N, 行, 列) int32  格子上僵尸的生命值之和
+        zombie_count   (N, 行, 列) int16
+        sun            (N,) int64
+        wave           (N,) int32         已开始的波次数
+
+    奖励在对局结束的那一步给出：胜利 1，失败 -1。所有棋盘共用一份出怪时间表、按同一个回合推进，
+    对局不能单独重置：结束的棋盘忽略动作、奖励为 0，全部结束（terminated | truncated）之后调用 reset。
+    """
+
+    OBSERVATIONS = (("plant_type", np.int8, True), ("plant_health", np.int32, True),
+                    ("zombie_health", np.int32, True), ("zombie_count", np.int16, True),
+                    ("sun", np.int64, False), ("wave", np.int32, False))
+
+    def __init__(self, n_envs, level_number=1, rows=5, cols=9, max_ticks=2000, ticks_per_step=1):
+        self.n_envs = n_envs
+        self.rows = rows
+        self.cols = cols
+        self.max_ticks = max_ticks  # 达到这个回合数仍未结束的对局记为截断
+        self.ticks_per_step = ticks_per_step
+        self.sim = BatchSimulator(level_number, n_envs, rows, cols)
+
+        # 动作表：动作编号 -> (类型编号 + 1, 行, 列)，编号 0 不种植
+        cells = rows * cols
+        self.n_actions = 1 + len(PLANT_TYPES) * cells
+        index = np.arange(self.n_actions - 1)
+        self.action_type = np.r_[0, index // cells + 1]
+        self.action_row = np.r_[0, index % cells // cols]
+        self.action_col = np.r_[0, index % cols]
+
+        self.observation = {name: np.zeros((n_envs, rows, cols) if grid else n_envs, dtype=dtype)
+                            for name, dtype, grid in self.OBSERVATIONS}
+        self.rewards = np.zeros(n_envs, dtype=np.float32)
+        self.terminated = np.zeros(n_envs, dtype=bool)
+        self.truncated = np.zeros(n_envs, dtype=bool)
+        self.placed = np.zeros(n_envs, dtype=bool)
+        self.info = {"placed": self.placed}
+        self.mask = np.zeros((n_envs, self.n_actions), dtype=bool)
+        self._cells = np.zeros(self.sim.zombie_health.size, dtype=np.int64)  # 计算僵尸分布用的格子下标
+        self._running = np.zeros(n_envs, dtype=bool)
+
+    def action(self, plant_type, row, col):
+        """place_plant(行, 列, 类型) 对应的动作编号"""
+        return 1 + (PLANT_TYPES.index(plant_type) * self.rows + row) * self.cols + col
+
+    def reset(self, seeds=None):
+        """重置全部棋盘，返回 (观测, info)
+
+        seeds 为整数或 None 时用一个 NumPy 随机数生成器选择僵尸出生行；为每个棋盘一个种子的序列时，
+        第 i 个棋盘与 GameEngine(seed=seeds[i]) 的出生行完全相同（逐局生成，稍慢）。
+        """
+        sim = self.sim
+        if seeds is None or isinstance(seeds, int):
+            sim.seed = seeds
+            sim.rngs = None
+        else:
+            if len(seeds) != self.n_envs:
+                raise ValueError(f"需要 {self.n_envs} 个种子，实际 {len(seeds)} 个")
+            sim.rngs = [random.Random(seed) for seed in seeds]
+        sim.reset()
+        self.rewards[:] = 0
+        self.terminated[:] = False
+        self.truncated[:] = False
+        self.placed[:] = False
+        self._observe()
+        return self.observation, self.info
+
+    def step(self, actions):
+        """每个棋盘执行一个动作并推进，返回 (观测, 奖励, terminated, truncated, info)，都是复用的数组"""
+        sim = self.sim
+        actions = np.asarray(actions)
+        self.placed[:] = False
+        games = np.flatnonzero(actions)
+        if len(games):
+            chosen = actions[games]
+            self.placed[games] = sim.place_plants(games, self.action_row[chosen], self.action_col[chosen],
+                                                  self.action_type[chosen])
+
+        running = self._running
+        np.equal(sim.result, 0, out=running)
+        for _ in range(self.ticks_per_step):
+            if sim.tick >= self.max_ticks:
+                break
+            sim.step()
+        # 本步结束的对局得到结果对应的奖励
+        np.multiply(sim.result, running, out=self.rewards, casting="unsafe")
+        np.not_equal(sim.result, 0, out=self.terminated)
+        np.logical_and(~self.terminated, sim.tick >= self.max_ticks, out=self.truncated)
+        self._observe()
+        return self.observation, self.rewards, self.terminated, self.truncated, self.info
+
+    def action_mask(self):
+        """当前可以执行的动作，(N, 动作数) 的布尔数组（复用同一个数组）：不种植总是可以"""
+        sim = self.sim
+        cost = sim.plant_stats["cost"][1:]
+        cells = self.mask[:, 1:].reshape(self.n_envs, len(cost), self.rows, self.cols)
+        np.logical_and((sim.plant_type == 0)[:, None], (sim.sun[:, None] >= cost)[:, :, None, None], out=cells)
+        cells &= (sim.result == 0)[:, None, None, None]
+        self.mask[:, 0] = True
+        return self.mask
+
+    def _observe(self):
+        """把模拟器的状态写入观测数组"""
+        sim = self.sim
+        observation = self.observation
+        np.copyto(observation["plant_type"], sim.plant_type)
+        np.copyto(observation["plant_health"], sim.plant_health, casting="unsafe")
+        np.copyto(observation["sun"], sim.sun)
+        observation["wave"].fill(sim.level.wave_counter)
+
+        zombie_health = observation["zombie_health"].reshape(-1)
+        zombie_count = observation["zombie_count"].reshape(-1)
+        used = sim.zombie_count
+        if not used:
+            zombie_health.fill(0)
+            zombie_count.fill(0)
+            return
+        health = sim.zombie_health[:, :used]
+        alive = sim.zombie_active[:, :used] & (health > 0)
+        games, slots = np.nonzero(alive)
+        cells = self._cells[:len(games)]
+        np.multiply(games, self.rows, out=cells)
+        cells += sim.zombie_row[games, slots]
+        cells *= self.cols
+        cells += sim.zombie_col[games, slots]
+        size = len(zombie_health)
+        zombie_health[:] = np.bincount(cells, health[games, slots], size)
+        zombie_count[:] = np.bincount(cells, minlength=size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="向量化训练环境的吞吐量测试：所有棋盘执行随机的可行动作",
+                                     epilog="示例：python vecenv.py --envs 256 --episodes 5")
+    parser.add_argument("--envs", type=int, default=256, help="并行的棋盘数")
+    parser.add_argument("--level", type=int, default=1, help="关卡编号")
+    parser.add_argument("--rows", type=int, default=5)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--episodes", type=int, default=3, help="运行的轮数，每轮全部棋盘各一局")
+    parser.add_argument("--place-rate", type=float, default=0.1, help="每一步尝试种植的概率")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    env = VectorEnv(args.envs, args.level, args.rows, args.cols)
+    rng = np.random.default_rng(args.seed)
+    steps = wins = 0
+    start = time.perf_counter()
+    for episode in range(args.episodes):
+        env.reset(args.seed + episode)
+        done = np.zeros(args.envs, dtype=bool)
+        while not done.all():
+            mask = env.action_mask()
+            # 在可行的动作中均匀选一个，按 place_rate 的概率执行
+            choice = (rng.random(mask.shape) * mask).argmax(axis=1)
+            choice[rng.random(args.envs) >= args.place_rate] = 0
+            _, rewards, terminated, truncated, _ = env.step(choice)
+            wins += int((rewards > 0).sum())
+            done |= terminated | truncated
+            steps += 1
+    seconds = time.perf_counter() - start
+    print(f"{args.envs} 个棋盘，{steps} 步，用时 {seconds:.2f} 秒：每秒 {steps / seconds:.0f} 步，"
+          f"{steps * args.envs / seconds:.0f} 个棋盘步；胜 {wins}/{args.envs * args.episodes}")
+
+
+if __name__ == "__main__":
+    main()
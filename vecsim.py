@@ -0,0 +1,319 @@
+import numpy as np
+
+from Plant import PLANT_REGISTRY, PlantFactory, CherryBomb
+from zombie import ZOMBIE_REGISTRY, ZombieFactory
+from level import Level
+
+
+def _plant_stats():
+    """从类型登记表读取各类型的参数，按类型编号 + 1 排列（下标 0 表示空格子）"""
+    stats = {key: [0] for key in ("health", "cost", "attack_power", "attack_range", "attack_cooldown",
+                                  "sun_production", "production_cooldown", "area")}
+    for entry in PLANT_REGISTRY.values():
+        plant = entry.prototype
+        stats["health"].append(plant.health)
+        stats["cost"].append(plant.cost)
+        stats["attack_power"].append(plant.attack_power)
+        stats["attack_range"].append(plant.attack_range)
+        stats["attack_cooldown"].append(plant.attack_cooldown)
+        stats["sun_production"].append(getattr(plant, "sun_production", 0))
+        stats["production_cooldown"].append(getattr(plant, "production_cooldown", 0))
+        stats["area"].append(isinstance(plant, CherryBomb))  # 3x3 范围一次性攻击
+    stats = {key: np.array(values) for key, values in stats.items()}
+    stats["area"] = stats["area"].astype(bool)
+    return stats
+
+
+def _zombie_stats():
+    """从类型登记表读取各类型的参数，按类型编号 + 1 排列（下标 0 表示空槽位）"""
+    stats = {key: [0] for key in ("health", "damage", "move_threshold", "reward")}
+    for entry in ZOMBIE_REGISTRY.values():
+        zombie = entry.prototype
+        stats["health"].append(zombie.health)
+        stats["damage"].append(zombie.damage)
+        stats["move_threshold"].append(1 / zombie.speed)  # 与 Zombie.can_move 的比较保持一致
+        stats["reward"].append(zombie.reward)
+    return {key: np.array(values) for key, values in stats.items()}
+
+
+class BatchSimulator:
+    """向量化批量模拟器：以数组保存 N 局游戏的状态，一次 step() 同时推进所有对局
+
+    规则与 GameEngine.step 完全一致。植物按格子存放在 (N, 行, 列) 数组中；
+    僵尸按生成顺序占用 (N, 槽位) 数组，由于所有对局共用同一份波次表，
+    第 k 个生成的僵尸在每局中都位于槽位 k，槽位顺序即原游戏中的结算顺序。
+    """
+
+    def __init__(self, level_number, n_games, rows=5, cols=9, seed=None, rngs=None):
+        self.level_number = level_number  # 关卡编号
+        self.n_games = n_games  # 并行对局数
+        self.rows = rows  # 游戏行数
+        self.cols = cols  # 游戏列数
+        self.seed = seed  # numpy 随机数种子，用于选择僵尸出生行
+        self.rngs = rngs  # 可选：每局一个 random.Random(种子)，与 GameEngine(seed=种子) 逐局一致
+        self.plant_stats = _plant_stats()
+        self.zombie_stats = _zombie_stats()
+        self.max_range = int(self.plant_stats["attack_range"].max())
+        self.reset()
+
+    def reset(self):
+        """重置所有对局为关卡初始状态"""
+        n, rows, cols = self.n_games, self.rows, self.cols
+        self.level = Level(self.level_number, rows, cols)
+        capacity = max(1, len(self.level.timeline))
+        self.rng = np.random.default_rng(self.seed)
+        self.tick = 0
+
+        # 每局的全局状态
+        self.sun = np.full(n, 50, dtype=np.int64)
+        self.zombies_remaining = np.zeros(n, dtype=np.int64)
+        self.result = np.zeros(n, dtype=np.int8)  # 0 进行中，1 胜利，-1 失败
+        self.end_tick = np.zeros(n, dtype=np.int64)  # 对局结束时的回合数
+
+        # 植物（按格子）；属性表在种植时写入，避免每回合按类型查表
+        self.plant_type = np.zeros((n, rows, cols), dtype=np.int8)
+        self.plant_health = np.zeros((n, rows, cols), dtype=np.int64)
+        self.plant_cooldown = np.zeros((n, rows, cols), dtype=np.int64)
+        self.plant_sun_timer = np.zeros((n, rows, cols), dtype=np.int64)
+        self.plant_power = np.zeros((n, rows, cols), dtype=np.int64)  # 射手攻击力
+        self.plant_range = np.zeros((n, rows, cols), dtype=np.int64)  # 射手射程
+        self.plant_bomb = np.zeros((n, rows, cols), dtype=np.int64)  # 樱桃炸弹的攻击力
+        self.plant_sun = np.zeros((n, rows, cols), dtype=np.int64)  # 向日葵每次产生的阳光
+        self.plant_sun_cooldown = np.zeros((n, rows, cols), dtype=np.int64)  # 向日葵产生阳光的间隔
+        self.plant_attack_cooldown = np.zeros((n, rows, cols), dtype=np.int64)  # 攻击冷却
+
+        # 僵尸（按生成顺序的槽位）
+        self.zombie_count = 0  # 已占用的槽位数
+        self.zombie_type = np.zeros((n, capacity), dtype=np.int8)
+        self.zombie_active = np.zeros((n, capacity), dtype=bool)  # 是否仍在僵尸列表中
+        self.zombie_health = np.zeros((n, capacity), dtype=np.int64)
+        self.zombie_row = np.zeros((n, capacity), dtype=np.int64)
+        self.zombie_col = np.zeros((n, capacity), dtype=np.int64)
+        self.zombie_move_counter = np.zeros((n, capacity), dtype=np.int64)
+        self.zombie_damage = np.zeros(capacity, dtype=np.int64)  # 每个槽位的类型在所有对局中相同
+        self.zombie_move_threshold = np.zeros(capacity)
+        self.zombie_reward = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def running(self):
+        """仍在进行中的对局"""
+        return self.result == 0
+
+    def place_plant(self, games, rows, cols, plant_type):
+        """在各局的指定格子种植植物，规则同 GameEngine.place_plant；返回每次种植是否成功
+
+        games、rows、cols 为等长的下标数组，plant_type 为类型名。同一局同一格重复出现时只种植一次。
+        """
+        ps = self.plant_stats
+        type_id = PlantFactory.get_type(plant_type).index + 1
+        cost = ps["cost"][type_id]
+        games = np.asarray(games)
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        placed = np.zeros(len(games), dtype=bool)
+        # 逐个种植，保证同一局内的阳光扣除和占位检查按顺序生效
+        for i in range(len(games)):
+            g, r, c = games[i], rows[i], cols[i]
+            if self.result[g] != 0 or self.plant_type[g, r, c] != 0 or self.sun[g] < cost:
+                continue
+            self.sun[g] -= cost
+            self.plant_type[g, r, c] = type_id
+            self.plant_health[g, r, c] = ps["health"][type_id]
+            self.plant_cooldown[g, r, c] = 0
+            self.plant_sun_timer[g, r, c] = 0
+            self.plant_power[g, r, c] = 0 if ps["area"][type_id] else ps["attack_power"][type_id]
+            self.plant_range[g, r, c] = ps["attack_range"][type_id]
+            self.plant_bomb[g, r, c] = ps["attack_power"][type_id] if ps["area"][type_id] else 0
+            self.plant_sun[g, r, c] = ps["sun_production"][type_id]
+            self.plant_sun_cooldown[g, r, c] = ps["production_cooldown"][type_id]
+            self.plant_attack_cooldown[g, r, c] = ps["attack_cooldown"][type_id]
+            placed[i] = True
+        return placed
+
+    def place_plants(self, games, rows, cols, type_ids):
+        """一次种植多局中的植物，每局最多一株：逐项的规则同 place_plant，但不逐个循环
+
+        type_ids 为类型编号 + 1 的数组（与 plant_type 相同的编码），games 中不能有重复的对局。
+        返回每次种植是否成功。
+        """
+        ps = self.plant_stats
+        games, rows, cols, type_ids = (np.asarray(a) for a in (games, rows, cols, type_ids))
+        cost = ps["cost"][type_ids]
+        placed = (self.result[games] == 0) & (self.plant_type[games, rows, cols] == 0) & (self.sun[games] >= cost)
+        games, rows, cols, type_ids = games[placed], rows[placed], cols[placed], type_ids[placed]
+        area = ps["area"][type_ids]
+        self.sun[games] -= cost[placed]
+        self.plant_type[games, rows, cols] = type_ids
+        self.plant_health[games, rows, cols] = ps["health"][type_ids]
+        self.plant_cooldown[games, rows, cols] = 0
+        self.plant_sun_timer[games, rows, cols] = 0
+        self.plant_power[games, rows, cols] = np.where(area, 0, ps["attack_power"][type_ids])
+        self.plant_range[games, rows, cols] = ps["attack_range"][type_ids]
+        self.plant_bomb[games, rows, cols] = np.where(area, ps["attack_power"][type_ids], 0)
+        self.plant_sun[games, rows, cols] = ps["sun_production"][type_ids]
+        self.plant_sun_cooldown[games, rows, cols] = ps["production_cooldown"][type_ids]
+        self.plant_attack_cooldown[games, rows, cols] = ps["attack_cooldown"][type_ids]
+        return placed
+
+    def _remove_plants(self, mask):
+        """清空 mask 标记的格子"""
+        for grid in (self.plant_type, self.plant_health, self.plant_cooldown, self.plant_sun_timer,
+                     self.plant_power, self.plant_range, self.plant_bomb, self.plant_sun,
+                     self.plant_sun_cooldown, self.plant_attack_cooldown):
+            grid[mask] = 0
+
+    def step(self):
+        """所有进行中的对局推进一个回合"""
+        running = self.running
+        if not running.any():
+            return
+        self.tick += 1
+        zs = self.zombie_stats
+
+        # 1. 生成新僵尸（所有对局共用同一份波次时间表）
+        zombie_type = self.level.get_next_zombie()
+        if zombie_type:
+            slot = self.zombie_count
+            self.zombie_count += 1
+            type_id = ZombieFactory.get_type(zombie_type).index + 1
+            if self.rngs is not None:
+                spawn_rows = np.array([rng.randint(0, self.rows - 1) if running[g] else 0
+                                       for g, rng in enumerate(self.rngs)])
+            else:
+                spawn_rows = self.rng.integers(0, self.rows, size=self.n_games)
+            self.zombie_type[running, slot] = type_id
+            self.zombie_active[running, slot] = True
+            self.zombie_health[running, slot] = zs["health"][type_id]
+            self.zombie_row[running, slot] = spawn_rows[running]
+            self.zombie_col[running, slot] = self.cols - 1
+            self.zombie_move_counter[running, slot] = 0
+            self.zombies_remaining[running] += 1
+            self.zombie_damage[slot] = zs["damage"][type_id]
+            self.zombie_move_threshold[slot] = zs["move_threshold"][type_id]
+            self.zombie_reward[slot] = zs["reward"][type_id]
+
+        run3 = running[:, None, None]
+        health = self.plant_health
+        cooldown = self.plant_cooldown
+
+        # 2. 植物更新，向日葵产生阳光（空格子的冷却恒为 0）
+        cooldown -= (cooldown > 0) & run3
+        sun_timer = self.plant_sun_timer
+        producer = (self.plant_sun > 0) & run3
+        sun_timer += producer
+        produced = producer & (sun_timer >= self.plant_sun_cooldown)
+        sun_timer[produced] = 0
+        self.sun += np.where(produced & (health > 0), self.plant_sun, 0).sum(axis=(1, 2))
+
+        # 3. 植物攻击；上回合死亡的植物在此移除，之后留在格子上的植物都是存活的
+        dead_plant = (self.plant_type != 0) & (health <= 0) & run3
+        if dead_plant.any():
+            self._remove_plants(dead_plant)
+        shooter = (self.plant_power > 0) & (cooldown == 0) & run3
+        bomb = (self.plant_bomb > 0) & run3
+        np.copyto(cooldown, self.plant_attack_cooldown, where=shooter)
+        has_bomb = bomb.any()
+        if has_bomb:
+            health[bomb] = 0  # 樱桃炸弹攻击后消失，下回合移除
+
+        n, rows, cols = self.n_games, self.rows, self.cols
+        used = self.zombie_count
+        if used:
+            z_alive = self.zombie_active[:, :used] & (self.zombie_health[:, :used] > 0) & running[:, None]
+            g_all = np.arange(n)[:, None]
+            z_rows = self.zombie_row[:, :used]
+            z_cols = self.zombie_col[:, :used]
+
+            # 僵尸受到的伤害：射手覆盖 [列, 列 + 射程]，只在僵尸所在位置向左回看
+            shot = np.where(shooter, self.plant_power, 0)
+            damage = shot[g_all, z_rows, z_cols]
+            for d in range(1, min(self.max_range, cols - 1) + 1):
+                src = np.maximum(z_cols - d, 0)
+                covered = (z_cols >= d) & (self.plant_range[g_all, z_rows, src] >= d)
+                damage += np.where(covered, shot[g_all, z_rows, src], 0)
+            # 樱桃炸弹：3x3 范围
+            if has_bomb:
+                padded = np.zeros((n, rows + 2, cols + 2), dtype=np.int64)
+                padded[:, 1:-1, 1:-1] = np.where(bomb, self.plant_bomb, 0)
+                for dr in range(3):
+                    for dc in range(3):
+                        damage += padded[g_all, z_rows + dr, z_cols + dc]
+            damage[~z_alive] = 0
+            z_health = self.zombie_health[:, :used]
+            np.maximum(z_health - damage, 0, out=z_health)
+            killed = z_alive & (damage > 0) & (z_health == 0)
+            self.sun += (self.zombie_reward[:used] * killed).sum(axis=1)
+            self.zombies_remaining -= killed.sum(axis=1)
+
+            # 4. 僵尸移动和攻击（按槽位顺序结算）
+            self._move_zombies(running, used)
+
+        # 5. 检查关卡是否完成
+        if self.level.wave_counter >= len(self.level.waves):
+            won = (self.result == 0) & (self.zombies_remaining == 0)
+            self.result[won] = 1
+            self.end_tick[won] = self.tick
+
+    def _move_zombies(self, running, used):
+        """僵尸啃食所在格子的植物或前进；同格多个僵尸按槽位顺序啃食"""
+        n = self.n_games
+        g_all = np.arange(n)[:, None]
+        slots = np.arange(used)[None, :]
+        health = self.zombie_health[:, :used]
+        active = self.zombie_active[:, :used]
+        z_rows = self.zombie_row[:, :used]
+        z_cols = self.zombie_col[:, :used]
+        alive = active & (health > 0) & running[:, None]
+
+        plant_health = self.plant_health[g_all, z_rows, z_cols]
+        has_target = alive & (self.plant_type[g_all, z_rows, z_cols] != 0) & (plant_health > 0)
+        bite = np.where(has_target, self.zombie_damage[:used], 0)
+
+        # 前面的僵尸已经把植物啃死时，后面的僵尸改为移动：按格子分段求排他前缀和
+        attacks = has_target.copy()
+        g_idx, s_idx = np.nonzero(has_target)
+        if len(g_idx):
+            cell = (g_idx * self.rows + z_rows[g_idx, s_idx]) * self.cols + z_cols[g_idx, s_idx]
+            order = np.lexsort((s_idx, cell))  # 先按格子，再按槽位
+            cell, g_idx, s_idx = cell[order], g_idx[order], s_idx[order]
+            bites = bite[g_idx, s_idx]
+            total = np.cumsum(bites)
+            starts = np.r_[True, cell[1:] != cell[:-1]]
+            seg_base = np.maximum.accumulate(np.where(starts, total - bites, 0))
+            before = total - bites - seg_base
+            attacks[g_idx, s_idx] = before < plant_health[g_idx, s_idx]
+
+        movers = alive & ~attacks
+        counter = self.zombie_move_counter[:, :used] + movers
+        steps = movers & (counter >= self.zombie_move_threshold[:used])
+        counter[steps] = 0
+        breach = steps & (z_cols == 0)
+
+        # 僵尸到达终点时游戏立即结束，之后的僵尸本回合不再结算
+        lost = breach.any(axis=1)
+        first = np.where(lost, breach.argmax(axis=1), used)
+        processed = slots <= first[:, None]
+
+        self.zombie_move_counter[:, :used] = np.where(processed & movers, counter,
+                                                      self.zombie_move_counter[:, :used])
+        z_cols -= processed & steps & ~breach
+        hit = processed & attacks
+        if hit.any():
+            g_idx, s_idx = np.nonzero(hit)
+            flat = self.plant_health.reshape(-1)
+            cell = (g_idx * self.rows + z_rows[g_idx, s_idx]) * self.cols + z_cols[g_idx, s_idx]
+            np.subtract.at(flat, cell, bite[g_idx, s_idx])
+            np.maximum(flat, 0, out=flat)
+        # 移除已死亡的僵尸
+        active &= ~(processed & (health <= 0) & running[:, None])
+
+        self.result[lost] = -1
+        self.end_tick[lost] = self.tick
+
+    def run(self, ticks):
+        """推进最多 ticks 个回合（所有对局结束时提前停止），返回每局结果数组"""
+        for _ in range(ticks):
+            if not self.running.any():
+                break
+            self.step()
+        return self.result
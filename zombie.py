@@ -1,6 +1,15 @@
+import math
+
+
 class Zombie:
     """僵尸基类，所有僵尸都继承自此类"""
 
+    type_id = None  # 登记的类型标识，由 register_zombie 设置
+    SNAPSHOT_FIELDS = ("health", "move_counter", "spawn_order")  # 存档时保存的可变状态（整数）
+
+    __slots__ = ("name", "health", "max_health", "damage", "speed", "reward", "position", "move_counter",
+                 "target_plant", "spawn_order", "handle")
+
     def __init__(self, name, health, damage, speed, reward=10):
         self.name = name  # 僵尸名称
         self.health = health  # 生命值
@@ -11,6 +20,8 @@ class Zombie:
         self.position = None  # 位置坐标 (行, 列)
         self.move_counter = 0  # 移动计数器，用于控制移动速度
         self.target_plant = None  # 当前攻击的植物
+        self.spawn_order = 0  # 生成顺序，同一格多个僵尸按此顺序啃食植物
+        self.handle = None  # 在 EntityStore 中的句柄
 
     def set_position(self, row, col):
         """设置僵尸位置"""
@@ -21,37 +32,42 @@ class Zombie:
         return self.health > 0
 
     def take_damage(self, damage):
-        """受到伤害"""
-        self.health -= damage
-        if self.health < 0:
-            self.health = 0
+        """受到伤害，返回实际扣除的生命值（不超过剩余生命值）"""
+        applied = min(damage, self.health)
+        self.health -= applied
+        return applied
 
     def can_move(self):
         """判断是否可以移动（基于速度）"""
         self.move_counter += 1
         return self.move_counter >= (1 / self.speed)
 
-    def move(self, plants):
-        """移动僵尸，或攻击植物"""
+    def move(self, board):
+        """移动僵尸，或攻击植物；board 为提供 plant_at 查询的占位索引"""
         if not self.position:
             return False
 
         row, col = self.position
 
         # 检查当前位置是否有植物
-        self.target_plant = None
-        for plant in plants:
-            p_row, p_col = plant.position if plant.position else (None, None)
-            if p_row == row and p_col == col:
-                self.target_plant = plant
-                break
+        self.target_plant = board.plant_at(row, col)
 
         # 如果有目标植物，则攻击
         if self.target_plant and self.target_plant.is_alive():
-            self.target_plant.take_damage(self.damage)
+            self.bite(self.target_plant)
             return False
 
         # 否则移动
+        return self.advance()
+
+    def bite(self, plant):
+        """啃食所在格子的植物"""
+        self.target_plant = plant
+        plant.take_damage(self.damage)
+
+    def advance(self):
+        """尝试前进一格（基于速度）；返回 True 表示移动了，"reach_end" 表示到达终点"""
+        row, col = self.position
         if self.can_move():
             self.move_counter = 0
             new_col = col - 1
@@ -62,19 +78,68 @@ class Zombie:
             return True
         return False
 
-    def update(self, plants):
+    def update(self, board):
         """更新僵尸状态"""
-        return self.move(plants)
+        return self.move(board)
+
+    def ticks_until_event(self, board):
+        """距离下一次可观察变化（啃食或前进一格）的回合数
+
+        和 skip_ticks 一起用于跳过空闲回合；重写 move 或 advance 的子类需要同时重写这两个方法。
+        """
+        row, col = self.position
+        plant = board.plant_at(row, col)
+        if plant is not None and plant.is_alive():
+            return 1  # 每回合都在啃食
+        return max(math.ceil(1 / self.speed - self.move_counter), 1)
+
+    def skip_ticks(self, ticks):
+        """一次推进 ticks 个空闲回合（期间没有移动）"""
+        self.move_counter += ticks
 
     def __str__(self):
         health_percent = (self.health / self.max_health) * 100
         return f"{self.name} (HP: {self.health}/{self.max_health} {health_percent:.0f}%)"
 
 
+class ZombieType:
+    """登记的僵尸类型：构造函数、基础属性和棋盘上的显示字符"""
+
+    def __init__(self, type_id, index, cls, glyph):
+        self.type_id = type_id  # 类型标识，如 "basic"
+        self.index = index  # 类型编号，即登记顺序
+        self.cls = cls  # 构造函数
+        self.glyph = glyph  # 棋盘上显示的字符
+        self.prototype = cls()  # 样本实例，只用来读取基础属性，不参与游戏
+        self.name = self.prototype.name
+
+
+# 已登记的僵尸类型：类型标识 -> ZombieType，在导入时登记一次
+ZOMBIE_REGISTRY = {}
+
+# 全部僵尸类型，顺序即类型编号
+ZOMBIE_TYPES = []
+
+
+def register_zombie(type_id, glyph):
+    """类装饰器：登记一种僵尸类型，之后即可通过 ZombieFactory 按类型标识创建"""
+    def register(cls):
+        if type_id in ZOMBIE_REGISTRY:
+            raise ValueError(f"僵尸类型已登记: {type_id}")
+        cls.type_id = type_id
+        ZOMBIE_REGISTRY[type_id] = ZombieType(type_id, len(ZOMBIE_TYPES), cls, glyph)
+        ZOMBIE_TYPES.append(type_id)
+        return cls
+    return register
+
+
 # 具体僵尸类型
+@register_zombie("basic", glyph="僵")
 class BasicZombie(Zombie):
     """普通僵尸"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="普通僵尸",
@@ -84,9 +149,12 @@ class BasicZombie(Zombie):
         )
 
 
+@register_zombie("conehead", glyph="路")
 class ConeheadZombie(Zombie):
     """路障僵尸：有额外防御"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="路障僵尸",
@@ -97,9 +165,12 @@ class ConeheadZombie(Zombie):
         )
 
 
+@register_zombie("buckethead", glyph="铁")
 class BucketheadZombie(Zombie):
     """铁桶僵尸：更高防御"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="铁桶僵尸",
@@ -110,9 +181,12 @@ class BucketheadZombie(Zombie):
         )
 
 
+@register_zombie("fast", glyph="快")
 class FastZombie(Zombie):
     """快速僵尸：移动速度快"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             name="快速僵尸",
@@ -126,14 +200,13 @@ class FastZombie(Zombie):
 # 僵尸工厂，用于创建僵尸
 class ZombieFactory:
     @staticmethod
-    def create_zombie(zombie_type):
-        if zombie_type == "basic":
-            return BasicZombie()
-        elif zombie_type == "conehead":
-            return ConeheadZombie()
-        elif zombie_type == "buckethead":
-            return BucketheadZombie()
-        elif zombie_type == "fast":
-            return FastZombie()
-        else:
+    def get_type(zombie_type):
+        """查询已登记的僵尸类型"""
+        entry = ZOMBIE_REGISTRY.get(zombie_type)
+        if entry is None:
             raise ValueError(f"未知僵尸类型: {zombie_type}")
+        return entry
+
+    @staticmethod
+    def create_zombie(zombie_type):
+        return ZombieFactory.get_type(zombie_type).cls()